@@ -0,0 +1,41 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from fuzzywuzzy import fuzz
+
+from api.services.fuzzy_scoring import batch_token_sort_ratio
+
+
+class Command(BaseCommand):
+    help = "Bandingkan throughput fuzzywuzzy per pasangan vs RapidFuzz batch (pairs/second)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pairs', type=int, default=200000)
+        parser.add_argument('--legacy-pairs', type=int, default=20000,
+                            help='Jumlah pasangan untuk jalur fuzzywuzzy (lebih lambat)')
+        parser.add_argument('--workers', type=int, default=-1)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(42)
+        words = ['toko', 'warung', 'jaya', 'abadi', 'sentosa', 'makmur', 'bakso', 'mie',
+                 'kopi', 'sari', 'maju', 'baru', 'jl.', 'raya', 'no', 'rt/rw', 'kec.', 'kab.']
+
+        def random_strings(n):
+            return [' '.join(rng.choice(words, rng.integers(3, 8))) + f" {rng.integers(0, 999)}" for _ in range(n)]
+
+        strings_1 = random_strings(options['pairs'])
+        strings_2 = random_strings(options['pairs'])
+        n_legacy = min(options['legacy_pairs'], options['pairs'])
+
+        t0 = time.perf_counter()
+        legacy = [fuzz.token_sort_ratio(a, b) for a, b in zip(strings_1[:n_legacy], strings_2[:n_legacy])]
+        legacy_seconds = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        batch = batch_token_sort_ratio(strings_1, strings_2, workers=options['workers'])
+        batch_seconds = time.perf_counter() - t0
+
+        mismatches = int((np.array(legacy) != batch[:n_legacy]).sum())
+        self.stdout.write(f"fuzzywuzzy : {n_legacy / legacy_seconds:,.0f} pairs/s ({n_legacy} pairs)")
+        self.stdout.write(f"rapidfuzz  : {len(batch) / batch_seconds:,.0f} pairs/s ({len(batch)} pairs)")
+        self.stdout.write(f"mismatch   : {mismatches} / {n_legacy}")
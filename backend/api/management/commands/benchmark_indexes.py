@@ -0,0 +1,127 @@
+import re
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from api.models import MatchingResult, LabelingData
+
+# Semua index query-shaped dari Meta.indexes, agar pengukuran "tanpa index" tetap valid saat index bertambah
+INDEX_NAMES = [index.name for model in (MatchingResult, LabelingData) for index in model._meta.indexes]
+BENCH_TABLES = [MatchingResult._meta.db_table, LabelingData._meta.db_table]
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class Command(BaseCommand):
+    help = ("Seed jutaan baris dummy ke salinan tabel hasil/labeling di schema terpisah, lalu bandingkan "
+            "waktu query dengan dan tanpa index (tabel produksi tidak disentuh)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--results', type=int, default=2000000, help='Jumlah baris db_final')
+        parser.add_argument('--labeling', type=int, default=1000000, help='Jumlah baris table_labeling')
+        parser.add_argument('--batches', type=int, default=200, help='Jumlah batch_id berbeda')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--schema', default='benchmark_indexes', help='Schema sementara untuk tabel benchmark')
+        parser.add_argument('--keep', action='store_true', help='Jangan hapus schema benchmark setelah selesai')
+
+    def create_tables(self, cursor, source_schema: str, schema: str):
+        """Salin struktur tabel (kolom, default, identity, index dengan nama yang sama) ke schema benchmark.
+
+        Nama index hanya unik per schema, jadi Meta.indexes bisa di-drop dengan nama aslinya
+        tanpa ACCESS EXCLUSIVE lock pada tabel produksi (CREATE TABLE ... LIKE hanya butuh ACCESS SHARE).
+        """
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {quote(schema)}")
+        for table in BENCH_TABLES:
+            source, target = f"{quote(source_schema)}.{quote(table)}", f"{quote(schema)}.{quote(table)}"
+            cursor.execute(f"DROP TABLE IF EXISTS {target}")
+            cursor.execute(f"CREATE TABLE {target} (LIKE {source} INCLUDING DEFAULTS INCLUDING IDENTITY "
+                           f"INCLUDING CONSTRAINTS)")
+            cursor.execute("SELECT indexdef FROM pg_indexes WHERE schemaname = %s AND tablename = %s",
+                           [source_schema, table])
+            for (indexdef,) in cursor.fetchall():
+                # indexdef: CREATE [UNIQUE] INDEX name ON schema.table USING ...
+                cursor.execute(re.sub(r' ON \S+ USING ', f' ON {target} USING ', indexdef, count=1))
+
+    def seed(self, options):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO db_final (batch_id, source_table, reference_table, matching_algorithm, matched_data,
+                                      status, confidence_score, created_at, id_1, id_2, faiss_score, fuzzy_score, predicted)
+                SELECT 'bench_' || (g %% %s), 'bench', 'bench', 'COMBINED', NULL,
+                       (ARRAY['MATCH', 'UNMATCH', 'ENRICHED'])[1 + g %% 3], random(), now(),
+                       g, g + 1, random(), (random() * 100)::int, g %% 2 = 0
+                FROM generate_series(1, %s) g
+            """, [options['batches'], options['results']])
+            cursor.execute("""
+                INSERT INTO table_labeling (data_id, combined_string_1, combined_string_2, label,
+                                            source_table, reference_table, confirmed_by_id, created_at, priority)
+                SELECT 'bench_' || g, 'toko ' || g, 'toko ' || (g + 1),
+                       CASE WHEN g %% 20 = 0 THEN NULL WHEN g %% 2 = 0 THEN 'MATCH' ELSE 'UNMATCH' END,
+                       'bench', 'bench', NULL, now(), random()
+                FROM generate_series(1, %s) g
+            """, [options['labeling']])
+            cursor.execute("ANALYZE db_final")
+            cursor.execute("ANALYZE table_labeling")
+
+    def run_queries(self, repeat):
+        queries = {
+            'results by batch+status': lambda: list(
+                MatchingResult.objects.filter(batch_id='bench_7', status='MATCH').values('id', 'confidence_score')[:1000]
+            ),
+            'stats group by status': lambda: list(
+                MatchingResult.objects.filter(batch_id='bench_7').values('status').annotate(count=Count('id'))
+            ),
+            'unlabeled page': lambda: list(LabelingData.objects.filter(label__isnull=True).order_by('id').values('id')[:100]),
+            'count MATCH labels': lambda: LabelingData.objects.filter(label='MATCH').count(),
+        }
+        timings = {}
+        for name, query in queries.items():
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query()
+                samples.append(time.perf_counter() - start)
+            timings[name] = statistics.median(samples) * 1000
+        return timings
+
+    def handle(self, *args, **options):
+        schema = options['schema']
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_schema()")
+            source_schema = cursor.fetchone()[0]
+            if schema in (source_schema, 'public'):
+                raise CommandError(f"Schema benchmark tidak boleh schema produksi ({schema})")
+            cursor.execute("SHOW search_path")
+            search_path = cursor.fetchone()[0]
+
+            self.stdout.write(f"📋 Menyalin struktur {', '.join(BENCH_TABLES)} dari {source_schema} ke {schema}")
+            self.create_tables(cursor, source_schema, schema)
+            # Query ORM dan seed tanpa nama schema hanya melihat tabel benchmark
+            cursor.execute(f"SET search_path TO {quote(schema)}")
+
+        try:
+            self.stdout.write(f"🌱 Seeding {options['results']} db_final + {options['labeling']} table_labeling rows")
+            self.seed(options)
+            with_index = self.run_queries(options['repeat'])
+
+            # DDL Postgres transaksional: drop index, ukur, lalu rollback
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for name in INDEX_NAMES:
+                        cursor.execute(f"DROP INDEX IF EXISTS {quote(schema)}.{quote(name)}")
+                without_index = self.run_queries(options['repeat'])
+                transaction.set_rollback(True)
+
+            self.stdout.write(f"{'query':<28}{'no index (ms)':>15}{'index (ms)':>13}{'speedup':>10}")
+            for name, indexed_ms in with_index.items():
+                plain_ms = without_index[name]
+                self.stdout.write(f"{name:<28}{plain_ms:>15.2f}{indexed_ms:>13.2f}{plain_ms / indexed_ms:>9.1f}x")
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SET search_path TO {search_path}")
+                if not options['keep']:
+                    cursor.execute(f"DROP SCHEMA {quote(schema)} CASCADE")
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_matchingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchingresult',
+            name='id_1',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='matchingresult',
+            name='id_2',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='matchingresult',
+            name='faiss_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='matchingresult',
+            name='fuzzy_score',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='matchingresult',
+            name='predicted',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='matchingresult',
+            name='matched_data',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
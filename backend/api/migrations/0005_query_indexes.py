@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_matchingresult_compact_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='matchingresult',
+            index=models.Index(fields=['batch_id', 'status'], name='db_final_batch_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labelingdata',
+            index=models.Index(condition=models.Q(('label__isnull', True)), fields=['id'], name='labeling_unlabeled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labelingdata',
+            index=models.Index(fields=['label'], name='labeling_label_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='matchingresult',
+            index=models.Index(fields=['batch_id', 'confidence_score', 'id'], name='db_final_batch_conf_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_matchingresult_confidence_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='labelingdata',
+            name='confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='labelingdata',
+            name='fuzzy_score',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='labelingdata',
+            name='faiss_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='labelingdata',
+            name='priority',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='labelingdata',
+            name='leased_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leased_labeling', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='labelingdata',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='labelingdata',
+            index=models.Index(condition=models.Q(('label__isnull', True)), fields=['-priority', 'id'], name='labeling_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_labelingdata_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='labelingdata',
+            name='batch_id',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+        migrations.CreateModel(
+            name='BatchSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_id', models.CharField(max_length=100, unique=True)),
+                ('match_count', models.IntegerField(default=0)),
+                ('unmatch_count', models.IntegerField(default=0)),
+                ('enriched_count', models.IntegerField(default=0)),
+                ('ambiguous_count', models.IntegerField(default=0)),
+                ('confidence_histogram', models.JSONField(default=list)),
+                ('fuzzy_histogram', models.JSONField(default=list)),
+                ('labeled_count', models.IntegerField(default=0)),
+                ('match_labels', models.IntegerField(default=0)),
+                ('unmatch_labels', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'batch_summary',
+            },
+        ),
+    ]
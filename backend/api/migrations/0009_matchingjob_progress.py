@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_batchsummary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='matchingjob',
+            name='status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Success', 'Success'), ('Failed', 'Failed')], default='Pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='matchingjob',
+            name='stage',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='matchingjob',
+            name='stage_processed',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='matchingjob',
+            name='stage_total',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='matchingjob',
+            name='eta_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='matchingjob',
+            name='progress_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
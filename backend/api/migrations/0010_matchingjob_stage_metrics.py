@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_matchingjob_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchingjob',
+            name='stage_metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='matchingjob',
+            name='release',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_matchingjob_stage_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchsummary',
+            name='model_version',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_batchsummary_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_name', models.CharField(max_length=255, unique=True)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('profiled_rows', models.BigIntegerField(default=0)),
+                ('is_sample', models.BooleanField(default=False)),
+                ('columns', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'table_profile',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_tableprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(max_length=100, unique=True)),
+                ('table_name', models.CharField(max_length=255)),
+                ('original_filename', models.CharField(max_length=255)),
+                ('file_path', models.CharField(max_length=500)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Success', 'Success'), ('Failed', 'Failed')], default='Pending', max_length=20)),
+                ('rows_processed', models.BigIntegerField(default=0)),
+                ('rows_total', models.BigIntegerField(blank=True, null=True)),
+                ('columns', models.JSONField(blank=True, default=list)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('start_time', models.DateTimeField(auto_now_add=True)),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
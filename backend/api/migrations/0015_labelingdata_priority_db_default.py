@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_uploadjob_created_by'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='labelingdata',
+            name='priority',
+            field=models.FloatField(db_default=0.0, default=0.0),
+        ),
+    ]
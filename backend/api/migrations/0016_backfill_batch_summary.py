@@ -0,0 +1,85 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:30
+
+from collections import defaultdict
+
+import numpy as np
+from django.db import migrations
+from django.db.models import Count
+
+# Salinan helper api.services.batch_summary saat migration ini dibuat: migration tidak boleh
+# mengimpor kode live (api.models) agar tetap jalan di database baru setelah model berubah
+CONFIDENCE_BINS = np.linspace(0, 1, 11)
+FUZZY_BINS = np.linspace(0, 100, 11)
+
+
+def _histogram(values, bins):
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins)
+    return [
+        {'start': round(float(edges[i]), 2), 'end': round(float(edges[i + 1]), 2), 'count': int(counts[i])}
+        for i in range(len(counts))
+    ]
+
+
+def batch_from_data_id(data_id):
+    parts = str(data_id or '').rsplit('_', 2)
+    return parts[0] if len(parts) == 3 and parts[0] else None
+
+
+def summary_fields(results, labeling):
+    status_counts = dict(results.values_list('status').annotate(count=Count('id')))
+    label_counts = dict(labeling.filter(label__isnull=False).values_list('label').annotate(count=Count('id')))
+    ambiguous_count = labeling.count()
+    if not status_counts and not ambiguous_count:
+        return None
+    return {
+        'match_count': status_counts.get('MATCH', 0),
+        'unmatch_count': status_counts.get('UNMATCH', 0),
+        'enriched_count': status_counts.get('ENRICHED', 0),
+        'ambiguous_count': ambiguous_count,
+        'confidence_histogram': _histogram(
+            [c if c is not None else 0.0 for c in results.values_list('confidence_score', flat=True)], CONFIDENCE_BINS
+        ),
+        'fuzzy_histogram': _histogram(
+            [f for f in results.values_list('fuzzy_score', flat=True) if f is not None], FUZZY_BINS
+        ),
+        'labeled_count': sum(label_counts.values()),
+        'match_labels': label_counts.get('MATCH', 0),
+        'unmatch_labels': label_counts.get('UNMATCH', 0),
+    }
+
+
+def backfill_batch_summaries(apps, schema_editor):
+    """Isi batch_id baris labeling lama dari data_id, lalu buat ringkasan untuk batch yang belum punya"""
+    MatchingResult = apps.get_model('api', 'MatchingResult')
+    LabelingData = apps.get_model('api', 'LabelingData')
+    BatchSummary = apps.get_model('api', 'BatchSummary')
+
+    ids_by_batch = defaultdict(list)
+    for pk, data_id in LabelingData.objects.filter(batch_id__isnull=True).values_list('id', 'data_id').iterator():
+        batch_id = batch_from_data_id(data_id)
+        if batch_id:
+            ids_by_batch[batch_id].append(pk)
+    for batch_id, ids in ids_by_batch.items():
+        for start in range(0, len(ids), 10000):
+            LabelingData.objects.filter(id__in=ids[start:start + 10000]).update(batch_id=batch_id)
+
+    batch_ids = set(MatchingResult.objects.values_list('batch_id', flat=True).distinct())
+    batch_ids |= set(LabelingData.objects.filter(batch_id__isnull=False).values_list('batch_id', flat=True).distinct())
+    batch_ids -= set(BatchSummary.objects.values_list('batch_id', flat=True))
+    for batch_id in sorted(batch_ids):
+        fields = summary_fields(
+            MatchingResult.objects.filter(batch_id=batch_id), LabelingData.objects.filter(batch_id=batch_id)
+        )
+        if fields:
+            BatchSummary.objects.create(batch_id=batch_id, **fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_labelingdata_priority_db_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_batch_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_backfill_batch_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchingjob',
+            name='error',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_matchingjob_error'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchingjob',
+            name='search_stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
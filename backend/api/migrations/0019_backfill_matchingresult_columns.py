@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:35
+
+import numpy as np
+from django.db import migrations
+
+FUZZY_BINS = np.linspace(0, 100, 11)
+BATCH_SIZE = 2000
+
+
+def _number(value, cast):
+    try:
+        return cast(float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _fuzzy_histogram(values):
+    """Salinan histogram fuzzy batch_summary pada saat migration ini dibuat"""
+    counts, edges = np.histogram(np.asarray([v for v in values if v is not None], dtype=float), bins=FUZZY_BINS)
+    return [
+        {'start': round(float(edges[i]), 2), 'end': round(float(edges[i + 1]), 2), 'count': int(counts[i])}
+        for i in range(len(counts))
+    ]
+
+
+def backfill_typed_columns(apps, schema_editor):
+    """Isi id_1, id_2, faiss_score, fuzzy_score, predicted baris lama dari matched_data,
+    lalu hitung ulang histogram fuzzy ringkasan batch yang terdampak (0016 membangunnya dari kolom kosong)"""
+    MatchingResult = apps.get_model('api', 'MatchingResult')
+    BatchSummary = apps.get_model('api', 'BatchSummary')
+
+    legacy = MatchingResult.objects.filter(id_1__isnull=True, matched_data__isnull=False)
+    legacy = legacy.only('id', 'batch_id', 'matched_data')
+    batch_ids = set()
+    pending = []
+    for result in legacy.iterator(chunk_size=BATCH_SIZE):
+        data = result.matched_data if isinstance(result.matched_data, dict) else {}
+        result.id_1 = _number(data.get('id_1'), int)
+        result.id_2 = _number(data.get('id_2'), int)
+        result.faiss_score = _number(data.get('faiss_score'), float)
+        result.fuzzy_score = _number(data.get('fuzzy_score'), round)
+        result.predicted = _number(data.get('predicted'), bool)
+        pending.append(result)
+        batch_ids.add(result.batch_id)
+        if len(pending) >= BATCH_SIZE:
+            MatchingResult.objects.bulk_update(pending, ['id_1', 'id_2', 'faiss_score', 'fuzzy_score', 'predicted'])
+            pending = []
+    if pending:
+        MatchingResult.objects.bulk_update(pending, ['id_1', 'id_2', 'faiss_score', 'fuzzy_score', 'predicted'])
+
+    for summary in BatchSummary.objects.filter(batch_id__in=batch_ids):
+        summary.fuzzy_histogram = _fuzzy_histogram(
+            MatchingResult.objects.filter(batch_id=summary.batch_id).values_list('fuzzy_score', flat=True)
+        )
+        summary.save(update_fields=['fuzzy_histogram'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_matchingjob_search_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_typed_columns, migrations.RunPython.noop),
+    ]
@@ -34,13 +34,25 @@ class MatchingResult(models.Model):
     source_table = models.CharField(max_length=255)
     reference_table = models.CharField(max_length=255)
     matching_algorithm = models.CharField(max_length=20, choices=ALGORITHM_CHOICES)
-    matched_data = models.JSONField()
+    # Kolom numerik ringkas; combined string ada di tabel sumber / artifact Parquet batch
+    id_1 = models.BigIntegerField(null=True, blank=True)
+    id_2 = models.BigIntegerField(null=True, blank=True)
+    faiss_score = models.FloatField(null=True, blank=True)
+    fuzzy_score = models.SmallIntegerField(null=True, blank=True)
+    predicted = models.BooleanField(null=True, blank=True)
+    matched_data = models.JSONField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     confidence_score = models.FloatField()
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'db_final'
+        indexes = [
+            # GetMatchingResultsView / GetMatchingStatsView selalu filter batch_id (+ status)
+            models.Index(fields=['batch_id', 'status'], name='db_final_batch_status_idx'),
+            # Keyset pagination hasil per batch terurut confidence
+            models.Index(fields=['batch_id', 'confidence_score', 'id'], name='db_final_batch_conf_idx'),
+        ]
 
 class LabelingData(models.Model):
     LABEL_CHOICES = [
@@ -49,6 +61,7 @@ class LabelingData(models.Model):
     ]
     
     data_id = models.CharField(max_length=100)
+    batch_id = models.CharField(max_length=100, null=True, blank=True, db_index=True)
     combined_string_1 = models.TextField()
     combined_string_2 = models.TextField()
     label = models.CharField(max_length=20, choices=LABEL_CHOICES, null=True, blank=True)
@@ -56,9 +69,23 @@ class LabelingData(models.Model):
     reference_table = models.CharField(max_length=255)
     confirmed_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Skor model saat pasangan masuk antrian; priority = ketidakpastian + information gain
+    confidence = models.FloatField(null=True, blank=True)
+    fuzzy_score = models.SmallIntegerField(null=True, blank=True)
+    faiss_score = models.FloatField(null=True, blank=True)
+    priority = models.FloatField(default=0.0, db_default=0.0)
+    # Lease agar beberapa reviewer tidak mendapat pasangan yang sama
+    leased_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='leased_labeling')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         db_table = 'table_labeling'
+        indexes = [
+            # Antrian labeling hanya membaca baris yang belum dilabel
+            models.Index(fields=['id'], name='labeling_unlabeled_idx', condition=models.Q(label__isnull=True)),
+            models.Index(fields=['label'], name='labeling_label_idx'),
+            models.Index(fields=['-priority', 'id'], name='labeling_queue_idx', condition=models.Q(label__isnull=True)),
+        ]
         
 class MatchingJob(models.Model):
     job_id = models.CharField(max_length=100, unique=True)
@@ -67,6 +94,7 @@ class MatchingJob(models.Model):
         max_length=20,
         choices=[
             ('Pending', 'Pending'),
+            ('Running', 'Running'),
             ('Success', 'Success'),
             ('Failed', 'Failed')
         ],
@@ -74,7 +102,86 @@ class MatchingJob(models.Model):
     )
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField(null=True, blank=True)
+    # Progress live: stage (fetch, vectorize, index, search, score, classify, persist) + unit stage tsb
+    stage = models.CharField(max_length=20, null=True, blank=True)
+    stage_processed = models.BigIntegerField(default=0)
+    stage_total = models.BigIntegerField(null=True, blank=True)
+    eta_seconds = models.FloatField(null=True, blank=True)
+    progress_updated_at = models.DateTimeField(null=True, blank=True)
+    # Instrumentasi per stage: wall/CPU time, peak RSS, unit diproses; release untuk melacak regresi
+    stage_metrics = models.JSONField(default=dict, blank=True)
+    release = models.CharField(max_length=100, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    # Statistik hasil run_complete_matching: reduction ratio, recall@k, timing index, persist & fetch
+    search_stats = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return f"{self.job_id} - {self.status}"
 
+
+class UploadJob(models.Model):
+    """Upload file yang di-load di background ke staging table lalu dipublikasikan secara atomic"""
+    job_id = models.CharField(max_length=100, unique=True)
+    table_name = models.CharField(max_length=255)
+    original_filename = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ('Pending', 'Pending'),
+            ('Running', 'Running'),
+            ('Success', 'Success'),
+            ('Failed', 'Failed')
+        ],
+        default='Pending'
+    )
+    rows_processed = models.BigIntegerField(default=0)
+    rows_total = models.BigIntegerField(null=True, blank=True)
+    columns = models.JSONField(default=list, blank=True)
+    stats = models.JSONField(default=dict, blank=True)
+    error = models.TextField(null=True, blank=True)
+    start_time = models.DateTimeField(auto_now_add=True)
+    end_time = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.job_id} - {self.table_name} - {self.status}"
+
+
+class BatchSummary(models.Model):
+    """Statistik per batch yang dihitung sekali di akhir matching dan diperbarui saat labeling"""
+    batch_id = models.CharField(max_length=100, unique=True)
+    match_count = models.IntegerField(default=0)
+    unmatch_count = models.IntegerField(default=0)
+    enriched_count = models.IntegerField(default=0)
+    ambiguous_count = models.IntegerField(default=0)
+    confidence_histogram = models.JSONField(default=list)
+    fuzzy_histogram = models.JSONField(default=list)
+    labeled_count = models.IntegerField(default=0)
+    match_labels = models.IntegerField(default=0)
+    unmatch_labels = models.IntegerField(default=0)
+    # Versi (hash) model XGBoost yang men-score batch ini; None jika fallback fuzzy
+    model_version = models.CharField(max_length=64, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'batch_summary'
+
+    def __str__(self):
+        return f"summary_{self.batch_id}"
+
+
+class TableProfile(models.Model):
+    """Profil kolom per tabel (sketch HyperLogLog + statistik panjang) untuk rekomendasi kolom"""
+    table_name = models.CharField(max_length=255, unique=True)
+    row_count = models.BigIntegerField(default=0)
+    profiled_rows = models.BigIntegerField(default=0)
+    is_sample = models.BooleanField(default=False)
+    columns = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'table_profile'
+
+    def __str__(self):
+        return f"profile_{self.table_name}"
@@ -0,0 +1,173 @@
+import numpy as np
+from django.db.models import F, Count, Sum
+from api.models import BatchSummary, MatchingResult, LabelingData
+
+CONFIDENCE_BINS = np.linspace(0, 1, 11)
+FUZZY_BINS = np.linspace(0, 100, 11)
+
+
+def _histogram(values, bins):
+    """Histogram sebagai list [{'start', 'end', 'count'}] yang siap dikirim ke dashboard"""
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins)
+    return [
+        {'start': round(float(edges[i]), 2), 'end': round(float(edges[i + 1]), 2), 'count': int(counts[i])}
+        for i in range(len(counts))
+    ]
+
+
+def batch_histograms(confidences, fuzzy_scores) -> dict:
+    """Histogram confidence / fuzzy score dari baris db_final satu batch (match, unmatch, enriched;
+    pasangan ambiguous ada di table_labeling dan tidak ikut)"""
+    return {
+        'confidence_histogram': _histogram([c if c is not None else 0.0 for c in confidences], CONFIDENCE_BINS),
+        'fuzzy_histogram': _histogram([f for f in fuzzy_scores if f is not None], FUZZY_BINS),
+    }
+
+
+def batch_from_data_id(data_id: str):
+    """batch_id dari data_id '<batch_id>_<id_1>_<id_2>' (baris labeling lama tanpa kolom batch_id)"""
+    parts = str(data_id or '').rsplit('_', 2)
+    return parts[0] if len(parts) == 3 and parts[0] else None
+
+
+def summary_fields(results, labeling):
+    """Field ringkasan dari queryset db_final dan table_labeling satu batch, None jika batch kosong"""
+    status_counts = dict(results.values_list('status').annotate(count=Count('id')))
+    label_counts = dict(labeling.filter(label__isnull=False).values_list('label').annotate(count=Count('id')))
+    ambiguous_count = labeling.count()
+    if not status_counts and not ambiguous_count:
+        return None
+    return {
+        'match_count': status_counts.get('MATCH', 0),
+        'unmatch_count': status_counts.get('UNMATCH', 0),
+        'enriched_count': status_counts.get('ENRICHED', 0),
+        'ambiguous_count': ambiguous_count,
+        **batch_histograms(
+            results.values_list('confidence_score', flat=True),
+            results.values_list('fuzzy_score', flat=True)
+        ),
+        'labeled_count': sum(label_counts.values()),
+        'match_labels': label_counts.get('MATCH', 0),
+        'unmatch_labels': label_counts.get('UNMATCH', 0),
+    }
+
+
+def save_batch_summary(batch_id: str, categorized_results: dict, model_version: str = None):
+    """Tulis ringkasan batch sekali di akhir run_complete_matching (beserta versi model yang men-score)"""
+    stored_results = [
+        result for key in ('matches', 'unmatches', 'enriched') for result in categorized_results[key]
+    ]
+    BatchSummary.objects.update_or_create(
+        batch_id=batch_id,
+        defaults={
+            'match_count': len(categorized_results['matches']),
+            'unmatch_count': len(categorized_results['unmatches']),
+            'enriched_count': len(categorized_results['enriched']),
+            'ambiguous_count': len(categorized_results['ambiguous']),
+            **batch_histograms(
+                [r.get('confidence', 0.0) for r in stored_results],
+                [r.get('fuzzy_score') for r in stored_results]
+            ),
+            'labeled_count': 0,
+            'match_labels': 0,
+            'unmatch_labels': 0,
+            'model_version': model_version,
+        }
+    )
+
+
+def refresh_batch_summary(batch_id: str):
+    """Hitung ulang ringkasan dari db_final / table_labeling (untuk batch lama tanpa ringkasan)"""
+    fields = summary_fields(
+        MatchingResult.objects.filter(batch_id=batch_id), LabelingData.objects.filter(batch_id=batch_id)
+    )
+    if fields is None:
+        return None
+    summary, _ = BatchSummary.objects.update_or_create(batch_id=batch_id, defaults=fields)
+    return summary
+
+
+def record_label_change(labeling: LabelingData, old_label: str, new_label: str):
+    """Perbarui hitungan label ringkasan batch sebuah baris labeling (label baru sudah disimpan).
+
+    Normalnya inkremental (atomic lewat F expression). Baris lama tanpa batch_id di-resolve dari
+    data_id lalu ringkasannya dihitung ulang, karena ringkasan itu belum menghitung baris tersebut;
+    begitu juga batch yang belum punya ringkasan.
+    """
+    if old_label == new_label:
+        return
+    batch_id = labeling.batch_id or batch_from_data_id(labeling.data_id)
+    if batch_id is None:
+        # Tidak bisa di-resolve: tetap terhitung live di overall_stats
+        return
+    if labeling.batch_id is None:
+        LabelingData.objects.filter(pk=labeling.pk).update(batch_id=batch_id)
+        refresh_batch_summary(batch_id)
+        return
+
+    updates = {}
+    if old_label is None:
+        updates['labeled_count'] = F('labeled_count') + 1
+    else:
+        field = 'match_labels' if old_label == 'MATCH' else 'unmatch_labels'
+        updates[field] = F(field) - 1
+    new_field = 'match_labels' if new_label == 'MATCH' else 'unmatch_labels'
+    updates[new_field] = F(new_field) + 1
+    if not BatchSummary.objects.filter(batch_id=batch_id).update(**updates):
+        refresh_batch_summary(batch_id)
+
+
+def summary_to_stats(summary: BatchSummary):
+    """Bentuk response stats (kompatibel dengan format lama) dari satu ringkasan"""
+    return {
+        'matching_stats': [
+            {'status': 'MATCH', 'count': summary.match_count},
+            {'status': 'UNMATCH', 'count': summary.unmatch_count},
+            {'status': 'ENRICHED', 'count': summary.enriched_count},
+        ],
+        'labeling_stats': {
+            'total_unlabeled': summary.ambiguous_count - summary.labeled_count,
+            'total_labeled': summary.labeled_count,
+            'match_labels': summary.match_labels,
+            'unmatch_labels': summary.unmatch_labels
+        },
+        'histograms': {
+            'confidence': summary.confidence_histogram,
+            'fuzzy_score': summary.fuzzy_histogram
+        },
+        'model_version': summary.model_version,
+        'updated_at': summary.updated_at
+    }
+
+
+def overall_stats():
+    """Stats keseluruhan dari penjumlahan ringkasan semua batch.
+
+    Batch lama diberi ringkasan oleh migration 0016; baris labeling yang batch-nya tidak bisa
+    di-resolve (batch_id NULL) dihitung live lewat index batch_id.
+    """
+    totals = BatchSummary.objects.aggregate(
+        match_count=Sum('match_count'), unmatch_count=Sum('unmatch_count'), enriched_count=Sum('enriched_count'),
+        ambiguous_count=Sum('ambiguous_count'), labeled_count=Sum('labeled_count'),
+        match_labels=Sum('match_labels'), unmatch_labels=Sum('unmatch_labels')
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    orphans = LabelingData.objects.filter(batch_id__isnull=True)
+    orphan_labels = dict(orphans.filter(label__isnull=False).values_list('label').annotate(count=Count('id')))
+    totals['ambiguous_count'] += orphans.count()
+    totals['labeled_count'] += sum(orphan_labels.values())
+    totals['match_labels'] += orphan_labels.get('MATCH', 0)
+    totals['unmatch_labels'] += orphan_labels.get('UNMATCH', 0)
+    return {
+        'matching_stats': [
+            {'status': 'MATCH', 'count': totals['match_count']},
+            {'status': 'UNMATCH', 'count': totals['unmatch_count']},
+            {'status': 'ENRICHED', 'count': totals['enriched_count']},
+        ],
+        'labeling_stats': {
+            'total_unlabeled': totals['ambiguous_count'] - totals['labeled_count'],
+            'total_labeled': totals['labeled_count'],
+            'match_labels': totals['match_labels'],
+            'unmatch_labels': totals['unmatch_labels']
+        }
+    }
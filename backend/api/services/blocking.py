@@ -0,0 +1,180 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from .candidate_search import neighbors_to_pairs
+
+BLOCKING_METHODS = ['exact', 'prefix', 'first_token', 'soundex']
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def soundex(word: str) -> str:
+    """Kode Soundex 4 karakter (mis. 'robert' -> 'R163'), string kosong jika tidak ada huruf"""
+    letters = re.sub(r'[^a-z]', '', str(word).lower())
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    last = _SOUNDEX_CODES.get(letters[0], '')
+    for ch in letters[1:]:
+        digit = _SOUNDEX_CODES.get(ch, '')
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        # h dan w tidak memutus huruf berkode sama, vokal memutus
+        if ch not in 'hw':
+            last = digit
+    return code.ljust(4, '0')
+
+
+def _key_part(values: pd.Series, key: dict) -> pd.Series:
+    """Hitung satu bagian blocking key dari sebuah kolom"""
+    text = values.astype(str).str.strip().str.lower().where(values.notna(), '')
+    method = key.get('method', 'exact')
+
+    if method == 'prefix':
+        return text.str.replace(r'\s+', '', regex=True).str[:key.get('length', 3)]
+    if method == 'first_token':
+        return text.str.split().str[0].fillna('')
+    if method == 'soundex':
+        first_tokens = text.str.split().str[0].fillna('')
+        return first_tokens.map(soundex)
+    return text
+
+
+def build_block_keys(df: pd.DataFrame, keys: list, column_field: str = 'column') -> pd.Series:
+    """Gabungkan semua blocking key menjadi satu key komposit per baris.
+
+    Baris dengan salah satu bagian key kosong tidak masuk blok mana pun (None).
+    column_field='column_b' dipakai untuk tabel referensi pada mode linkage.
+    """
+    parts = [_key_part(df[key.get(column_field) or key['column']], key) for key in keys]
+    composite = parts[0]
+    empty = parts[0] == ''
+    for part in parts[1:]:
+        composite = composite + '|' + part
+        empty |= part == ''
+    return composite.where(~empty, None)
+
+
+def _sorted_windows(order: np.ndarray, window: int):
+    """Jendela sorted-neighbourhood yang saling tumpang tindih setengah ukuran jendela"""
+    step = max(1, window // 2)
+    last_start = max(0, len(order) - window)
+    for start in range(0, last_start + step, step):
+        yield order[start:start + window]
+
+
+def iter_blocks(target_keys: pd.Series, query_keys: pd.Series = None, window: int = None):
+    """Bangun daftar blok (target_rows, query_rows).
+
+    Self-matching (query_keys None): query_rows sama dengan target_rows.
+    Linkage: blok hanya dibuat untuk key yang muncul di kedua tabel.
+    Dengan window, blok dibuat dari jendela sorted-neighbourhood atas key terurut.
+    """
+    target_keys = target_keys.reset_index(drop=True)
+    blocks = []
+
+    if query_keys is None:
+        if window:
+            valid = target_keys.dropna().sort_values(kind='stable')
+            for rows in _sorted_windows(valid.index.to_numpy(), window):
+                if len(rows) > 1:
+                    blocks.append((rows, rows))
+        else:
+            valid = target_keys.dropna()
+            for rows in valid.groupby(valid).groups.values():
+                if len(rows) > 1:
+                    blocks.append((rows.to_numpy(), rows.to_numpy()))
+        return blocks
+
+    query_keys = query_keys.reset_index(drop=True)
+    if window:
+        merged = pd.concat([
+            pd.DataFrame({'key': target_keys, 'row': target_keys.index, 'is_query': False}),
+            pd.DataFrame({'key': query_keys, 'row': query_keys.index, 'is_query': True}),
+        ], ignore_index=True).dropna(subset=['key']).sort_values('key', kind='stable')
+        rows_all = merged['row'].to_numpy()
+        is_query = merged['is_query'].to_numpy()
+        for positions in _sorted_windows(np.arange(len(merged)), window):
+            target_rows = rows_all[positions][~is_query[positions]]
+            query_rows = rows_all[positions][is_query[positions]]
+            if len(target_rows) and len(query_rows):
+                blocks.append((target_rows, query_rows))
+        return blocks
+
+    target_groups = target_keys.dropna().groupby(target_keys.dropna()).groups
+    query_groups = query_keys.dropna().groupby(query_keys.dropna()).groups
+    for key in target_groups.keys() & query_groups.keys():
+        blocks.append((target_groups[key].to_numpy(), query_groups[key].to_numpy()))
+    return blocks
+
+
+def blocked_pairs(X_target, blocks: list, search_fn, X_query=None, workers: int = 4, progress=None):
+    """Jalankan search di dalam setiap blok secara paralel dan kembalikan pasangan global.
+
+    search_fn(X_target_block, X_query_block_or_None) -> (D, I) dengan indeks lokal blok.
+    Hasil berupa array (id_1, id_2, dist): id_1 baris target, id_2 baris query.
+    progress (JobProgress, opsional) dihitung per blok dari thread pemanggil.
+    """
+    self_match = X_query is None
+
+    def search_block(block):
+        target_rows, query_rows = block
+        if self_match:
+            D, I = search_fn(X_target[target_rows], None)
+        else:
+            D, I = search_fn(X_target[target_rows], X_query[query_rows])
+        local_1, local_2, dist = neighbors_to_pairs(D, I, drop_self=self_match)
+        return target_rows[local_1], query_rows[local_2], dist
+
+    if progress:
+        progress.start_stage('search', len(blocks))
+    parts = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for part in executor.map(search_block, blocks):
+            parts.append(part)
+            if progress:
+                progress.advance()
+
+    if not parts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.float32)
+
+    id_1 = np.concatenate([p[0] for p in parts]).astype(np.int64)
+    id_2 = np.concatenate([p[1] for p in parts]).astype(np.int64)
+    dist = np.concatenate([p[2] for p in parts])
+    return id_1, id_2, dist
+
+
+def reduction_ratio(blocks: list, n_target: int, n_query: int = None) -> float:
+    """1 - (perbandingan setelah blocking / perbandingan tanpa blocking)"""
+    if n_query is None:
+        total = n_target * (n_target - 1) / 2
+        compared = sum(len(t) * (len(t) - 1) / 2 for t, _ in blocks)
+    else:
+        total = n_target * n_query
+        compared = sum(len(t) * len(q) for t, q in blocks)
+    return round(1 - compared / total, 6) if total else 0.0
+
+
+def pair_completeness(exact_1, exact_2, blocked_1, blocked_2, unordered: bool = True):
+    """Fraksi pasangan exact (tanpa blocking) yang tetap ditemukan setelah blocking"""
+    if len(exact_1) == 0:
+        return None
+
+    def pair_keys(a, b):
+        if unordered:
+            a, b = np.minimum(a, b), np.maximum(a, b)
+        return a.astype(np.int64) * (2 ** 32) + b.astype(np.int64)
+
+    found = np.isin(pair_keys(exact_1, exact_2), pair_keys(blocked_1, blocked_2))
+    return round(float(found.mean()), 4)
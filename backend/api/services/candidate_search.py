@@ -0,0 +1,314 @@
+import time
+import numpy as np
+import scipy.sparse as sp
+import faiss
+
+
+def _merge_topk(best_sim, best_idx, block_sim, block_idx, k):
+    """Gabungkan top-k berjalan dengan top-k dari blok baru"""
+    sim = np.hstack([best_sim, block_sim])
+    idx = np.hstack([best_idx, block_idx])
+    top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(sim, top, axis=1), np.take_along_axis(idx, top, axis=1)
+
+
+def sparse_topk(X_sparse, k=5, query_chunk_size=2000, target_chunk_size=20000, X_query=None, progress=None):
+    """Cari top-k tetangga terdekat per baris langsung dari matriks CSR TF-IDF.
+
+    Matriks tidak pernah di-densify utuh: hanya blok query x target yang dibuat
+    dense, sehingga memori dibatasi oleh query_chunk_size * target_chunk_size.
+    Baris TF-IDF sudah ter-normalisasi L2, jadi dot product = cosine similarity
+    dan jarak dikembalikan sebagai squared L2 (2 - 2 * cos) agar setara dengan
+    keluaran faiss.IndexFlatL2. Slot kosong bernilai -1.
+
+    Tanpa X_query, X_sparse dicocokkan dengan dirinya sendiri (self match dibuang).
+    Dengan X_query, setiap baris X_query dicari ke X_sparse (mode linkage A->B).
+    progress (JobProgress, opsional) menerima jumlah baris query yang selesai per chunk.
+    """
+    X = sp.csr_matrix(X_sparse, dtype=np.float32)
+    self_match = X_query is None
+    X_q_all = X if self_match else sp.csr_matrix(X_query, dtype=np.float32)
+    n_target = X.shape[0]
+    n_query = X_q_all.shape[0]
+    n_candidates = n_target - 1 if self_match else n_target
+    k = max(1, min(k, n_candidates))
+
+    D = np.full((n_query, k), np.inf, dtype=np.float32)
+    I = np.full((n_query, k), -1, dtype=np.int64)
+    if n_candidates < 1:
+        return D, I
+
+    if progress:
+        progress.start_stage('search', n_query)
+    for q_start in range(0, n_query, query_chunk_size):
+        q_end = min(q_start + query_chunk_size, n_query)
+        X_q = X_q_all[q_start:q_end]
+        best_sim = np.full((q_end - q_start, k), -np.inf, dtype=np.float32)
+        best_idx = np.full((q_end - q_start, k), -1, dtype=np.int64)
+
+        for t_start in range(0, n_target, target_chunk_size):
+            t_end = min(t_start + target_chunk_size, n_target)
+            block = (X_q @ X[t_start:t_end].T).toarray()
+
+            # Buang self match jika rentang query dan target beririsan
+            lo, hi = max(q_start, t_start), min(q_end, t_end)
+            if self_match and lo < hi:
+                rows = np.arange(lo, hi)
+                block[rows - q_start, rows - t_start] = -np.inf
+
+            kk = min(k, t_end - t_start)
+            top = np.argpartition(-block, kk - 1, axis=1)[:, :kk]
+            block_sim = np.take_along_axis(block, top, axis=1)
+            best_sim, best_idx = _merge_topk(best_sim, best_idx, block_sim, top + t_start, k)
+
+        order = np.argsort(-best_sim, axis=1)
+        best_sim = np.take_along_axis(best_sim, order, axis=1)
+        best_idx = np.take_along_axis(best_idx, order, axis=1)
+        best_idx[~np.isfinite(best_sim)] = -1
+
+        D[q_start:q_end] = np.maximum(0.0, 2.0 - 2.0 * best_sim)
+        I[q_start:q_end] = best_idx
+        if progress:
+            progress.update(q_end)
+
+    return D, I
+
+
+def neighbors_to_pairs(D, I, query_offset=0, target_offset=0, drop_self=True):
+    """Ubah matriks tetangga D/I menjadi array pasangan (id_1, id_2, dist).
+
+    id_1 adalah tetangga (target), id_2 adalah baris query. Slot -1 dan self
+    match dibuang dengan masking, tanpa loop Python per sel. Untuk linkage
+    antar tabel, drop_self=False karena id query dan target berasal dari tabel berbeda.
+    """
+    n_query, k = I.shape
+    id_2 = np.repeat(np.arange(query_offset, query_offset + n_query, dtype=np.int64), k)
+    neighbor = I.ravel()
+    dist = D.ravel()
+
+    valid = neighbor != -1
+    id_1 = neighbor[valid].astype(np.int64) + target_offset
+    id_2 = id_2[valid]
+    dist = dist[valid]
+    if not drop_self:
+        return id_1, id_2, dist
+
+    not_self = id_1 != id_2
+    return id_1[not_self], id_2[not_self], dist[not_self]
+
+
+def canonicalize_pairs(id_1, id_2, dist, unordered: bool = True):
+    """Simpan setiap pasangan tepat sekali dengan jarak FAISS terbaik (terkecil).
+
+    unordered=True (self-matching): (i, j) dan (j, i) disatukan menjadi (min, max).
+    unordered=False (linkage): pasangan (sumber, referensi) dipertahankan arahnya.
+    Hasil terurut berdasarkan (id_1, id_2).
+    """
+    if len(id_1) == 0:
+        return id_1, id_2, dist
+    if unordered:
+        id_1, id_2 = np.minimum(id_1, id_2), np.maximum(id_1, id_2)
+    key = id_1.astype(np.int64) * (int(id_2.max()) + 1) + id_2
+    order = np.lexsort((dist, key))
+    sorted_key = key[order]
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = sorted_key[1:] != sorted_key[:-1]
+    keep = order[is_first]
+    return id_1[keep], id_2[keep], dist[keep]
+
+
+def drop_self_matches(D, I, row_ids, k):
+    """Buang self match dari hasil search k+1 dan sisakan k tetangga per baris"""
+    is_self = I == row_ids[:, None]
+    # Baris tanpa self di hasil (mis. banyak duplikat berjarak 0): buang kolom terakhir
+    no_self = ~is_self.any(axis=1)
+    is_self[no_self, -1] = True
+    order = np.argsort(is_self, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+
+
+INDEX_TYPES = ['flat', 'hnsw', 'ivf_flat', 'ivf_pq', 'ivf_sq8']
+
+DEFAULT_INDEX_OPTIONS = {
+    'index_type': 'flat',
+    'train_sample_size': 100000,  # Jumlah baris untuk training IVF / PQ
+    'nlist': None,                # None = otomatis (~4 * sqrt(n))
+    'nprobe': 8,
+    'hnsw_m': 32,
+    'ef_construction': 40,
+    'ef_search': 64,
+    'pq_m': 8,
+    'recall_sample_size': 1000,   # 0 = tidak mengukur recall
+}
+
+# Dimensi vektor TF-IDF (max_features vectorizer matching); pq_m harus membaginya
+VECTOR_DIMENSION = 1000
+
+IVF_INDEX_TYPES = ('ivf_flat', 'ivf_pq', 'ivf_sq8')
+# nbits PQ paling kecil yang dipakai build_faiss_index: codebook 2 ** 1 centroid per sub-vektor
+PQ_MIN_NBITS = 1
+
+
+def min_train_rows(options: dict) -> int:
+    """Jumlah baris training minimum agar index IVF / PQ bisa dilatih FAISS (nlist / 2 ** nbits centroid)"""
+    if options.get('index_type') not in IVF_INDEX_TYPES:
+        return 0
+    rows = options.get('nlist') or 1
+    if options['index_type'] == 'ivf_pq':
+        rows = max(rows, 2 ** PQ_MIN_NBITS)
+    return rows
+
+
+def _largest_divisor_at_most(d, m):
+    """Cari pembagi d terbesar yang <= m (PQ butuh d % m == 0)"""
+    for candidate in range(max(1, m), 0, -1):
+        if d % candidate == 0:
+            return candidate
+    return 1
+
+
+def build_faiss_index(X, options: dict):
+    """Bangun index FAISS sesuai index_type dan latih jika perlu"""
+    n_total, d = X.shape
+    index_type = options['index_type']
+
+    if index_type == 'flat':
+        index = faiss.IndexFlatL2(d)
+    elif index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(d, options['hnsw_m'])
+        index.hnsw.efConstruction = options['ef_construction']
+        index.hnsw.efSearch = options['ef_search']
+    elif index_type in IVF_INDEX_TYPES:
+        n_train = min(n_total, options['train_sample_size'])
+        nlist = options['nlist'] or int(4 * np.sqrt(n_total))
+        nlist = max(1, min(nlist, n_train // 39 or 1))
+        quantizer = faiss.IndexFlatL2(d)
+        if index_type == 'ivf_flat':
+            index = faiss.IndexIVFFlat(quantizer, d, nlist)
+        elif index_type == 'ivf_sq8':
+            index = faiss.IndexIVFScalarQuantizer(quantizer, d, nlist, faiss.ScalarQuantizer.QT_8bit)
+        else:
+            pq_m = _largest_divisor_at_most(d, options['pq_m'])
+            nbits = 8 if n_train >= 256 * 39 else max(1, min(8, int(np.log2(max(2, n_train // 39)))))
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, nbits)
+
+        rng = np.random.default_rng(42)
+        train_rows = np.sort(rng.choice(n_total, n_train, replace=False))
+        index.train(X[train_rows])
+        index.nprobe = min(options['nprobe'], nlist)
+    else:
+        raise ValueError(f"index_type tidak dikenal: {index_type}")
+
+    index.add(X)
+    return index
+
+
+def measure_recall(X, I_approx, k, sample_size=1000, X_query=None):
+    """Ukur recall@k index aproksimasi terhadap exact search pada sampel baris query"""
+    self_match = X_query is None
+    X_query = X if self_match else X_query
+    n_query = X_query.shape[0]
+    sample_size = min(sample_size, n_query)
+    if sample_size == 0 or k == 0:
+        return None
+
+    rng = np.random.default_rng(42)
+    rows = np.sort(rng.choice(n_query, sample_size, replace=False))
+
+    exact = faiss.IndexFlatL2(X.shape[1])
+    exact.add(X)
+    if self_match:
+        D_exact, I_exact = exact.search(X_query[rows], min(k + 1, X.shape[0]))
+        _, I_exact = drop_self_matches(D_exact, I_exact, rows, I_exact.shape[1] - 1)
+    else:
+        _, I_exact = exact.search(X_query[rows], min(k, X.shape[0]))
+
+    I_approx = I_approx[rows, :I_exact.shape[1]]
+    valid = I_exact != -1
+    hits = (I_exact[:, :, None] == I_approx[:, None, :]).any(axis=2) & valid
+    total = valid.sum()
+    return round(float(hits.sum() / total), 4) if total else None
+
+
+def faiss_global_topk(X_dense, k=5, query_chunk_size=5000, index_options: dict = None, X_query=None,
+                      progress=None):
+    """Bangun satu index FAISS untuk seluruh data lalu cari per chunk query.
+
+    Setiap baris melihat top-k global (bukan hanya dalam pasangan chunk).
+    index_options memilih tipe index (flat / hnsw / ivf_flat / ivf_pq / ivf_sq8)
+    beserta parameternya. Untuk index aproksimasi, recall@k diukur terhadap
+    exact search pada sampel baris. Mengembalikan D, I dan dict statistik.
+
+    Dengan X_query, index dibangun dari X_dense (tabel referensi) dan hanya
+    baris X_query yang dicari (mode linkage A->B, tanpa pasangan A-A / B-B).
+    progress (JobProgress, opsional) melaporkan stage 'index' lalu 'search' per chunk query.
+    """
+    options = {**DEFAULT_INDEX_OPTIONS, **(index_options or {})}
+    X = np.ascontiguousarray(X_dense, dtype=np.float32)
+    self_match = X_query is None
+    # Data (mis. satu blok) terlalu kecil untuk melatih IVF / PQ: pakai exact search
+    n_train = min(X.shape[0], options['train_sample_size'])
+    if n_train < min_train_rows({**options, 'nlist': None}):
+        options['index_type'] = 'flat'
+    Q = X if self_match else np.ascontiguousarray(X_query, dtype=np.float32)
+    n_total = Q.shape[0]
+    k_search = min(k + 1, X.shape[0]) if self_match else min(k, X.shape[0])
+
+    if progress:
+        progress.start_stage('index', X.shape[0])
+    t0 = time.perf_counter()
+    index = build_faiss_index(X, options)
+    build_seconds = time.perf_counter() - t0
+
+    D = np.full((n_total, k), np.inf, dtype=np.float32)
+    I = np.full((n_total, k), -1, dtype=np.int64)
+
+    if progress:
+        progress.start_stage('search', n_total)
+    t0 = time.perf_counter()
+    for q_start in range(0, n_total, query_chunk_size):
+        q_end = min(q_start + query_chunk_size, n_total)
+        D_q, I_q = index.search(Q[q_start:q_end], k_search)
+        if self_match:
+            D_q, I_q = drop_self_matches(D_q, I_q, np.arange(q_start, q_end), k_search - 1)
+        D[q_start:q_end, :D_q.shape[1]] = D_q
+        I[q_start:q_end, :I_q.shape[1]] = I_q
+        if progress:
+            progress.update(q_end)
+    search_seconds = time.perf_counter() - t0
+
+    stats = {
+        'index_type': options['index_type'],
+        'index_build_seconds': round(build_seconds, 3),
+        'search_seconds': round(search_seconds, 3),
+    }
+    if options['index_type'] != 'flat' and options['recall_sample_size']:
+        t0 = time.perf_counter()
+        stats['recall_at_k'] = measure_recall(X, I, k, options['recall_sample_size'],
+                                              X_query=None if self_match else Q)
+        stats['recall_seconds'] = round(time.perf_counter() - t0, 3)
+
+    return D, I, stats
+
+
+def sample_exact_pairs(X_target, k=5, sample_size=500, X_query=None):
+    """Pasangan exact top-k (tanpa blocking) untuk sampel baris query, dipakai mengukur pair completeness"""
+    self_match = X_query is None
+    X_query = X_target if self_match else X_query
+    n_query = X_query.shape[0]
+    sample_size = min(sample_size, n_query)
+    if sample_size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    rng = np.random.default_rng(42)
+    rows = np.sort(rng.choice(n_query, sample_size, replace=False))
+    k_search = k + 1 if self_match else k
+    D, I = sparse_topk(X_target, k=k_search, X_query=X_query[rows])
+    if self_match:
+        D, I = drop_self_matches(D, I, rows, I.shape[1] - 1)
+
+    # Self match sudah dibuang drop_self_matches; id lokal sampel tidak boleh dibandingkan dengan id target
+    target_rows, local_rows, _ = neighbors_to_pairs(D, I, drop_self=False)
+    query_rows = rows[local_rows]
+    return target_rows, query_rows
@@ -0,0 +1,351 @@
+import base64
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from api.models import TableProfile
+from api.utils.ingest import ROW_ID_COLUMN
+
+# 2^11 register: standard error ~2.3%, 2 KB per kolom
+HLL_PRECISION = 11
+# Jumlah fungsi hash MinHash: standard error estimasi Jaccard ~1/sqrt(64) = 12.5%
+MINHASH_PERMUTATIONS = 64
+# Overlap isi baru dipercaya penuh jika kolom terkecil punya sebanyak ini nilai unik;
+# kolom flag (L/P, aktif/tidak) hampir selalu overlap penuh tanpa berarti kolomnya sama
+FULL_TRUST_CARDINALITY = 100
+_MINHASH_SEEDS = np.random.default_rng(20251018).integers(0, 2 ** 63, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_EMPTY_MINHASH = np.iinfo(np.uint64).max
+
+VALUE_TYPES = {
+    'numeric': r'[-+]?\d+(?:[.,]\d+)*',
+    'date': r'\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}(?:[ T].*)?',
+    'alpha': r'[^\d]+',
+}
+
+
+class HyperLogLog:
+    """Sketch HyperLogLog untuk estimasi jumlah nilai unik; bisa digabung (merge) antar chunk / upload"""
+
+    def __init__(self, p: int = HLL_PRECISION, registers: np.ndarray = None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8) if registers is None else registers
+
+    def add_hashes(self, hashes):
+        """Tambahkan hash 64-bit (uint64); register = posisi bit 1 pertama pada sisa bit"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if hashes.size == 0:
+            return
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Sisa <= 53 bit sehingga exact di float64; frexp memberi bit_length
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rho = (64 - self.p) - bit_length + 1
+        np.maximum.at(self.registers, idx, rho.astype(np.uint8))
+
+    def merge(self, other: 'HyperLogLog'):
+        self.registers = np.maximum(self.registers, other.registers)
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Koreksi rentang kecil: linear counting
+        if raw <= 2.5 * self.m and zeros:
+            raw = self.m * np.log(self.m / zeros)
+        return int(round(raw))
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.registers.tobytes()).decode()
+
+    @classmethod
+    def from_base64(cls, raw: str, p: int = HLL_PRECISION):
+        return cls(p, np.frombuffer(base64.b64decode(raw), dtype=np.uint8).copy())
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """Finalizer splitmix64 (aritmetika uint64 wrap-around)"""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class MinHash:
+    """Signature MinHash atas himpunan nilai unik kolom; merge = minimum per elemen"""
+
+    def __init__(self, signature: np.ndarray = None):
+        self.signature = np.full(MINHASH_PERMUTATIONS, _EMPTY_MINHASH, dtype=np.uint64) if signature is None else signature
+
+    def add_hashes(self, hashes):
+        hashes = np.unique(np.asarray(hashes, dtype=np.uint64))
+        if hashes.size == 0:
+            return
+        with np.errstate(over='ignore'):
+            for i, seed in enumerate(_MINHASH_SEEDS):
+                self.signature[i] = min(self.signature[i], _mix64(hashes ^ seed).min())
+
+    def merge(self, other: 'MinHash'):
+        self.signature = np.minimum(self.signature, other.signature)
+
+    def jaccard(self, other: 'MinHash') -> float:
+        return float(np.mean(self.signature == other.signature))
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.signature.tobytes()).decode()
+
+    @classmethod
+    def from_base64(cls, raw: str):
+        return cls(np.frombuffer(base64.b64decode(raw), dtype=np.uint64).copy())
+
+
+class ColumnSketch:
+    """Statistik streaming satu kolom: jumlah baris, non-null, panjang string, HLL nilai unik,
+    MinHash nilai ter-normalisasi dan jumlah nilai per tipe (signature tipe nilai)"""
+
+    def __init__(self):
+        self.count = 0
+        self.non_null = 0
+        self.length_sum = 0
+        self.length_min = None
+        self.length_max = None
+        self.hll = HyperLogLog()
+        self.minhash = MinHash()
+        self.value_types = dict.fromkeys([*VALUE_TYPES, 'mixed'], 0)
+
+    def update(self, values: pd.Series):
+        # Nilai dihitung sebagai teks, sama seperti yang tersimpan di tabel upload
+        text = values.dropna().astype(str)
+        self.count += len(values)
+        self.non_null += len(text)
+        if text.empty:
+            return
+        lengths = text.str.len()
+        self.length_sum += int(lengths.sum())
+        self.length_min = int(lengths.min()) if self.length_min is None else min(self.length_min, int(lengths.min()))
+        self.length_max = int(lengths.max()) if self.length_max is None else max(self.length_max, int(lengths.max()))
+        self.hll.add_hashes(pd.util.hash_pandas_object(text, index=False).to_numpy())
+
+        # Nilai dinormalisasi agar 'Jakarta ' dan 'jakarta' dianggap sama antar tabel
+        normalized = text.str.strip().str.lower().str.replace(r'\s+', ' ', regex=True)
+        self.minhash.add_hashes(pd.util.hash_pandas_object(normalized, index=False).to_numpy())
+        remaining = pd.Series(True, index=normalized.index)
+        for value_type, pattern in VALUE_TYPES.items():
+            matched = remaining & normalized.str.fullmatch(pattern)
+            self.value_types[value_type] += int(matched.sum())
+            remaining &= ~matched
+        self.value_types['mixed'] += int(remaining.sum())
+
+    def merge(self, other: 'ColumnSketch'):
+        self.count += other.count
+        self.non_null += other.non_null
+        self.length_sum += other.length_sum
+        mins = [v for v in (self.length_min, other.length_min) if v is not None]
+        maxs = [v for v in (self.length_max, other.length_max) if v is not None]
+        self.length_min = min(mins) if mins else None
+        self.length_max = max(maxs) if maxs else None
+        self.hll.merge(other.hll)
+        if self.minhash is not None and other.minhash is not None:
+            self.minhash.merge(other.minhash)
+        else:
+            self.minhash = None
+        for value_type, count in other.value_types.items():
+            self.value_types[value_type] = self.value_types.get(value_type, 0) + count
+
+    def stats(self):
+        """Metrik yang dipakai rekomendasi kolom (nama sama dengan versi lama)"""
+        return {
+            'null_ratio': self.non_null / self.count if self.count else 0.0,
+            'avg_length': self.length_sum / self.non_null if self.non_null else 0.0,
+            'unique_count': min(self.hll.estimate(), self.non_null),
+            'min_length': self.length_min,
+            'max_length': self.length_max,
+        }
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'non_null': self.non_null,
+            'length_sum': self.length_sum,
+            'length_min': self.length_min,
+            'length_max': self.length_max,
+            'hll': self.hll.to_base64(),
+            'minhash': self.minhash.to_base64() if self.minhash is not None else None,
+            'value_types': self.value_types,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        sketch = cls()
+        sketch.count = data['count']
+        sketch.non_null = data['non_null']
+        sketch.length_sum = data['length_sum']
+        sketch.length_min = data['length_min']
+        sketch.length_max = data['length_max']
+        sketch.hll = HyperLogLog.from_base64(data['hll'])
+        # Profil lama (sebelum MinHash) tidak punya sketch konten
+        sketch.minhash = MinHash.from_base64(data['minhash']) if data.get('minhash') else None
+        sketch.value_types = data.get('value_types') or {}
+        return sketch
+
+    def type_signature(self) -> dict:
+        """Fraksi nilai per tipe (numeric / date / alpha / mixed)"""
+        total = sum(self.value_types.values())
+        return {value_type: count / total for value_type, count in self.value_types.items()} if total else {}
+
+
+def profile_frame(df: pd.DataFrame) -> dict:
+    """Sketch per kolom untuk satu DataFrame (satu upload / satu chunk / satu sampel)"""
+    sketches = {}
+    for column in df.columns:
+        sketch = ColumnSketch()
+        sketch.update(df[column])
+        sketches[str(column)] = sketch
+    return sketches
+
+
+def merge_sketches(sketches: dict, other: dict) -> dict:
+    """Gabungkan sketch per kolom (mis. antar chunk upload) ke dalam sketches"""
+    for column, sketch in other.items():
+        if column in sketches:
+            sketches[column].merge(sketch)
+        else:
+            sketches[column] = sketch
+    return sketches
+
+
+def update_table_profile(table_name: str, df: pd.DataFrame = None, sketches: dict = None, n_rows: int = None,
+                         appended: bool = False):
+    """Gabungkan sketch data yang baru di-upload ke profil tabel (tabel upload bersifat append)
+
+    Berikan df, atau sketches + n_rows yang sudah digabung per chunk oleh ingest streaming.
+    appended=True berarti tabel sudah berisi baris lain; tanpa profil tersimpan, sketch data baru
+    saja tidak mewakili tabel sehingga profil dibangun dari sampel seluruh tabel.
+    """
+    if sketches is None:
+        sketches, n_rows = profile_frame(df), len(df)
+    profile = TableProfile.objects.filter(table_name=table_name).first()
+    if profile is None and appended:
+        return sample_table_profile(table_name)
+    if profile is None:
+        profile = TableProfile(table_name=table_name)
+    else:
+        for column, data in profile.columns.items():
+            existing = ColumnSketch.from_dict(data)
+            if column in sketches:
+                existing.merge(sketches[column])
+            sketches[column] = existing
+
+    profile.row_count += n_rows
+    profile.profiled_rows += n_rows
+    profile.columns = {column: sketch.to_dict() for column, sketch in sketches.items()}
+    profile.save()
+    return profile
+
+
+def _quote_table(table_name: str) -> str:
+    return '"' + table_name.replace('"', '""') + '"'
+
+
+def sample_table_profile(table_name: str, sample_rows: int = None):
+    """Bangun profil dari sampel acak terbatas (TABLESAMPLE BERNOULLI) untuk tabel tanpa profil upload"""
+    sample_rows = sample_rows or settings.COLUMN_PROFILE_SAMPLE_ROWS
+    table_sql = _quote_table(table_name)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {table_sql}')
+        total_rows = cursor.fetchone()[0]
+        if total_rows <= sample_rows:
+            cursor.execute(f'SELECT * FROM {table_sql}')
+        else:
+            # Persentase sedikit dilebihkan agar LIMIT hampir selalu terpenuhi
+            percent = min(100.0, 100.0 * sample_rows * 1.2 / total_rows)
+            cursor.execute(f'SELECT * FROM {table_sql} TABLESAMPLE BERNOULLI (%s) LIMIT %s', [percent, sample_rows])
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+
+    df = pd.DataFrame.from_records(rows, columns=columns).drop(columns=[ROW_ID_COLUMN], errors='ignore')
+    profile, _ = TableProfile.objects.update_or_create(
+        table_name=table_name,
+        defaults={
+            'row_count': total_rows,
+            'profiled_rows': len(df),
+            'is_sample': len(df) < total_rows,
+            'columns': {column: sketch.to_dict() for column, sketch in profile_frame(df).items()},
+        }
+    )
+    print(f"📊 Profil {table_name}: {len(df)} dari {total_rows} baris")
+    return profile
+
+
+def get_table_profile(table_name: str, refresh: bool = False):
+    """Profil tersimpan; dibangun dari sampel jika belum ada atau refresh diminta"""
+    profile = None if refresh else TableProfile.objects.filter(table_name=table_name).first()
+    return profile or sample_table_profile(table_name)
+
+
+def delete_table_profile(table_name: str):
+    TableProfile.objects.filter(table_name=table_name).delete()
+
+
+def recommend_columns(profile: TableProfile, limit: int = 5):
+    """Rekomendasi kolom dari profil (kriteria dan skor sama dengan analisis full table sebelumnya)"""
+    rekomendasi = []
+    for column, data in profile.columns.items():
+        stats = ColumnSketch.from_dict(data).stats()
+        null_ratio, avg_length, unique_count = stats['null_ratio'], stats['avg_length'], stats['unique_count']
+        if null_ratio > 0.8 and avg_length > 3 and unique_count > 10:
+            rekomendasi.append({
+                'column': column,
+                'quality_score': null_ratio * 0.4 + min(avg_length / 20, 1) * 0.3 + min(unique_count / 100, 1) * 0.3,
+                'null_ratio': null_ratio,
+                'avg_length': avg_length,
+                'unique_count': unique_count,
+                'estimated': profile.is_sample,
+            })
+
+    rekomendasi.sort(key=lambda x: x['quality_score'], reverse=True)
+    return rekomendasi[:limit]
+
+
+def content_similarity(sketch_a: ColumnSketch, sketch_b: ColumnSketch):
+    """Kemiripan isi dua kolom dari sketch saja (tanpa membaca data).
+
+    containment = estimasi fraksi nilai unik kolom yang lebih kecil yang juga muncul di kolom
+    lainnya, diturunkan dari Jaccard MinHash dan kardinalitas HLL. Bobot skor isi turun untuk
+    kolom berkardinalitas rendah. Kembalikan None jika salah satu kolom tidak punya sketch konten.
+    """
+    if sketch_a.minhash is None or sketch_b.minhash is None or not sketch_a.non_null or not sketch_b.non_null:
+        return None
+
+    jaccard = sketch_a.minhash.jaccard(sketch_b.minhash)
+    size_a = max(min(sketch_a.hll.estimate(), sketch_a.non_null), 1)
+    size_b = max(min(sketch_b.hll.estimate(), sketch_b.non_null), 1)
+    # |A n B| = J * |A u B| = J * (|A| + |B|) / (1 + J)
+    intersection = jaccard * (size_a + size_b) / (1 + jaccard)
+    containment = min(1.0, intersection / min(size_a, size_b))
+
+    types_a, types_b = sketch_a.type_signature(), sketch_b.type_signature()
+    keys = set(types_a) | set(types_b)
+    type_similarity = 1 - 0.5 * sum(abs(types_a.get(k, 0) - types_b.get(k, 0)) for k in keys) if keys else 0.0
+    cardinality_weight = min(1.0, np.log(max(min(size_a, size_b), 1)) / np.log(FULL_TRUST_CARDINALITY))
+
+    # Dua tabel yang di-link jarang berisi entitas yang sama persis; overlap >= 50% sudah bukti kuat
+    content_score = cardinality_weight * (0.8 * min(1.0, 2 * containment) + 0.2 * type_similarity)
+    return {
+        'jaccard': round(jaccard, 4),
+        'containment': round(containment, 4),
+        'type_similarity': round(type_similarity, 4),
+        'cardinality_weight': round(float(cardinality_weight), 4),
+        'content_score': round(float(content_score), 4),
+    }
+
+
+def mapping_score(name_score: float, content: dict = None) -> float:
+    """Skor mapping gabungan; isi kolom hanya bisa menaikkan skor nama, tidak menurunkannya
+    (kolom bernama sama dengan isi fuzzy / overlap exact kecil tetap terpetakan)"""
+    if content is None:
+        return name_score
+    return max(name_score, name_score * 0.3 + content['content_score'] * 0.7)
+
+
+def column_sketches(profile: TableProfile) -> dict:
+    return {column: ColumnSketch.from_dict(data) for column, data in profile.columns.items()}
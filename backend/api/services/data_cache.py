@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from django.conf import settings
+from django.db import connection
+
+# Naikkan jika format file cache berubah agar entry lama tidak dipakai
+CACHE_FORMAT = 1
+
+
+def cache_enabled() -> bool:
+    return settings.MATCHING_CACHE_MAX_MB > 0
+
+
+def table_version(table_name: str):
+    """Versi tabel dari katalog Postgres: relfilenode (berubah saat TRUNCATE / rewrite) dan
+    counter insert/update/delete pg_stat_user_tables.
+
+    Counter statistik bisa tertunda sekitar satu detik, jadi upload lewat aplikasi juga
+    memanggil invalidate_table. None jika versi tidak bisa ditentukan (cache dilewati).
+    """
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.relfilenode, s.n_tup_ins, s.n_tup_upd, s.n_tup_del
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+                WHERE c.relname = %s AND n.nspname = %s
+                """,
+                [table_name, settings.SUPABASE_DB_SCHEMA]
+            )
+            row = cursor.fetchone()
+    except Exception as e:
+        print(f"⚠️ Tidak bisa membaca versi tabel {table_name}: {e}")
+        return None
+    if row is None:
+        return None
+    return '-'.join(str(value) for value in row)
+
+
+def cache_key(*parts) -> str:
+    """Key content-addressed dari bagian-bagian key (tabel, kolom, versi, parameter TF-IDF, ...)"""
+    raw = json.dumps([CACHE_FORMAT, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def _entry_dir(key: str) -> str:
+    return os.path.join(settings.MATCHING_CACHE_DIR, key)
+
+
+def _hit(key: str, filename: str):
+    """Path file di entry cache jika ada; mtime entry disentuh untuk urutan LRU"""
+    path = os.path.join(_entry_dir(key), filename)
+    if not os.path.exists(path):
+        return None
+    os.utime(_entry_dir(key))
+    return path
+
+
+def _write_entry(key: str, table_name: str, write_fn):
+    """Tulis file ke direktori sementara lalu rename, sehingga entry tidak pernah setengah jadi"""
+    final_dir = _entry_dir(key)
+    if os.path.exists(final_dir):
+        return
+    os.makedirs(settings.MATCHING_CACHE_DIR, exist_ok=True)
+    tmp_dir = os.path.join(settings.MATCHING_CACHE_DIR, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+    try:
+        write_fn(tmp_dir)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump({'table': table_name, 'created': time.time()}, f)
+        os.rename(tmp_dir, final_dir)
+    except OSError:
+        # Entry yang sama sudah ditulis proses lain
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    enforce_size_cap()
+
+
+def load_frame(key: str):
+    """DataFrame hasil prepare_combined_data dari cache, atau None"""
+    if not cache_enabled():
+        return None
+    path = _hit(key, 'frame.pkl')
+    return pd.read_pickle(path) if path else None
+
+
+def save_frame(key: str, df: pd.DataFrame, table_name: str):
+    if cache_enabled():
+        _write_entry(key, table_name, lambda d: df.to_pickle(os.path.join(d, 'frame.pkl')))
+
+
+def load_tfidf(key: str, vectorizer):
+    """Matriks TF-IDF (CSR di atas array mmap) dan vocabulary fitted dari cache.
+
+    vectorizer adalah instance baru yang belum di-fit; vocabulary_ dan idf_ diisi dari cache
+    jika tersedia (None untuk matriks hasil transform). Kembalikan (vectorizer, X) atau (None, None).
+    """
+    if not cache_enabled():
+        return None, None
+    path = _hit(key, 'shape.npy')
+    if path is None:
+        return None, None
+
+    entry = _entry_dir(key)
+    X = sp.csr_matrix(
+        (np.load(os.path.join(entry, 'data.npy'), mmap_mode='r'),
+         np.load(os.path.join(entry, 'indices.npy'), mmap_mode='r'),
+         np.load(os.path.join(entry, 'indptr.npy'), mmap_mode='r')),
+        shape=tuple(np.load(path)),
+        copy=False
+    )
+    vocab_path = os.path.join(entry, 'vocab.npz')
+    if vectorizer is not None and os.path.exists(vocab_path):
+        vocab = np.load(vocab_path)
+        vectorizer.vocabulary_ = dict(zip(vocab['terms'].tolist(), vocab['indices'].tolist()))
+        vectorizer.idf_ = vocab['idf']
+    return vectorizer, X
+
+
+def save_tfidf(key: str, X, table_name: str, vectorizer=None):
+    """Simpan matriks CSR (dan vocabulary jika vectorizer diberikan, yaitu matriks hasil fit)"""
+    if not cache_enabled():
+        return
+    X = sp.csr_matrix(X)
+
+    def write(directory):
+        np.save(os.path.join(directory, 'data.npy'), X.data)
+        np.save(os.path.join(directory, 'indices.npy'), X.indices)
+        np.save(os.path.join(directory, 'indptr.npy'), X.indptr)
+        if vectorizer is not None:
+            terms, indices = zip(*vectorizer.vocabulary_.items()) if vectorizer.vocabulary_ else ((), ())
+            np.savez(os.path.join(directory, 'vocab.npz'), terms=np.array(terms, dtype=str),
+                     indices=np.array(indices, dtype=np.int64), idf=vectorizer.idf_)
+        # shape ditulis terakhir: keberadaannya menandai entry TF-IDF lengkap
+        np.save(os.path.join(directory, 'shape.npy'), np.array(X.shape, dtype=np.int64))
+
+    _write_entry(key, table_name, write)
+
+
+def _entries():
+    """(mtime, size_bytes, path) semua entry cache"""
+    entries = []
+    if not os.path.isdir(settings.MATCHING_CACHE_DIR):
+        return entries
+    for name in os.listdir(settings.MATCHING_CACHE_DIR):
+        path = os.path.join(settings.MATCHING_CACHE_DIR, name)
+        if name.startswith('.') or not os.path.isdir(path):
+            continue
+        size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        entries.append((os.path.getmtime(path), size, path))
+    return entries
+
+
+def enforce_size_cap():
+    """Hapus entry yang paling lama tidak dipakai sampai total ukuran di bawah batas"""
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    limit = settings.MATCHING_CACHE_MAX_MB * 1024 * 1024
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def invalidate_table(table_name: str):
+    """Hapus semua entry cache milik satu tabel (dipanggil setelah upload / hapus tabel)"""
+    for _, _, path in _entries():
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                owner = json.load(f).get('table')
+        except (OSError, ValueError):
+            continue
+        if owner == table_name:
+            shutil.rmtree(path, ignore_errors=True)
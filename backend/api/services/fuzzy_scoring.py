@@ -0,0 +1,47 @@
+import re
+import numpy as np
+from django.conf import settings
+from rapidfuzz import fuzz
+from rapidfuzz.process import cpdist
+
+# Sama persis dengan fuzzywuzzy: asciidammit hanya membuang codepoint 128-255, lalu
+# StringProcessor mengganti setiap \W (underscore tetap dipertahankan) dengan spasi
+_ASCII_DAMMIT = dict.fromkeys(range(128, 256))
+_NON_WORD = re.compile(r"(?ui)\W")
+
+
+def _process_and_sort(value: str) -> str:
+    """Setara fuzzywuzzy fuzz._process_and_sort(force_ascii=True): full_process lalu token diurutkan"""
+    processed = _NON_WORD.sub(" ", value.translate(_ASCII_DAMMIT)).lower().strip()
+    return " ".join(sorted(processed.split()))
+
+
+def batch_token_sort_ratio(strings_1, strings_2, workers: int = None):
+    """Hitung token_sort_ratio untuk semua pasangan sekaligus dengan RapidFuzz.
+
+    Hasilnya sama dengan fuzzywuzzy.fuzz.token_sort_ratio per pasangan
+    (integer 0-100), tetapi dihitung dalam satu panggilan cpdist yang
+    berjalan paralel di semua core (workers=-1).
+    """
+    strings_1, strings_2 = list(strings_1), list(strings_2)
+    if not strings_1:
+        return np.zeros(0, dtype=np.int64)
+
+    workers = settings.MATCHING_FUZZY_WORKERS if workers is None else workers
+    sorted_1 = [_process_and_sort(str(v)) for v in strings_1]
+    sorted_2 = [_process_and_sort(str(v)) for v in strings_2]
+
+    # processor=None: string sudah diproses seperti fuzzywuzzy, ratio RapidFuzz = Levenshtein.ratio
+    scores = cpdist(sorted_1, sorted_2, scorer=fuzz.ratio, processor=None, dtype=np.float64, workers=workers)
+    scores = np.rint(scores).astype(np.int64)
+
+    # Urutan decorator fuzzywuzzy ratio: None = 0, hasil proses identik (termasuk sama-sama kosong) = 100,
+    # salah satu kosong = 0
+    for i, (a, b) in enumerate(zip(sorted_1, sorted_2)):
+        if strings_1[i] is None or strings_2[i] is None:
+            scores[i] = 0
+        elif a == b:
+            scores[i] = 100
+        elif not a or not b:
+            scores[i] = 0
+    return scores
@@ -0,0 +1,152 @@
+import threading
+import time
+from django.conf import settings
+from django.utils import timezone
+from api.models import MatchingJob
+from api.utils.resource_usage import reset_peak_rss, get_peak_rss_mb
+
+MATCHING_STAGES = ['fetch', 'vectorize', 'index', 'search', 'score', 'classify', 'persist']
+
+# Job yang sedang berjalan di proses ini (job_id -> JobProgress); CPU time dan peak RSS diukur per
+# proses, bukan per job
+_active_jobs = {}
+_active_lock = threading.Lock()
+
+
+class JobProgress:
+    """Catat stage, processed/total dan ETA sebuah MatchingJob ke database secara throttled.
+
+    Setiap pergantian stage juga menutup metrik stage sebelumnya (wall time, CPU time,
+    peak RSS, unit diproses). Tanpa job_id tidak ada yang ditulis ke database, sehingga
+    engine tetap bisa dipanggil langsung.
+
+    Batasan: time.process_time() dan VmHWM (di-reset lewat /proc/self/clear_refs) berlaku untuk
+    seluruh proses. Jika beberapa job berjalan bersamaan di satu worker, cpu_seconds dan peak_rss_mb
+    ikut menghitung job lain; concurrent_jobs > 1 pada metrik stage menandai angka yang bercampur.
+    """
+
+    def __init__(self, job_id: str = None, min_interval: float = None):
+        self.job_id = job_id
+        self.min_interval = settings.JOB_PROGRESS_INTERVAL if min_interval is None else min_interval
+        self.stage = None
+        self.processed = 0
+        self.total = None
+        self.stage_started = None
+        self.stage_cpu_started = None
+        self.last_persist = 0.0
+        self.metrics = {}
+        self.stage_concurrency = 1
+
+    def start_stage(self, stage: str, total: int = None):
+        """Mulai stage baru; selalu langsung disimpan"""
+        self._close_stage()
+        self.stage = stage
+        self.processed = 0
+        self.total = total
+        self.stage_concurrency = 1
+        if self.job_id:
+            with _active_lock:
+                _active_jobs[self.job_id] = self
+                # Stage yang sedang berjalan di job lain ikut tercatat bercampur
+                for progress in _active_jobs.values():
+                    progress.stage_concurrency = max(progress.stage_concurrency, len(_active_jobs))
+        # Reset berlaku untuk seluruh proses: peak job lain yang sedang berjalan ikut ter-reset
+        reset_peak_rss()
+        self.stage_started = time.perf_counter()
+        self.stage_cpu_started = time.process_time()
+        self._persist()
+
+    def update(self, processed: int, total: int = None, force: bool = False):
+        """Set jumlah unit yang sudah diproses pada stage ini"""
+        self.processed = processed
+        if total is not None:
+            self.total = total
+        if force or time.perf_counter() - self.last_persist >= self.min_interval:
+            self._persist()
+
+    def advance(self, n: int = 1):
+        self.update(self.processed + n)
+
+    def _close_stage(self):
+        """Simpan metrik stage yang sedang berjalan; stage yang berulang diakumulasi"""
+        if self.stage is None or self.stage_started is None:
+            return
+        current = {
+            'wall_seconds': round(time.perf_counter() - self.stage_started, 3),
+            'cpu_seconds': round(time.process_time() - self.stage_cpu_started, 3),
+            'peak_rss_mb': get_peak_rss_mb(),
+            'processed': self.processed,
+            'total': self.total,
+            'concurrent_jobs': self.stage_concurrency,
+        }
+        previous = self.metrics.get(self.stage)
+        if previous:
+            current = {
+                'wall_seconds': round(previous['wall_seconds'] + current['wall_seconds'], 3),
+                'cpu_seconds': round(previous['cpu_seconds'] + current['cpu_seconds'], 3),
+                'peak_rss_mb': max(previous['peak_rss_mb'], current['peak_rss_mb']),
+                'processed': previous['processed'] + current['processed'],
+                'total': (previous['total'] or 0) + (current['total'] or 0) or None,
+                'concurrent_jobs': max(previous['concurrent_jobs'], current['concurrent_jobs']),
+            }
+        self.metrics[self.stage] = current
+        self.stage_started = None
+
+    def finish(self):
+        """Tutup stage terakhir, simpan metrik semua stage beserta totalnya, kembalikan dict metrik"""
+        self._close_stage()
+        if self.job_id:
+            with _active_lock:
+                _active_jobs.pop(self.job_id, None)
+        stages = self.metrics
+        summary = {
+            'stages': stages,
+            'total': {
+                'wall_seconds': round(sum(m['wall_seconds'] for m in stages.values()), 3),
+                'cpu_seconds': round(sum(m['cpu_seconds'] for m in stages.values()), 3),
+                'peak_rss_mb': max((m['peak_rss_mb'] for m in stages.values()), default=None),
+                'concurrent_jobs': max((m['concurrent_jobs'] for m in stages.values()), default=1),
+            }
+        }
+        if self.job_id:
+            MatchingJob.objects.filter(job_id=self.job_id).update(
+                stage_metrics=summary,
+                release=settings.APP_RELEASE or None
+            )
+        return summary
+
+    def eta_seconds(self):
+        """Perkiraan sisa waktu stage dari laju proses sejauh ini"""
+        if not self.total or not self.processed or self.stage_started is None:
+            return None
+        elapsed = time.perf_counter() - self.stage_started
+        remaining = max(self.total - self.processed, 0)
+        return round(elapsed / self.processed * remaining, 1)
+
+    def _persist(self):
+        self.last_persist = time.perf_counter()
+        if not self.job_id:
+            return
+        MatchingJob.objects.filter(job_id=self.job_id).update(
+            stage=self.stage,
+            stage_processed=self.processed,
+            stage_total=self.total,
+            eta_seconds=self.eta_seconds(),
+            progress_updated_at=timezone.now()
+        )
+
+
+def job_progress_payload(job: MatchingJob):
+    """Bentuk payload progress untuk JobStatusView / SSE"""
+    stage_index = MATCHING_STAGES.index(job.stage) if job.stage in MATCHING_STAGES else None
+    return {
+        'job_id': job.job_id,
+        'status': job.status,
+        'stage': job.stage,
+        'stage_number': stage_index + 1 if stage_index is not None else None,
+        'stage_count': len(MATCHING_STAGES),
+        'processed': job.stage_processed,
+        'total': job.stage_total,
+        'eta_seconds': job.eta_seconds,
+        'updated_at': job.progress_updated_at.isoformat() if job.progress_updated_at else None,
+    }
@@ -1,4 +1,3 @@
-
 import os
 import pandas as pd
 import numpy as np
@@ -10,17 +9,43 @@ from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import log_loss
 from imblearn.over_sampling import SMOTE
+import time
 import uuid
+import json
 from datetime import datetime
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
 from .supabase_service import SupabaseService
+from .fuzzy_scoring import batch_token_sort_ratio
+from .candidate_search import (
+    sparse_topk, faiss_global_topk, neighbors_to_pairs, canonicalize_pairs, sample_exact_pairs, VECTOR_DIMENSION
+)
+from .result_store import write_batch_artifact
+from .batch_summary import save_batch_summary
+from .job_progress import JobProgress
+from .model_registry import model_registry
+from .column_profile import get_table_profile, recommend_columns, column_sketches, content_similarity, mapping_score
+from .data_cache import cache_enabled, table_version, cache_key, load_frame, save_frame, load_tfidf, save_tfidf
+from .blocking import build_block_keys, iter_blocks, blocked_pairs, reduction_ratio, pair_completeness
 from api.models import MatchingResult, LabelingData, MatchingJob
 
 
+def json_safe(value):
+    """Ubah dict statistik (bisa berisi skalar numpy) menjadi nilai yang bisa disimpan di JSONField"""
+    return json.loads(json.dumps(value, default=lambda v: v.item() if hasattr(v, 'item') else str(v)))
+
+
 class MatchingEngine:
     def __init__(self):
         self.supabase_service = SupabaseService()
         self.XGB_MODEL_PATH = "xgb_model_faiss.json"
         self.TRAINING_DATA_PATH = "training_data.json"
+        self.search_stats = {}
+        self.progress = JobProgress()
+        self.model_version = None
+        self.cache_stats = {}
+        self.fetch_stats = {}
         
     def save_job_status(self, job_id: str, table_name: str):
         MatchingJob.objects.create(
@@ -30,50 +55,42 @@ class MatchingEngine:
             start_time=datetime.utcnow()
         )
 
-    def update_job_status(self, job_id: str, status: str):
+    def update_job_status(self, job_id: str, status: str, error: str = None, search_stats: dict = None):
         job = MatchingJob.objects.filter(job_id=job_id).first()
         if job:
             job.status = status
+            job.error = error
+            if search_stats is not None:
+                job.search_stats = json_safe(search_stats)
             job.end_time = datetime.utcnow()
             job.save()
         
-    def get_recommended_columns(self, table_name: str):
-        """Analisis dan rekomendasikan kolom untuk matching"""
+    def get_recommended_columns(self, table_name: str, refresh: bool = False):
+        """Rekomendasikan kolom untuk matching dari profil kolom tersimpan (tanpa download tabel)"""
         try:
-            df = self.supabase_service.get_table_data(table_name)
-            if df.empty:
-                return []
-            
-            rekomendasi = []
-            for col in df.columns:
-                if df[col].dtype == 'object':
-                    # Cek kualitas kolom untuk matching
-                    null_ratio = df[col].notnull().mean()
-                    avg_length = df[col].dropna().astype(str).str.len().mean()
-                    unique_count = df[col].nunique()
-                    
-                    if null_ratio > 0.8 and avg_length > 3 and unique_count > 10:
-                        rekomendasi.append({
-                            'column': col,
-                            'quality_score': null_ratio * 0.4 + min(avg_length/20, 1) * 0.3 + min(unique_count/100, 1) * 0.3,
-                            'null_ratio': null_ratio,
-                            'avg_length': avg_length,
-                            'unique_count': unique_count
-                        })
-            
-            # Sort by quality score
-            rekomendasi.sort(key=lambda x: x['quality_score'], reverse=True)
-            return rekomendasi[:5]  # Return top 5 recommendations
+            return recommend_columns(get_table_profile(table_name, refresh=refresh))
             
         except Exception as e:
             print(f"Error in get_recommended_columns: {e}")
             return []
     
     def recommend_column_mapping(self, table_a: str, table_b: str):
-        """Rekomendasikan mapping kolom antar tabel"""
+        """Rekomendasikan mapping kolom antar tabel dari nama kolom dan isi kolom (sketch profil)
+
+        Skor nama: TF-IDF char + fuzz.ratio seperti sebelumnya. Skor isi: containment nilai
+        (MinHash + HLL) dan kemiripan tipe nilai dari profil tersimpan, sehingga kolom dengan
+        nama berbeda tetapi isi sama (mis. nama_usaha vs merchant) tetap terpetakan.
+        """
         try:
-            cols_a = self.supabase_service.get_table_columns(table_a)
-            cols_b = self.supabase_service.get_table_columns(table_b)
+            try:
+                sketches_a = column_sketches(get_table_profile(table_a))
+                sketches_b = column_sketches(get_table_profile(table_b))
+            except Exception as e:
+                print(f"Profil kolom tidak tersedia, mapping hanya dari nama: {e}")
+                sketches_a, sketches_b = {}, {}
+            
+            cols_a = list(sketches_a) or self.supabase_service.get_table_columns(table_a)
+            cols_b = list(sketches_b) or self.supabase_service.get_table_columns(table_b)
             
             recommendations = []
             
@@ -91,15 +108,21 @@ class MatchingEngine:
                     for j, col_b in enumerate(cols_b):
                         similarity = similarity_matrix[i][j]
                         fuzzy_score = fuzz.ratio(col_a.lower(), col_b.lower())
+                        name_score = similarity * 0.6 + (fuzzy_score / 100) * 0.4
                         
-                        combined_score = similarity * 0.6 + (fuzzy_score / 100) * 0.4
+                        content = None
+                        if col_a in sketches_a and col_b in sketches_b:
+                            content = content_similarity(sketches_a[col_a], sketches_b[col_b])
+                        combined_score = mapping_score(name_score, content)
                         
                         if combined_score > 0.5:  # Threshold untuk rekomendasi
                             recommendations.append({
                                 'column_a': col_a,
                                 'column_b': col_b,
                                 'similarity_score': combined_score,
-                                'fuzzy_score': fuzzy_score
+                                'fuzzy_score': fuzzy_score,
+                                'name_score': name_score,
+                                **(content or {})
                             })
             
             # Sort by similarity score
@@ -110,177 +133,450 @@ class MatchingEngine:
             print(f"Error in recommend_column_mapping: {e}")
             return []
     
-    def prepare_combined_data(self, table_name: str, selected_columns: list):
-        """Gabungkan kolom yang dipilih menjadi combined string"""
+    def prepare_combined_data(self, table_name: str, selected_columns: list, extra_columns: list = None):
+        """Gabungkan kolom yang dipilih menjadi combined string
+
+        extra_columns (mis. kolom blocking) ikut dibawa tetapi tidak masuk combined string.
+        Hasilnya di-cache di disk per (tabel, kolom, versi tabel); key cache disimpan di df.attrs
+        agar TF-IDF dari data yang sama juga bisa diambil dari cache.
+        """
         try:
-            df = self.supabase_service.get_table_data(table_name)
+            extra_columns = [col for col in (extra_columns or []) if col not in selected_columns]
+            version = table_version(table_name) if cache_enabled() else None
+            key = cache_key('prepared', table_name, selected_columns, extra_columns, version) if version else None
+            if key:
+                cached = load_frame(key)
+                if cached is not None:
+                    print(f"📦 Cache hit prepared data {table_name} ({len(cached)} baris)")
+                    self.cache_stats[f"prepared:{table_name}"] = 'hit'
+                    cached.attrs.update(cache_key=key, table_name=table_name)
+                    return cached
+                self.cache_stats[f"prepared:{table_name}"] = 'miss'
+            
+            # Hanya kolom yang dipakai yang diambil; baris dengan NULL di kolom terpilih difilter di server
+            df = self.supabase_service.get_table_data(
+                table_name, columns=selected_columns + extra_columns, not_null=selected_columns
+            )
+            self.fetch_stats[table_name] = self.supabase_service.last_fetch_stats
             if df.empty:
                 return None
             
             # Filter kolom yang dipilih
-            df_selected = df[selected_columns].copy()
+            df_selected = df[selected_columns + extra_columns].copy()
             
             # Bersihkan data
-            df_clean = df_selected.dropna().drop_duplicates().reset_index(drop=True)
+            df_clean = df_selected.dropna(subset=selected_columns).drop_duplicates(subset=selected_columns).reset_index(drop=True)
             
             # Gabungkan kolom menjadi combined string
             df_clean['combined'] = df_clean[selected_columns].astype(str).agg(' '.join, axis=1).str.lower()
             df_clean['table_source'] = table_name
             df_clean['original_index'] = df_clean.index
             
+            if key:
+                save_frame(key, df_clean, table_name)
+                df_clean.attrs.update(cache_key=key, table_name=table_name)
             return df_clean
             
         except Exception as e:
             print(f"Error in prepare_combined_data: {e}")
             return None
     
-    def run_faiss_matching(self, df_combined: pd.DataFrame, batch_id: str, source_table: str, reference_table: str):
-        """Jalankan FAISS matching"""
+    def build_vectorizer(self):
+        """TF-IDF vectorizer karakter yang dipakai semua mode matching"""
+        return TfidfVectorizer(
+            analyzer='char_wb',
+            ngram_range=(2, 4),
+            max_features=VECTOR_DIMENSION,
+            dtype=np.float32
+        )
+    
+    def fit_tfidf(self, df: pd.DataFrame):
+        """Fit TF-IDF pada df['combined'], kembalikan (vectorizer, X, key); dari cache jika ada"""
+        vectorizer = self.build_vectorizer()
+        data_key = df.attrs.get('cache_key')
+        key = cache_key('tfidf', data_key, vectorizer.get_params()) if data_key else None
+        if key:
+            cached_vectorizer, X = load_tfidf(key, vectorizer)
+            if X is not None:
+                self.cache_stats[f"tfidf:{df.attrs['table_name']}"] = 'hit'
+                return cached_vectorizer, X, key
+            self.cache_stats[f"tfidf:{df.attrs['table_name']}"] = 'miss'
+        
+        X = vectorizer.fit_transform(df['combined'])
+        if key:
+            save_tfidf(key, X, df.attrs['table_name'], vectorizer=vectorizer)
+        return vectorizer, X, key
+    
+    def transform_tfidf(self, vectorizer, df: pd.DataFrame, fit_key: str = None):
+        """Transform df['combined'] dengan vocabulary yang sudah di-fit (tabel sumber pada linkage)"""
+        data_key = df.attrs.get('cache_key')
+        key = cache_key('tfidf-transform', data_key, fit_key) if data_key and fit_key else None
+        if key:
+            _, X = load_tfidf(key, None)
+            if X is not None:
+                self.cache_stats[f"tfidf:{df.attrs['table_name']}"] = 'hit'
+                return X
+            self.cache_stats[f"tfidf:{df.attrs['table_name']}"] = 'miss'
+        
+        X = vectorizer.transform(df['combined'])
+        if key:
+            save_tfidf(key, X, df.attrs['table_name'])
+        return X
+    
+    def build_pair_frame(self, df_combined: pd.DataFrame, id_1, id_2, dist, batch_id: str, source_table: str, reference_table: str,
+                         df_reference: pd.DataFrame = None):
+        """Bangun DataFrame pasangan kandidat dari array id/jarak (tanpa iloc per baris)
+
+        Pada mode linkage, id_1 menunjuk ke df_combined (tabel sumber) dan id_2 ke
+        df_reference; keduanya dipetakan ke original_index tabel masing-masing.
+        """
+        df_reference = df_combined if df_reference is None else df_reference
+        self.progress.start_stage('score', len(id_1))
+        combined_1 = df_combined['combined'].to_numpy()[id_1]
+        combined_2 = df_reference['combined'].to_numpy()[id_2]
+        
+        df_pairs = pd.DataFrame({
+            'id_1': df_combined['original_index'].to_numpy()[id_1],
+            'id_2': df_reference['original_index'].to_numpy()[id_2],
+            'combined_1': combined_1,
+            'combined_2': combined_2,
+            'faiss_score': np.round(1 / (1 + dist.astype(np.float64)), 6),
+            'fuzzy_score': batch_token_sort_ratio(combined_1, combined_2),
+        })
+        df_pairs['batch_id'] = batch_id
+        df_pairs['source_table'] = source_table
+        df_pairs['reference_table'] = reference_table
+        self.progress.update(len(id_1), force=True)
+        return df_pairs
+    
+    def make_block_searcher(self, search_mode: str, index_options: dict = None):
+        """Fungsi search top-5 untuk satu blok: (X_target, X_query) -> (D, I)"""
+        block_index_options = {**(index_options or {}), 'recall_sample_size': 0}
+        
+        def search(X_target, X_query=None):
+            if search_mode == 'sparse':
+                return sparse_topk(X_target, k=5, X_query=X_query)
+            D, I, _ = faiss_global_topk(
+                X_target.toarray(), k=5, index_options=block_index_options,
+                X_query=None if X_query is None else X_query.toarray()
+            )
+            return D, I
+        
+        return search
+    
+    def run_blocked_search(self, df_target: pd.DataFrame, X_target, blocking: dict, search_mode: str,
+                           index_options: dict = None, df_query: pd.DataFrame = None, X_query=None):
+        """Search hanya di dalam blok (paralel antar blok), kembalikan (id_1, id_2, dist)
+
+        blocking = {'keys': [{'column': ..., 'method': 'exact' | 'prefix' | 'first_token' | 'soundex',
+        'length': 3, 'column_b': ...}], 'window': None | int (sorted-neighbourhood)}
+        """
+        self_match = df_query is None
+        window = blocking.get('window')
+        
+        if self_match:
+            blocks = iter_blocks(build_block_keys(df_target, blocking['keys']), window=window)
+        else:
+            blocks = iter_blocks(
+                build_block_keys(df_target, blocking['keys'], column_field='column_b'),
+                build_block_keys(df_query, blocking['keys']),
+                window=window
+            )
+        
+        id_1, id_2, dist = blocked_pairs(
+            X_target, blocks, self.make_block_searcher(search_mode, index_options),
+            X_query=X_query, workers=settings.MATCHING_BLOCK_WORKERS, progress=self.progress
+        )
+        
+        # Pair completeness: fraksi pasangan exact top-k (tanpa blocking) yang tetap ditemukan
+        exact_1, exact_2 = sample_exact_pairs(
+            X_target, k=5, sample_size=settings.MATCHING_BLOCKING_SAMPLE, X_query=X_query
+        )
+        self.search_stats['blocking'] = {
+            'blocks': len(blocks),
+            'largest_block': max((len(t) + (0 if self_match else len(q)) for t, q in blocks), default=0),
+            'reduction_ratio': reduction_ratio(blocks, X_target.shape[0], None if self_match else X_query.shape[0]),
+            'pair_completeness': pair_completeness(exact_1, exact_2, id_1, id_2, unordered=self_match),
+        }
+        print(f"🧱 Blocking: {self.search_stats['blocking']}")
+        return id_1, id_2, dist
+    
+    def run_faiss_matching(self, df_combined: pd.DataFrame, batch_id: str, source_table: str, reference_table: str,
+                           search_mode: str = None, sparse_query_chunk: int = None, sparse_target_chunk: int = None,
+                           index_options: dict = None, blocking: dict = None):
+        """Jalankan FAISS matching, hasilnya DataFrame pasangan kandidat
+
+        search_mode:
+            'dense'  - TF-IDF di-densify lalu dicari dengan faiss.IndexFlatL2 per chunk
+            'sparse' - top-k dot product langsung pada matriks CSR, memori dibatasi ukuran chunk
+            'global' - satu index FAISS per job, setiap chunk query dicari ke index tersebut;
+                       tipe index (flat / hnsw / ivf_flat / ivf_pq / ivf_sq8) diatur lewat index_options
+
+        Jika blocking diberikan, search hanya dijalankan di dalam setiap blok.
+        """
         try:
-            print("🚀 Memulai FAISS Matching")
+            search_mode = search_mode or settings.MATCHING_SEARCH_MODE
+            self.search_stats = {'search_mode': search_mode}
+            print(f"🚀 Memulai FAISS Matching (mode: {search_mode})")
             
             # TF-IDF vectorizer
-            vectorizer = TfidfVectorizer(
-                analyzer='char_wb',
-                ngram_range=(2, 4),
-                max_features=1000
-            )
-            X_sparse = vectorizer.fit_transform(df_combined['combined'])
-            X_dense = X_sparse.astype(np.float32).toarray()
-            
-            # FAISS matching
-            results = []
-            chunk_size = 5000
-            n_total = len(df_combined)
-            n_batches = (n_total + chunk_size - 1) // chunk_size
-            
-            for i in range(n_batches):
-                for j in range(i, n_batches):
-                    start_i = i * chunk_size
-                    end_i = min((i + 1) * chunk_size, n_total)
-                    start_j = j * chunk_size
-                    end_j = min((j + 1) * chunk_size, n_total)
-                    
-                    X_i = X_dense[start_i:end_i]
-                    X_j = X_dense[start_j:end_j]
-                    
-                    index = faiss.IndexFlatL2(X_i.shape[1])
-                    index.add(X_i)
-                    D, I = index.search(X_j, 6)
-                    
-                    for k in range(end_j - start_j):
-                        for r in range(1, 6):  # Skip self match
-                            idx_i = I[k][r]
-                            if idx_i == -1 or idx_i >= (end_i - start_i):
-                                continue
-                            
-                            global_i = start_i + idx_i
-                            global_j = start_j + k
-                            
-                            if global_i == global_j:  # Skip self match
-                                continue
-                                
-                            dist = D[k][r]
-                            faiss_score = 1 / (1 + dist)
-                            
-                            fuzzy_score = fuzz.token_sort_ratio(
-                                df_combined.iloc[global_i]['combined'],
-                                df_combined.iloc[global_j]['combined']
-                            )
-                            
-                            results.append({
-                                'id_1': global_i,
-                                'id_2': global_j,
-                                'combined_1': df_combined.iloc[global_i]['combined'],
-                                'combined_2': df_combined.iloc[global_j]['combined'],
-                                'faiss_score': round(faiss_score, 6),
-                                'fuzzy_score': fuzzy_score,
-                                'batch_id': batch_id,
-                                'source_table': source_table,
-                                'reference_table': reference_table
-                            })
+            self.progress.start_stage('vectorize', len(df_combined))
+            _, X_sparse, _ = self.fit_tfidf(df_combined)
+            self.progress.update(len(df_combined), force=True)
+            
+            if blocking:
+                id_1, id_2, dist = self.run_blocked_search(df_combined, X_sparse, blocking, search_mode, index_options)
+            
+            elif search_mode == 'sparse':
+                D, I = sparse_topk(
+                    X_sparse,
+                    k=5,
+                    query_chunk_size=sparse_query_chunk or settings.MATCHING_SPARSE_QUERY_CHUNK,
+                    target_chunk_size=sparse_target_chunk or settings.MATCHING_SPARSE_TARGET_CHUNK,
+                    progress=self.progress
+                )
+                id_1, id_2, dist = neighbors_to_pairs(D, I)
             
-            return results
+            elif search_mode == 'global':
+                X_dense = X_sparse.toarray()
+                D, I, stats = faiss_global_topk(
+                    X_dense, k=5, query_chunk_size=settings.MATCHING_QUERY_CHUNK, index_options=index_options,
+                    progress=self.progress
+                )
+                self.search_stats.update(stats)
+                print(f"⏱️ Index {stats['index_type']}: build {stats['index_build_seconds']}s, "
+                      f"search {stats['search_seconds']}s, recall@5 {stats.get('recall_at_k', '-')}")
+                id_1, id_2, dist = neighbors_to_pairs(D, I)
+            
+            else:
+                X_dense = X_sparse.toarray()
+                
+                # FAISS matching per pasangan chunk
+                pair_parts = []
+                chunk_size = 5000
+                n_total = len(df_combined)
+                n_batches = (n_total + chunk_size - 1) // chunk_size
+                self.progress.start_stage('search', n_batches * (n_batches + 1) // 2)
+                
+                for i in range(n_batches):
+                    for j in range(i, n_batches):
+                        start_i = i * chunk_size
+                        end_i = min((i + 1) * chunk_size, n_total)
+                        start_j = j * chunk_size
+                        end_j = min((j + 1) * chunk_size, n_total)
+                        
+                        X_i = X_dense[start_i:end_i]
+                        X_j = X_dense[start_j:end_j]
+                        
+                        index = faiss.IndexFlatL2(X_i.shape[1])
+                        index.add(X_i)
+                        D, I = index.search(X_j, 6)
+                        
+                        # Kolom pertama dilewati (self match)
+                        pair_parts.append(neighbors_to_pairs(
+                            D[:, 1:], I[:, 1:], query_offset=start_j, target_offset=start_i
+                        ))
+                        self.progress.advance()
+                
+                id_1 = np.concatenate([p[0] for p in pair_parts])
+                id_2 = np.concatenate([p[1] for p in pair_parts])
+                dist = np.concatenate([p[2] for p in pair_parts])
+            
+            # Pair store kanonik: (min, max) dengan skor FAISS terbaik, sehingga setiap
+            # pasangan hanya di-score, diklasifikasi, dan disimpan sekali
+            n_raw = len(id_1)
+            id_1, id_2, dist = canonicalize_pairs(id_1, id_2, dist)
+            self.search_stats['raw_pairs'] = n_raw
+            self.search_stats['candidate_pairs'] = len(id_1)
+            self.search_stats['duplicate_pairs_removed'] = n_raw - len(id_1)
+            
+            return self.build_pair_frame(df_combined, id_1, id_2, dist, batch_id, source_table, reference_table)
             
         except Exception as e:
+            # Search yang gagal harus menggagalkan job, bukan Success dengan 0 pasangan
             print(f"Error in run_faiss_matching: {e}")
-            return []
+            raise
     
-    def run_complete_matching(self, table_a: str, table_b: str, columns_a: list, columns_b: list = None):
-        """Jalankan matching lengkap dengan semua algoritma"""
+    def run_linkage_matching(self, df_source: pd.DataFrame, df_reference: pd.DataFrame, batch_id: str, source_table: str,
+                             reference_table: str, search_mode: str = None, index_options: dict = None,
+                             blocking: dict = None):
+        """Linkage A->B: index tabel referensi sekali, cari setiap baris tabel sumber ke index tersebut
+
+        Hanya pasangan sumber->referensi yang dihasilkan (tidak ada pasangan A-A / B-B).
+        Vocabulary TF-IDF di-fit pada tabel referensi agar index-nya bisa dipakai ulang.
+        """
         try:
-            batch_id = str(uuid.uuid4())
+            search_mode = search_mode or settings.MATCHING_SEARCH_MODE
+            self.search_stats = {'search_mode': search_mode, 'matching_mode': 'linkage'}
+            print(f"🚀 Memulai linkage {source_table} -> {reference_table} (mode: {search_mode})")
+            
+            self.progress.start_stage('vectorize', len(df_reference) + len(df_source))
+            vectorizer, X_reference, fit_key = self.fit_tfidf(df_reference)
+            X_source = self.transform_tfidf(vectorizer, df_source, fit_key)
+            self.progress.update(len(df_reference) + len(df_source), force=True)
+            
+            if blocking:
+                reference_rows, source_rows, dist = self.run_blocked_search(
+                    df_reference, X_reference, blocking, search_mode, index_options,
+                    df_query=df_source, X_query=X_source
+                )
+            
+            elif search_mode == 'sparse':
+                D, I = sparse_topk(
+                    X_reference,
+                    k=5,
+                    query_chunk_size=settings.MATCHING_SPARSE_QUERY_CHUNK,
+                    target_chunk_size=settings.MATCHING_SPARSE_TARGET_CHUNK,
+                    X_query=X_source,
+                    progress=self.progress
+                )
+            else:
+                # 'dense' dan 'global' sama-sama memakai satu index referensi (default flat / exact)
+                D, I, stats = faiss_global_topk(
+                    X_reference.toarray(), k=5, query_chunk_size=settings.MATCHING_QUERY_CHUNK,
+                    index_options=index_options, X_query=X_source.toarray(), progress=self.progress
+                )
+                self.search_stats.update(stats)
+                print(f"⏱️ Index {stats['index_type']}: build {stats['index_build_seconds']}s, "
+                      f"search {stats['search_seconds']}s, recall@5 {stats.get('recall_at_k', '-')}")
+            
+            if not blocking:
+                # I berisi baris referensi per baris sumber
+                reference_rows, source_rows, dist = neighbors_to_pairs(D, I, drop_self=False)
+            
+            # Jendela blocking bisa tumpang tindih: satu pasangan (sumber, referensi) disimpan sekali
+            n_raw = len(source_rows)
+            source_rows, reference_rows, dist = canonicalize_pairs(source_rows, reference_rows, dist, unordered=False)
+            self.search_stats['raw_pairs'] = n_raw
+            self.search_stats['candidate_pairs'] = len(source_rows)
+            self.search_stats['duplicate_pairs_removed'] = n_raw - len(source_rows)
+            
+            return self.build_pair_frame(df_source, source_rows, reference_rows, dist, batch_id, source_table,
+                                         reference_table, df_reference=df_reference)
+            
+        except Exception as e:
+            print(f"Error in run_linkage_matching: {e}")
+            raise
+    
+    def run_complete_matching(self, table_a: str, table_b: str, columns_a: list, columns_b: list = None,
+                              search_mode: str = None, index_options: dict = None, blocking: dict = None,
+                              job_id: str = None):
+        """Jalankan matching lengkap dengan semua algoritma
+
+        Jika job_id diberikan, job_id dipakai sebagai batch_id dan progress per stage
+        dicatat ke MatchingJob tersebut.
+        """
+        batch_id = job_id or str(uuid.uuid4())
+        try:
+            search_mode = search_mode or settings.MATCHING_SEARCH_MODE
+            self.progress = JobProgress(job_id)
+            self.cache_stats = {}
+            self.fetch_stats = {}
+            MatchingJob.objects.filter(job_id=batch_id).update(status='Running')
             
             # Prepare data
-            df_a = self.prepare_combined_data(table_a, columns_a)
+            self.progress.start_stage('fetch')
+            blocking_columns_a = [key['column'] for key in blocking['keys']] if blocking else None
+            blocking_columns_b = [key.get('column_b') or key['column'] for key in blocking['keys']] if blocking else None
+            df_a = self.prepare_combined_data(table_a, columns_a, extra_columns=blocking_columns_a)
             if df_a is None:
-                return {'error': 'Failed to prepare data from table A'}
+                raise ValueError('Failed to prepare data from table A')
             
             # Jika table_b tidak ada, lakukan self-matching
             if table_b is None or table_b == table_a:
-                df_combined = df_a
                 is_self_matching = True
+                self.progress.update(len(df_a), len(df_a), force=True)
+                faiss_results = self.run_faiss_matching(df_a, batch_id, table_a, table_a, search_mode=search_mode,
+                                                        index_options=index_options, blocking=blocking)
             else:
-                df_b = self.prepare_combined_data(table_b, columns_b)
+                # Linkage A->B: table_b adalah tabel referensi yang di-index
+                df_b = self.prepare_combined_data(table_b, columns_b or columns_a, extra_columns=blocking_columns_b)
                 if df_b is None:
-                    return {'error': 'Failed to prepare data from table B'}
-                df_combined = pd.concat([df_a, df_b], ignore_index=True)
+                    raise ValueError('Failed to prepare data from table B')
                 is_self_matching = False
-            
-            # Run matching algorithms
-            faiss_results = self.run_faiss_matching(df_combined, batch_id, table_a, table_b or table_a)
+                self.progress.update(len(df_a) + len(df_b), len(df_a) + len(df_b), force=True)
+                faiss_results = self.run_linkage_matching(df_a, df_b, batch_id, table_a, table_b, search_mode=search_mode,
+                                                          index_options=index_options, blocking=blocking)
             
             # Process results dengan XGBoost jika model tersedia
+            self.progress.start_stage('classify', len(faiss_results))
             processed_results = self.process_matching_results(faiss_results)
             
             # Categorize results
             categorized_results = self.categorize_results(processed_results)
+            self.progress.update(len(faiss_results), force=True)
             
             # Save to database
-            self.save_matching_results(categorized_results, batch_id)
+            persist_stats = self.save_matching_results(categorized_results, batch_id)
+            artifact = write_batch_artifact(categorized_results, batch_id)
+            save_batch_summary(batch_id, categorized_results, model_version=self.model_version)
             
-            self.update_job_status(batch_id, "Success")
+            stage_metrics = self.progress.finish()
             
-            return {
+            peak_rss_mb = stage_metrics['total']['peak_rss_mb']
+            print(f"📈 Peak RSS job {batch_id} ({search_mode}): {peak_rss_mb} MB")
+            for stage, metrics in stage_metrics['stages'].items():
+                print(f"⏱️ {stage}: {metrics['wall_seconds']}s wall, {metrics['cpu_seconds']}s CPU, "
+                      f"{metrics['peak_rss_mb']} MB, {metrics['processed']}/{metrics['total']}")
+            
+            job_stats = {
                 'batch_id': batch_id,
+                'search_mode': search_mode,
+                'is_self_matching': is_self_matching,
+                'search_stats': self.search_stats,
+                'duplicate_pairs_removed': self.search_stats.get('duplicate_pairs_removed', 0),
+                'persist_stats': persist_stats,
+                'artifact': artifact,
+                'peak_rss_mb': peak_rss_mb,
+                'model_version': self.model_version,
+                'cache': self.cache_stats,
+                'fetch': self.fetch_stats,
                 'total_matches': len(categorized_results['matches']),
                 'total_unmatches': len(categorized_results['unmatches']),
                 'total_enriched': len(categorized_results['enriched']),
                 'ambiguous_count': len(categorized_results['ambiguous']),
+            }
+            # Statistik disimpan di job agar bisa dibaca lewat JobStatusView (tugas background tidak punya caller)
+            self.update_job_status(batch_id, "Success", search_stats=job_stats)
+            
+            return {
+                **job_stats,
+                'stage_metrics': stage_metrics,
                 'sample_matches': categorized_results['matches'][:10],
                 'sample_ambiguous': categorized_results['ambiguous'][:10]
             }
             
         except Exception as e:
             print(f"Error in run_complete_matching: {e}")
-            self.update_job_status(batch_id, "Failed")
+            self.progress.finish()
+            # Statistik yang sudah terkumpul tetap disimpan untuk diagnosis
+            self.update_job_status(batch_id, "Failed", error=str(e), search_stats={
+                'search_stats': self.search_stats, 'cache': self.cache_stats, 'fetch': self.fetch_stats
+            })
             return {'error': str(e)}
     
-    def process_matching_results(self, results: list):
+    def process_matching_results(self, results: pd.DataFrame):
         """Process hasil matching dengan XGBoost jika tersedia"""
         try:
-            if not results:
-                return []
-            
             df_results = pd.DataFrame(results)
+            if df_results.empty:
+                return []
             
-            # Load XGBoost model jika ada
+            # Model XGBoost dari registry (di-cache per proses, reload jika file berubah)
             use_model = False
-            if os.path.exists(self.XGB_MODEL_PATH):
-                try:
-                    model = xgb.XGBClassifier()
-                    model.load_model(self.XGB_MODEL_PATH)
-                    df_results['fuzzy_combined'] = df_results['fuzzy_score']
-                    X = df_results[['fuzzy_combined', 'faiss_score']]
-                    proba = model.predict_proba(X)[:, 1]
-                    predictions = model.predict(X)
-                    
+            self.model_version = None
+            try:
+                df_results['fuzzy_combined'] = df_results['fuzzy_score']
+                X = df_results[['fuzzy_combined', 'faiss_score']]
+                proba, predictions, version = model_registry.predict(self.XGB_MODEL_PATH, X)
+                if proba is not None:
                     df_results['confidence'] = proba
                     df_results['predicted'] = predictions
+                    self.model_version = version
                     use_model = True
-                    
-                except Exception as e:
-                    print(f"Error loading XGBoost model: {e}")
+                
+            except Exception as e:
+                print(f"Error loading XGBoost model: {e}")
             
             # Fallback jika model tidak tersedia
             if not use_model:
@@ -297,7 +593,7 @@ class MatchingEngine:
             
         except Exception as e:
             print(f"Error in process_matching_results: {e}")
-            return results
+            return pd.DataFrame(results).to_dict('records')
     
     def categorize_results(self, results: list):
         """Kategorikan hasil matching"""
@@ -325,59 +621,97 @@ class MatchingEngine:
             'ambiguous': ambiguous
         }
     
-    def save_matching_results(self, categorized_results: dict, batch_id: str):
-        """Simpan hasil matching ke database"""
+    @staticmethod
+    def labeling_priority(confidence: float, fuzzy_score: float) -> float:
+        """Prioritas active learning: entropi prediksi model + ketidaksepakatan model vs fuzzy
+
+        Entropi biner maksimum saat confidence = 0.5 (model paling tidak yakin); pasangan
+        yang skor fuzzy-nya bertentangan dengan model memberi information gain tambahan.
+        """
+        p = min(max(float(confidence), 1e-6), 1 - 1e-6)
+        entropy = -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+        disagreement = abs(p - float(fuzzy_score) / 100)
+        return round(float(entropy + 0.5 * disagreement), 6)
+    
+    def bulk_insert(self, model, objects, batch_size: int):
+        """bulk_create per batch dari iterator objek, kembalikan jumlah baris"""
+        total = 0
+        objects = iter(objects)
+        while True:
+            batch = list(islice(objects, batch_size))
+            if not batch:
+                return total
+            model.objects.bulk_create(batch, batch_size=batch_size)
+            total += len(batch)
+    
+    def save_matching_results(self, categorized_results: dict, batch_id: str, batch_size: int = None):
+        """Simpan hasil matching ke database secara bulk dalam satu transaksi"""
+        batch_size = batch_size or settings.MATCHING_SAVE_BATCH_SIZE
         try:
-            # Save matches
-            for result in categorized_results['matches']:
-                MatchingResult.objects.create(
+            start = time.perf_counter()
+            total_expected = sum(len(group) for group in categorized_results.values())
+            # Progress ditulis di luar transaksi agar terlihat oleh koneksi lain
+            self.progress.start_stage('persist', total_expected)
+            
+            def result_objects():
+                for key, status_value in (('matches', 'MATCH'), ('unmatches', 'UNMATCH'), ('enriched', 'ENRICHED')):
+                    for result in categorized_results[key]:
+                        yield MatchingResult(
+                            batch_id=batch_id,
+                            source_table=result['source_table'],
+                            reference_table=result['reference_table'],
+                            matching_algorithm='COMBINED',
+                            id_1=result['id_1'],
+                            id_2=result['id_2'],
+                            faiss_score=result['faiss_score'],
+                            fuzzy_score=result['fuzzy_score'],
+                            predicted=bool(result.get('predicted', 0)),
+                            matched_data=result if settings.MATCHING_STORE_MATCHED_DATA else None,
+                            status=status_value,
+                            confidence_score=result.get('confidence', 0.0)
+                        )
+            
+            # Ambiguous masuk ke tabel labeling
+            labeling_objects = (
+                LabelingData(
+                    data_id=f"{batch_id}_{result['id_1']}_{result['id_2']}",
                     batch_id=batch_id,
+                    combined_string_1=result['combined_1'],
+                    combined_string_2=result['combined_2'],
                     source_table=result['source_table'],
                     reference_table=result['reference_table'],
-                    matching_algorithm='COMBINED',
-                    matched_data=result,
-                    status='MATCH',
-                    confidence_score=result.get('confidence', 0.0)
+                    confidence=result.get('confidence'),
+                    fuzzy_score=result['fuzzy_score'],
+                    faiss_score=result['faiss_score'],
+                    priority=self.labeling_priority(result.get('confidence', 0.5), result['fuzzy_score'])
                 )
+                for result in categorized_results['ambiguous']
+            )
             
-            # Save unmatches
-            for result in categorized_results['unmatches']:
-                MatchingResult.objects.create(
-                    batch_id=batch_id,
-                    source_table=result['source_table'],
-                    reference_table=result['reference_table'],
-                    matching_algorithm='COMBINED',
-                    matched_data=result,
-                    status='UNMATCH',
-                    confidence_score=result.get('confidence', 0.0)
-                )
+            with transaction.atomic():
+                saved_results = self.bulk_insert(MatchingResult, result_objects(), batch_size)
+                saved_labeling = self.bulk_insert(LabelingData, labeling_objects, batch_size)
             
-            # Save enriched
-            for result in categorized_results['enriched']:
-                MatchingResult.objects.create(
-                    batch_id=batch_id,
-                    source_table=result['source_table'],
-                    reference_table=result['reference_table'],
-                    matching_algorithm='COMBINED',
-                    matched_data=result,
-                    status='ENRICHED',
-                    confidence_score=result.get('confidence', 0.0)
-                )
-            
-            # Save ambiguous to labeling table
-            for result in categorized_results['ambiguous']:
-                LabelingData.objects.create(
-                    data_id=f"{batch_id}_{result['id_1']}_{result['id_2']}",
-                    combined_string_1=result['combined_1'],
-                    combined_string_2=result['combined_2'],
-                    source_table=result['source_table'],
-                    reference_table=result['reference_table']
-                )
+            elapsed = time.perf_counter() - start
+            total_rows = saved_results + saved_labeling
+            self.progress.update(total_rows, force=True)
+            rows_per_second = round(total_rows / elapsed, 1) if elapsed > 0 else None
             
             print(f"✅ Saved {len(categorized_results['matches'])} matches, {len(categorized_results['unmatches'])} unmatches, {len(categorized_results['enriched'])} enriched, {len(categorized_results['ambiguous'])} ambiguous")
+            print(f"💾 {total_rows} rows in {elapsed:.2f}s ({rows_per_second} rows/s, batch size {batch_size})")
+            
+            return {
+                'result_rows': saved_results,
+                'labeling_rows': saved_labeling,
+                'seconds': round(elapsed, 3),
+                'rows_per_second': rows_per_second,
+                'batch_size': batch_size
+            }
             
         except Exception as e:
+            # Transaksi sudah di-rollback: job harus gagal, bukan Success dengan batch kosong
             print(f"Error saving matching results: {e}")
+            raise
     
     def train_xgb_from_validasi(self, min_new_samples=10):
         """Training XGBoost dari data validasi user"""
@@ -398,8 +732,9 @@ class MatchingEngine:
             X_list = []
             y_list = []
             
-            for _, row in df_validated.iterrows():
-                fuzzy_score = fuzz.token_sort_ratio(row['combined_string_1'], row['combined_string_2'])
+            fuzzy_scores = batch_token_sort_ratio(df_validated['combined_string_1'], df_validated['combined_string_2'])
+            
+            for fuzzy_score, (_, row) in zip(fuzzy_scores, df_validated.iterrows()):
                 # Simplified faiss score calculation
                 faiss_score = len(set(row['combined_string_1'].split()) & set(row['combined_string_2'].split())) / \
                              len(set(row['combined_string_1'].split()) | set(row['combined_string_2'].split()))
@@ -442,9 +777,8 @@ class MatchingEngine:
             new_logloss = log_loss(y_test, model.predict_proba(X_test))
             
             # Compare with existing model
-            if os.path.exists(self.XGB_MODEL_PATH):
-                old_model = xgb.XGBClassifier()
-                old_model.load_model(self.XGB_MODEL_PATH)
+            old_model, _ = model_registry.get(self.XGB_MODEL_PATH)
+            if old_model is not None:
                 old_loss = log_loss(y_test, old_model.predict_proba(X_test))
                 
                 if new_logloss < old_loss:
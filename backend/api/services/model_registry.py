@@ -0,0 +1,70 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import xgboost as xgb
+
+
+class ModelRegistry:
+    """Cache model XGBoost di memori proses, di-reload otomatis saat file model berubah.
+
+    Perubahan dideteksi dari (mtime_ns, size) file; versi model adalah hash isi file,
+    sehingga file yang ditulis ulang dengan isi sama tetap dianggap versi yang sama.
+    Beberapa versi terakhir disimpan agar reload tidak perlu parsing ulang.
+    """
+
+    def __init__(self, max_versions: int = 3):
+        self.max_versions = max_versions
+        self._lock = threading.Lock()
+        self._current = {}  # path -> (mtime_ns, size, version)
+        self._models = OrderedDict()  # version -> XGBClassifier
+
+    def get(self, path: str):
+        """Kembalikan (model, version) untuk file model, atau (None, None) jika tidak ada"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, None
+
+        with self._lock:
+            cached = self._current.get(path)
+            if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size) and cached[2] in self._models:
+                self._models.move_to_end(cached[2])
+                return self._models[cached[2]], cached[2]
+
+            with open(path, 'rb') as f:
+                raw = f.read()
+            version = hashlib.sha256(raw).hexdigest()[:12]
+
+            if version not in self._models:
+                model = xgb.XGBClassifier()
+                model.load_model(bytearray(raw))
+                self._models[version] = model
+                print(f"🧠 Model {path} dimuat (versi {version})")
+                while len(self._models) > self.max_versions:
+                    self._models.popitem(last=False)
+            self._models.move_to_end(version)
+            self._current[path] = (stat.st_mtime_ns, stat.st_size, version)
+            return self._models[version], version
+
+    def predict(self, path: str, X):
+        """Satu pass predict_proba; prediksi diturunkan dari probabilitas (> 0.5, sama dengan predict)
+
+        Kembalikan (proba, predicted, version), atau (None, None, None) jika model tidak ada.
+        """
+        model, version = self.get(path)
+        if model is None:
+            return None, None, None
+        proba = model.predict_proba(X)[:, 1]
+        return proba, (proba > 0.5).astype(int), version
+
+    def invalidate(self, path: str = None):
+        """Paksa reload pada pemanggilan berikutnya"""
+        with self._lock:
+            if path is None:
+                self._current.clear()
+            else:
+                self._current.pop(path, None)
+
+
+model_registry = ModelRegistry()
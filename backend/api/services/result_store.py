@@ -0,0 +1,56 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+
+ARTIFACT_COLUMNS = [
+    'id_1', 'id_2', 'combined_1', 'combined_2', 'faiss_score', 'fuzzy_score',
+    'confidence', 'predicted', 'ambiguous', 'status'
+]
+
+
+def artifact_path(batch_id: str) -> str:
+    """Lokasi file Parquet hasil satu batch"""
+    return os.path.join(settings.MATCHING_ARTIFACT_DIR, f"{batch_id}.parquet")
+
+
+def write_batch_artifact(categorized_results: dict, batch_id: str):
+    """Tulis seluruh hasil batch (termasuk combined string) sebagai satu file Parquet.
+
+    Kembalikan path file, atau None jika hasil kosong.
+    """
+    frames = []
+    for key, status_value in (('matches', 'MATCH'), ('unmatches', 'UNMATCH'),
+                              ('enriched', 'ENRICHED'), ('ambiguous', 'AMBIGUOUS')):
+        if categorized_results[key]:
+            df = pd.DataFrame(categorized_results[key])
+            df['status'] = status_value
+            frames.append(df.reindex(columns=ARTIFACT_COLUMNS))
+    if not frames:
+        return None
+
+    os.makedirs(settings.MATCHING_ARTIFACT_DIR, exist_ok=True)
+    path = artifact_path(batch_id)
+    table = pa.Table.from_pandas(pd.concat(frames, ignore_index=True), preserve_index=False)
+    pq.write_table(table, path, compression='zstd')
+    return path
+
+
+def read_batch_strings(batch_id: str, status: str = None, id_1_values: list = None) -> pd.DataFrame:
+    """Baca kolom id + combined string dari artifact batch secara lazy (hanya kolom yang dibutuhkan)
+
+    id_1_values membatasi baris yang dibaca, mis. hanya untuk satu halaman hasil.
+    """
+    path = artifact_path(batch_id)
+    if not os.path.exists(path):
+        return None
+
+    filters = []
+    if status:
+        filters.append(('status', '=', status))
+    if id_1_values is not None:
+        filters.append(('id_1', 'in', list(id_1_values)))
+    filters = filters or None
+    table = pq.read_table(path, columns=['id_1', 'id_2', 'combined_1', 'combined_2'], filters=filters)
+    return table.to_pandas()
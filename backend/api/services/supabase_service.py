@@ -1,7 +1,19 @@
-import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 import pandas as pd
 from supabase import create_client, Client
 from django.conf import settings
+from api.utils.ingest import ROW_ID_COLUMN
+
+
+def quote_column(column: str) -> str:
+    """Quote nama kolom untuk parameter PostgREST jika bukan identifier sederhana (spasi, titik, dll)"""
+    if re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', column):
+        return column
+    return '"' + column.replace('"', '\\"') + '"'
+
 
 class SupabaseService:
     def __init__(self):
@@ -9,6 +21,7 @@ class SupabaseService:
             settings.SUPABASE_URL,
             settings.SUPABASE_KEY
         )
+        self.last_fetch_stats = {}
     
     # def create_table_from_dataframe(self, table_name: str, df: pd.DataFrame):
     #     """Buat tabel baru di Supabase dari DataFrame"""
@@ -22,27 +35,158 @@ class SupabaseService:
     #     except Exception as e:
     #         return False, str(e)
     
-    def get_table_data(self, table_name: str, page_size: int = 10000):
-        """Ambil semua data dari tabel Supabase secara bertahap"""
-        all_data = []
-        offset = 0
-        while True:
-            result = self.client.table(table_name).select("*").range(offset, offset + page_size - 1).execute()
-            data = result.data
+    def select_query(self, table_name: str, columns: list = None, not_null: list = None, **select_options):
+        """Query select dengan projection kolom dan filter IS NOT NULL yang dijalankan di server"""
+        select_columns = [quote_column(column) for column in columns] if columns else ["*"]
+        query = self.client.table(table_name).select(*select_columns, **select_options)
+        for column in not_null or []:
+            # Nama kolom di key filter PostgREST tidak di-quote (hanya di-encode URL)
+            query = query.not_.is_(column, "null")
+        return query
+    
+    def count_rows(self, table_name: str, not_null: list = None):
+        """Jumlah baris tabel yang lolos filter (count exact, tanpa mengambil data)"""
+        result = self.select_query(table_name, not_null=not_null, count="exact", head=True).execute()
+        return result.count or 0
+    
+    def order_columns(self, table_name: str, order_by: list = None, columns: list = None):
+        """Kolom urutan stabil untuk paging OFFSET: order_by, kolom 'id' jika ada, atau kolom yang diambil.
+
+        Hanya untuk tabel tanpa ROW_ID_COLUMN (tabel lama / bukan hasil upload); urutan atas semua
+        kolom yang diambil tetap deterministik tetapi setiap range mengurutkan ulang seluruh tabel.
+        """
+        if order_by:
+            return order_by
+        table_columns = self.get_table_columns(table_name)
+        if 'id' in table_columns:
+            return ['id']
+        return columns or table_columns
+    
+    def row_id_bounds(self, table_name: str):
+        """(min, max) ROW_ID_COLUMN lewat index primary key; None jika tabel kosong atau tidak punya kolom itu"""
+        bounds = []
+        try:
+            for desc in (False, True):
+                query = self.client.table(table_name).select(ROW_ID_COLUMN).order(ROW_ID_COLUMN, desc=desc)
+                data = query.limit(1).execute().data
+                if not data:
+                    return None
+                bounds.append(data[0][ROW_ID_COLUMN])
+        except Exception:
+            # Tabel lama / bukan hasil upload: tidak ada kunci baris
+            return None
+        return tuple(bounds)
+    
+    def fetch_range(self, table_name: str, order_columns: list, start: int, end: int, columns: list = None,
+                    not_null: list = None):
+        """Ambil baris [start, end] dengan urutan stabil sebagai dict kolom -> list nilai.
+
+        Jika server membatasi jumlah baris per request (max_rows PostgREST), sisa range
+        diambil dengan request lanjutan sehingga tidak ada baris yang terlewat.
+        """
+        page_columns = {}
+        n_rows = 0
+        while start <= end:
+            query = self.select_query(table_name, columns, not_null)
+            for column in order_columns:
+                query = query.order(quote_column(column))
+            data = query.range(start, end).execute().data
             if not data:
                 break
-            all_data.extend(data)
-            offset += page_size
-            print(f"🔄 Retrieved {len(data)} rows (total so far: {len(all_data)})")
-        return pd.DataFrame(all_data)
+            if not page_columns:
+                page_columns = {column: [] for column in data[0].keys()}
+            for column, values in page_columns.items():
+                values.extend(row.get(column) for row in data)
+            n_rows += len(data)
+            start += len(data)
+        return page_columns, n_rows
+    
+    def fetch_key_range(self, table_name: str, low: int, high: int, columns: list = None, not_null: list = None):
+        """Ambil baris dengan low <= ROW_ID_COLUMN <= high (range scan index, tanpa OFFSET).
+
+        Jika server membatasi jumlah baris per request, request lanjutan mulai dari kunci terakhir + 1.
+        """
+        select_columns = columns + [ROW_ID_COLUMN] if columns else None
+        page_columns = {}
+        n_rows = 0
+        while low <= high:
+            query = self.select_query(table_name, select_columns, not_null)
+            data = query.gte(ROW_ID_COLUMN, low).lte(ROW_ID_COLUMN, high).order(ROW_ID_COLUMN).execute().data
+            if not data:
+                break
+            if not page_columns:
+                page_columns = {column: [] for column in data[0].keys() if column != ROW_ID_COLUMN}
+            for column, values in page_columns.items():
+                values.extend(row.get(column) for row in data)
+            n_rows += len(data)
+            low = data[-1][ROW_ID_COLUMN] + 1
+        return page_columns, n_rows
+    
+    def get_table_data(self, table_name: str, page_size: int = None, workers: int = None, order_by: list = None,
+                       columns: list = None, not_null: list = None):
+        """Ambil semua data tabel Supabase: range paralel dengan urutan stabil, DataFrame dibangun per kolom
+        
+        Tabel upload punya kunci ROW_ID_COLUMN sehingga setiap range adalah range scan index
+        (keyset); tabel lain memakai ORDER BY + OFFSET.
+        columns membatasi kolom yang diambil (projection di server, default semua kolom) dan
+        not_null membuang baris dengan NULL pada kolom tersebut sebelum dikirim.
+        Semua request memakai HTTP client (connection pool) yang sama dari supabase client.
+        Statistik fetch terakhir (rows, pages, seconds, rows_per_second) ada di self.last_fetch_stats.
+        """
+        page_size = page_size or settings.SUPABASE_FETCH_PAGE_SIZE
+        workers = workers or settings.SUPABASE_FETCH_WORKERS
+        start_time = time.perf_counter()
+        
+        # Tabel upload: range kunci [low, high] per page; selain itu OFFSET dengan urutan stabil
+        bounds = None if order_by else self.row_id_bounds(table_name)
+        keyset = bounds is not None
+        if keyset:
+            ranges = [(low, min(low + page_size - 1, bounds[1])) for low in range(bounds[0], bounds[1] + 1, page_size)]
+            fetch = lambda r: self.fetch_key_range(table_name, *r, columns=columns, not_null=not_null)
+        else:
+            total_rows = self.count_rows(table_name, not_null)
+            if total_rows == 0:
+                self.last_fetch_stats = {'rows': 0, 'pages': 0, 'seconds': 0.0, 'rows_per_second': None}
+                return pd.DataFrame()
+            order_columns = self.order_columns(table_name, order_by, columns)
+            ranges = [(offset, min(offset + page_size, total_rows) - 1) for offset in range(0, total_rows, page_size)]
+            fetch = lambda r: self.fetch_range(table_name, order_columns, *r, columns=columns, not_null=not_null)
+        
+        # executor.map mengembalikan hasil sesuai urutan range, bukan urutan selesai
+        column_parts = {}
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(ranges)))) as executor:
+            for page_columns, n_rows in executor.map(fetch, ranges):
+                for column, values in page_columns.items():
+                    column_parts.setdefault(column, []).append(values)
+                fetched += n_rows
+        
+        df = pd.DataFrame({
+            column: pd.Series(list(chain.from_iterable(parts)))
+            for column, parts in column_parts.items()
+        })
+        
+        elapsed = time.perf_counter() - start_time
+        self.last_fetch_stats = {
+            'rows': fetched,
+            'columns': len(df.columns),
+            'pages': len(ranges),
+            'paging': 'keyset' if keyset else 'offset',
+            'workers': workers,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(fetched / elapsed, 1) if elapsed > 0 else None,
+        }
+        print(f"🔄 Retrieved {fetched} rows dari {table_name} dalam {elapsed:.2f}s "
+              f"({self.last_fetch_stats['rows_per_second']} rows/s, {len(ranges)} range, {workers} worker)")
+        return df
 
     
     def get_table_columns(self, table_name: str):
-        """Ambil nama kolom dari tabel"""
+        """Ambil nama kolom dari tabel (tanpa kunci baris internal upload)"""
         try:
             result = self.client.table(f"{table_name}").select("*").limit(1).execute()
             if result.data:
-                return list(result.data[0].keys())
+                return [column for column in result.data[0].keys() if column != ROW_ID_COLUMN]
             return []
         except Exception as e:
             print(f"Error getting table columns: {e}")
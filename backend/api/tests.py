@@ -1,3 +1,1123 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from fuzzywuzzy import fuzz
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import MatchingJob, MatchingResult, LabelingData, BatchSummary, TableProfile, UploadJob, DataTable
+from api.services.batch_summary import save_batch_summary, refresh_batch_summary, record_label_change, overall_stats
+from api.services.candidate_search import (
+    sparse_topk, neighbors_to_pairs, canonicalize_pairs, faiss_global_topk, measure_recall, sample_exact_pairs
+)
+from api.services.blocking import (
+    soundex, build_block_keys, iter_blocks, blocked_pairs, reduction_ratio, pair_completeness
+)
+from api.services.fuzzy_scoring import batch_token_sort_ratio
+from api.services.supabase_service import SupabaseService
+from api.services.data_cache import cache_key, load_frame, save_frame, load_tfidf, save_tfidf, invalidate_table
+from api.services.column_profile import profile_frame, content_similarity, update_table_profile
+from api.services.match_engine import MatchingEngine
+from api.services.model_registry import ModelRegistry
+from api.services.job_progress import JobProgress, job_progress_payload
+from api.utils.ingest import copy_chunk, iter_file_chunks, ingest_file
+from api.utils.type_inference import SchemaInference, matches_type
+from api.utils.Upload_handler import process_upload_job
+from api.views import (
+    StartMatchingView, JobStatusView, GetMatchingResultsView, LabelingQueueView, SubmitLabelingView,
+    UploadJobStatusView, parse_index_options, upload_file, job_progress_events, job_progress_stream
+)
+
+
+def _mapping(frames):
+    """recommend_column_mapping dengan profil dari DataFrame sintetis (tanpa database / Supabase)"""
+    with mock.patch('api.services.match_engine.SupabaseService'), \
+            mock.patch('api.services.match_engine.get_table_profile', side_effect=lambda table: table), \
+            mock.patch('api.services.match_engine.column_sketches', side_effect=lambda table: profile_frame(frames[table])):
+        return MatchingEngine().recommend_column_mapping('a', 'b')
+
+
+class ColumnMappingTests(SimpleTestCase):
+    def setUp(self):
+        n = 400
+        self.frames = {
+            'a': pd.DataFrame({
+                'nama_usaha': [f"toko sumber rejeki {i}" for i in range(n)],
+                'status': ['aktif' if i % 3 else 'tidak' for i in range(n)],
+            }),
+            'b': pd.DataFrame({
+                # Nama ditulis sedikit berbeda: hampir tidak ada nilai yang sama persis
+                'nama_usaha': [f"tk sumber rejeki {i}" if i % 10 else f"toko sumber rejeki {i}" for i in range(n)],
+                'flag': ['tidak' if i % 4 else 'aktif' for i in range(n)],
+                'merchant': [f"toko sumber rejeki {i}" for i in range(n // 2, n + n // 2)],
+            }),
+        }
+
+    def test_low_cardinality_overlap_is_discounted(self):
+        sketches_a, sketches_b = profile_frame(self.frames['a']), profile_frame(self.frames['b'])
+        content = content_similarity(sketches_a['status'], sketches_b['flag'])
+        self.assertGreaterEqual(content['containment'], 0.9)
+        self.assertLess(content['content_score'], 0.3)
+
+        pairs = {(r['column_a'], r['column_b']) for r in _mapping(self.frames)}
+        self.assertNotIn(('status', 'flag'), pairs)
+
+    def test_same_name_with_fuzzy_content_is_kept(self):
+        recommendations = _mapping(self.frames)
+        same_name = next(r for r in recommendations if (r['column_a'], r['column_b']) == ('nama_usaha', 'nama_usaha'))
+        self.assertLess(same_name['content_score'], 0.5)
+        self.assertGreaterEqual(same_name['similarity_score'], same_name['name_score'])
+        self.assertEqual(recommendations[0]['column_b'], 'nama_usaha')
+
+    def test_different_name_with_shared_content_is_mapped(self):
+        pairs = {(r['column_a'], r['column_b']) for r in _mapping(self.frames)}
+        self.assertIn(('nama_usaha', 'merchant'), pairs)
+
+
+class IndexOptionsTests(SimpleTestCase):
+    def post(self, data):
+        request = APIRequestFactory().post('/start-matching/', data, format='json')
+        return StartMatchingView.as_view()(request)
+
+    def test_zero_values_are_rejected(self):
+        for key in ('nprobe', 'ef_search', 'ef_construction', 'hnsw_m', 'pq_m', 'nlist', 'train_sample_size'):
+            options, error = parse_index_options({key: 0})
+            self.assertIsNone(options, key)
+            self.assertIn('>= 1', error)
+        self.assertEqual(parse_index_options({'recall_sample_size': 0}), ({'recall_sample_size': 0}, None))
+
+    def test_pq_m_must_divide_dimension(self):
+        self.assertIsNone(parse_index_options({'pq_m': 7})[0])
+        self.assertEqual(parse_index_options({'pq_m': 8}), ({'pq_m': 8}, None))
+
+    def test_train_sample_smaller_than_centroids_is_rejected(self):
+        self.assertIn('>= 2', parse_index_options({'index_type': 'ivf_pq', 'train_sample_size': 1})[1])
+        self.assertIn('>= 64', parse_index_options({'index_type': 'ivf_flat', 'nlist': 64, 'train_sample_size': 10})[1])
+        self.assertEqual(parse_index_options({'index_type': 'ivf_pq', 'train_sample_size': 2})[1], None)
+
+    def test_index_options_rejected_for_modes_that_ignore_them(self):
+        body = {'table_a': 'a', 'columns_a': ['nama'], 'index_options': {'index_type': 'hnsw'}}
+        self.assertEqual(self.post({**body, 'search_mode': 'sparse'}).status_code, 400)
+        self.assertEqual(self.post({**body, 'search_mode': 'dense'}).status_code, 400)
+
+
+class PersistFailureTests(TestCase):
+    def test_failed_insert_marks_job_failed_without_artifact(self):
+        with mock.patch('api.services.match_engine.SupabaseService'):
+            engine = MatchingEngine()
+        engine.save_job_status('job-1', 'a')
+        categorized = {'matches': [], 'unmatches': [], 'enriched': [], 'ambiguous': []}
+
+        with mock.patch.object(engine, 'prepare_combined_data', return_value=pd.DataFrame({'combined': ['x']})), \
+                mock.patch.object(engine, 'run_faiss_matching', return_value=[]), \
+                mock.patch.object(engine, 'categorize_results', return_value=categorized), \
+                mock.patch.object(engine, 'bulk_insert', side_effect=RuntimeError('disk full')), \
+                mock.patch('api.services.match_engine.write_batch_artifact') as write_artifact, \
+                mock.patch('api.services.match_engine.save_batch_summary') as save_summary:
+            result = engine.run_complete_matching('a', None, ['nama'], None, job_id='job-1')
+
+        self.assertEqual(result, {'error': 'disk full'})
+        self.assertEqual(MatchingJob.objects.get(job_id='job-1').status, 'Failed')
+        write_artifact.assert_not_called()
+        save_summary.assert_not_called()
+
+
+class FailedSearchTests(TestCase):
+    def test_search_error_marks_job_failed_with_message(self):
+        with mock.patch('api.services.match_engine.SupabaseService'):
+            engine = MatchingEngine()
+        engine.save_job_status('job-1', 'a')
+
+        with mock.patch.object(engine, 'prepare_combined_data', return_value=pd.DataFrame({'combined': ['x']})), \
+                mock.patch.object(engine, 'fit_tfidf', side_effect=RuntimeError('training failed')):
+            result = engine.run_complete_matching('a', None, ['nama'], None, job_id='job-1')
+
+        job = MatchingJob.objects.get(job_id='job-1')
+        self.assertEqual(result, {'error': 'training failed'})
+        self.assertEqual((job.status, job.error), ('Failed', 'training failed'))
+        self.assertFalse(MatchingResult.objects.filter(batch_id='job-1').exists())
+
+
+class JobStatsTests(TestCase):
+    def test_run_stats_are_saved_on_job_and_returned_by_status_view(self):
+        with mock.patch('api.services.match_engine.SupabaseService'):
+            engine = MatchingEngine()
+        engine.save_job_status('job-1', 'a')
+        names = ['toko jaya', 'toko jaya abadi', 'warung sari', 'warung sarii', 'apotek sehat', 'apotek sehat 2']
+        df = pd.DataFrame({'nama': names, 'combined': names, 'original_index': range(len(names))})
+
+        with mock.patch.object(engine, 'prepare_combined_data', return_value=df), \
+                mock.patch('api.services.match_engine.write_batch_artifact', return_value={'rows': 0}):
+            result = engine.run_complete_matching('a', None, ['nama'], None, search_mode='sparse', job_id='job-1')
+
+        stats = MatchingJob.objects.get(job_id='job-1').search_stats
+        self.assertEqual(stats['search_stats']['candidate_pairs'], result['search_stats']['candidate_pairs'])
+        self.assertEqual(stats['duplicate_pairs_removed'], result['duplicate_pairs_removed'])
+        self.assertIn('rows_per_second', stats['persist_stats'])
+        self.assertNotIn('sample_matches', stats)
+
+        response = JobStatusView.as_view()(APIRequestFactory().get('/job-status/job-1/'), job_id='job-1')
+        self.assertEqual(response.data['search_stats'], stats)
+
+
+def _sse_events(chunks):
+    """[(event, data)] dari potongan text/event-stream; komentar keep-alive dilewati"""
+    events = []
+    for chunk in chunks:
+        if chunk.startswith(':'):
+            continue
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class JobProgressTests(TestCase):
+    def setUp(self):
+        MatchingJob.objects.create(job_id='job-1', table_name='t', status='Running')
+
+    def job(self):
+        return MatchingJob.objects.get(job_id='job-1')
+
+    def test_stage_transitions_are_persisted_and_updates_throttled(self):
+        progress = JobProgress('job-1', min_interval=3600)
+        progress.start_stage('fetch', 10)
+        self.assertEqual((self.job().stage, self.job().stage_processed, self.job().stage_total), ('fetch', 0, 10))
+
+        progress.update(5)
+        self.assertEqual(self.job().stage_processed, 0)
+        progress.update(7, force=True)
+        self.assertEqual(self.job().stage_processed, 7)
+
+        progress.start_stage('search', 4)
+        progress.advance(2)
+        job = self.job()
+        self.assertEqual((job.stage, job.stage_processed, job.stage_total), ('search', 0, 4))
+        self.assertEqual(progress.metrics['fetch']['processed'], 7)
+        payload = job_progress_payload(job)
+        self.assertEqual((payload['stage_number'], payload['stage_count']), (4, 7))
+
+    def test_without_job_id_nothing_is_written(self):
+        progress = JobProgress(min_interval=0)
+        progress.start_stage('fetch', 3)
+        progress.update(3)
+        self.assertEqual(progress.finish()['stages']['fetch']['processed'], 3)
+        self.assertIsNone(self.job().stage)
+
+    @override_settings(APP_RELEASE='v1.2.3')
+    def test_finish_persists_stage_metrics_and_release(self):
+        progress = JobProgress('job-1', min_interval=0)
+        progress.start_stage('fetch', 10)
+        progress.update(10)
+        progress.start_stage('search', 4)
+        progress.update(4)
+        summary = progress.finish()
+
+        job = self.job()
+        self.assertEqual(job.stage_metrics, json.loads(json.dumps(summary)))
+        self.assertEqual(job.release, 'v1.2.3')
+        self.assertEqual(set(job.stage_metrics['stages']), {'fetch', 'search'})
+        fetch = job.stage_metrics['stages']['fetch']
+        self.assertEqual((fetch['processed'], fetch['total'], fetch['concurrent_jobs']), (10, 10, 1))
+        for key in ('wall_seconds', 'cpu_seconds', 'peak_rss_mb', 'concurrent_jobs'):
+            self.assertIn(key, job.stage_metrics['total'])
+
+    def test_overlapping_jobs_in_one_process_are_flagged(self):
+        MatchingJob.objects.create(job_id='job-2', table_name='t', status='Running')
+        first, second = JobProgress('job-1'), JobProgress('job-2')
+        first.start_stage('fetch', 1)
+        second.start_stage('fetch', 1)
+        self.assertEqual(second.finish()['stages']['fetch']['concurrent_jobs'], 2)
+        self.assertEqual(first.finish()['total']['concurrent_jobs'], 2)
+
+        # Setelah kedua job selesai, job berikutnya kembali diukur sendirian
+        third = JobProgress('job-1')
+        third.start_stage('fetch', 1)
+        self.assertEqual(third.finish()['stages']['fetch']['concurrent_jobs'], 1)
+
+    def test_event_stream_sends_changes_until_the_job_finishes(self):
+        JobProgress('job-1').start_stage('search', 4)
+        steps = iter([
+            lambda: None,
+            lambda: MatchingJob.objects.filter(job_id='job-1').update(stage_processed=4),
+            lambda: MatchingJob.objects.filter(job_id='job-1').update(status='Success'),
+        ])
+        with mock.patch('api.views.time.sleep', side_effect=lambda _: next(steps)()):
+            chunks = list(job_progress_events('job-1'))
+
+        self.assertIn(': keep-alive\n\n', chunks)
+        events = _sse_events(chunks)
+        self.assertEqual([name for name, _ in events], ['progress', 'progress', 'progress', 'done'])
+        self.assertEqual([data['processed'] for _, data in events], [0, 4, 4, 4])
+        self.assertEqual(events[-1][1]['status'], 'Success')
+
+    def test_event_stream_for_unknown_job(self):
+        self.assertEqual(_sse_events(job_progress_events('missing')), [('error', {'error': 'Job not found'})])
+
+    def test_stream_view_is_event_stream(self):
+        response = job_progress_stream(APIRequestFactory().get('/job-progress/job-1/stream/'), 'job-1')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+
+def _save_model(path, seed, n_estimators):
+    """Latih XGBClassifier kecil dan simpan ke path (isi file berbeda untuk seed / n_estimators berbeda)"""
+    import xgboost as xgb
+    rng = np.random.default_rng(seed)
+    X = rng.random((60, 3))
+    model = xgb.XGBClassifier(n_estimators=n_estimators, max_depth=2)
+    model.fit(X, (X[:, 0] > 0.5).astype(int))
+    model.save_model(path)
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'model.json')
+        self.registry = ModelRegistry(max_versions=2)
+
+    def test_missing_file(self):
+        self.assertEqual(self.registry.get(os.path.join(self.tmp, 'missing.json')), (None, None))
+        self.assertEqual(self.registry.predict(os.path.join(self.tmp, 'missing.json'), np.zeros((1, 3))),
+                         (None, None, None))
+
+    def test_rewritten_model_file_is_reloaded_with_new_version(self):
+        _save_model(self.path, seed=0, n_estimators=3)
+        model, version = self.registry.get(self.path)
+        self.assertIsNotNone(model)
+        # File tidak berubah: model yang sama dari cache, tanpa membaca file lagi
+        with mock.patch('builtins.open', side_effect=AssertionError('file dibaca ulang')):
+            self.assertIs(self.registry.get(self.path)[0], model)
+
+        _save_model(self.path, seed=1, n_estimators=5)
+        new_model, new_version = self.registry.get(self.path)
+        self.assertNotEqual(new_version, version)
+        self.assertIsNot(new_model, model)
+        self.assertEqual(self.registry.predict(self.path, np.zeros((2, 3)))[2], new_version)
+
+    def test_touched_file_with_same_content_keeps_version(self):
+        _save_model(self.path, seed=0, n_estimators=3)
+        model, version = self.registry.get(self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.registry.get(self.path), (model, version))
+
+
+class DataCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        override = override_settings(MATCHING_CACHE_DIR=self.cache_dir, MATCHING_CACHE_MAX_MB=1)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_table_version_change_misses_prepared_cache(self):
+        with mock.patch('api.services.match_engine.SupabaseService'):
+            engine = MatchingEngine()
+        fetch = engine.supabase_service.get_table_data
+        fetch.return_value = pd.DataFrame({'nama': ['Toko A', 'Toko B']})
+        engine.supabase_service.last_fetch_stats = {}
+
+        with mock.patch('api.services.match_engine.table_version', return_value='1-10-0-0'):
+            first = engine.prepare_combined_data('t', ['nama'])
+            cached = engine.prepare_combined_data('t', ['nama'])
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(engine.cache_stats['prepared:t'], 'hit')
+        self.assertEqual(cached.attrs['cache_key'], first.attrs['cache_key'])
+
+        fetch.return_value = pd.DataFrame({'nama': ['Toko A', 'Toko B', 'Toko C']})
+        with mock.patch('api.services.match_engine.table_version', return_value='1-11-0-0'):
+            changed = engine.prepare_combined_data('t', ['nama'])
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(engine.cache_stats['prepared:t'], 'miss')
+        self.assertNotEqual(changed.attrs['cache_key'], first.attrs['cache_key'])
+        self.assertEqual(len(changed), 3)
+
+        invalidate_table('t')
+        self.assertIsNone(load_frame(changed.attrs['cache_key']))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        # Tiap entry sekitar 0.4 MB: entry ketiga melewati batas 1 MB
+        frame = pd.DataFrame({'x': np.arange(50000, dtype=np.float64)})
+        keys = [cache_key('lru', name) for name in 'abc']
+        now = time.time()
+        save_frame(keys[0], frame, 't')
+        save_frame(keys[1], frame, 't')
+        os.utime(os.path.join(self.cache_dir, keys[0]), (now - 200, now - 200))
+        os.utime(os.path.join(self.cache_dir, keys[1]), (now - 100, now - 100))
+
+        # Cache hit menyentuh mtime: entry pertama menjadi yang terbaru dipakai
+        self.assertIsNotNone(load_frame(keys[0]))
+        save_frame(keys[2], frame, 't')
+
+        self.assertIsNone(load_frame(keys[1]))
+        self.assertIsNotNone(load_frame(keys[0]))
+        self.assertIsNotNone(load_frame(keys[2]))
+
+    def test_tfidf_round_trip_is_memory_mapped(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        texts = ['toko sumber rejeki', 'warung makan sederhana', 'toko sumber makmur']
+        vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 3), dtype=np.float32)
+        X = vectorizer.fit_transform(texts)
+        save_tfidf('fit', X, 't', vectorizer=vectorizer)
+        save_tfidf('transform', X[:2], 't')
+
+        loaded, X_cached = load_tfidf('fit', TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 3), dtype=np.float32))
+        # Array read-only dari np.load(mmap_mode='r'), bukan salinan di memori
+        for array in (X_cached.data, X_cached.indices, X_cached.indptr):
+            self.assertFalse(array.flags.writeable)
+        self.assertEqual(X_cached.shape, X.shape)
+        self.assertEqual(abs(X_cached - X).nnz, 0)
+        self.assertEqual(loaded.vocabulary_, vectorizer.vocabulary_)
+        np.testing.assert_array_equal(loaded.idf_, vectorizer.idf_)
+        self.assertEqual(abs(loaded.transform(['toko baru']) - vectorizer.transform(['toko baru'])).nnz, 0)
+
+        # Matriks hasil transform tidak membawa vocabulary
+        self.assertEqual(load_tfidf('transform', None)[1].shape, (2, X.shape[1]))
+        self.assertEqual(load_tfidf('missing', None), (None, None))
+
+
+class BatchSummaryTests(TestCase):
+    def setUp(self):
+        self.categorized = {
+            'matches': [{'confidence': 0.95, 'fuzzy_score': 92}, {'confidence': 0.85, 'fuzzy_score': 88}],
+            'unmatches': [{'confidence': 0.05, 'fuzzy_score': 20}],
+            'enriched': [],
+            'ambiguous': [{'confidence': 0.5, 'fuzzy_score': 60}],
+        }
+        for status_value, key in (('MATCH', 'matches'), ('UNMATCH', 'unmatches')):
+            for i, result in enumerate(self.categorized[key]):
+                MatchingResult.objects.create(
+                    batch_id='b1', source_table='t', reference_table='t', matching_algorithm='COMBINED',
+                    id_1=i, id_2=i + 10, status=status_value, confidence_score=result['confidence'],
+                    fuzzy_score=result['fuzzy_score'], faiss_score=0.1
+                )
+        self.ambiguous = LabelingData.objects.create(
+            data_id='b1_7_8', batch_id='b1', combined_string_1='a', combined_string_2='b',
+            source_table='t', reference_table='t'
+        )
+
+    def test_save_and_refresh_build_the_same_histograms(self):
+        save_batch_summary('b1', self.categorized)
+        saved = BatchSummary.objects.get(batch_id='b1')
+        refreshed = refresh_batch_summary('b1')
+        self.assertEqual(saved.confidence_histogram, refreshed.confidence_histogram)
+        self.assertEqual(saved.fuzzy_histogram, refreshed.fuzzy_histogram)
+        self.assertEqual(sum(b['count'] for b in refreshed.confidence_histogram), 3)
+
+    def test_label_on_row_without_batch_id_updates_its_summary(self):
+        save_batch_summary('b1', self.categorized)
+        legacy = LabelingData.objects.create(
+            data_id='b1_3_4', combined_string_1='a', combined_string_2='b', source_table='t', reference_table='t'
+        )
+        legacy.label = 'MATCH'
+        legacy.save()
+        record_label_change(legacy, None, 'MATCH')
+
+        summary = BatchSummary.objects.get(batch_id='b1')
+        self.assertEqual(LabelingData.objects.get(pk=legacy.pk).batch_id, 'b1')
+        self.assertEqual((summary.ambiguous_count, summary.labeled_count, summary.match_labels), (2, 1, 1))
+
+    def test_label_change_is_incremental(self):
+        save_batch_summary('b1', self.categorized)
+        self.ambiguous.label = 'UNMATCH'
+        self.ambiguous.save()
+        record_label_change(self.ambiguous, None, 'UNMATCH')
+        record_label_change(self.ambiguous, 'UNMATCH', 'MATCH')
+
+        summary = BatchSummary.objects.get(batch_id='b1')
+        self.assertEqual((summary.labeled_count, summary.match_labels, summary.unmatch_labels), (1, 1, 0))
+
+    def test_overall_stats_count_unresolvable_labeling_rows(self):
+        save_batch_summary('b1', self.categorized)
+        LabelingData.objects.create(
+            data_id='legacy', combined_string_1='a', combined_string_2='b', source_table='t', reference_table='t',
+            label='UNMATCH'
+        )
+        stats = overall_stats()
+        self.assertEqual(stats['matching_stats'][0], {'status': 'MATCH', 'count': 2})
+        self.assertEqual(stats['labeling_stats'], {
+            'total_unlabeled': 1, 'total_labeled': 1, 'match_labels': 0, 'unmatch_labels': 1
+        })
+
+
+class BatchSummaryBackfillTests(TestCase):
+    def test_backfill_resolves_batch_ids_and_creates_missing_summaries(self):
+        migration = importlib.import_module('api.migrations.0016_backfill_batch_summary')
+        MatchingResult.objects.create(
+            batch_id='old', source_table='t', reference_table='t', matching_algorithm='COMBINED', status='MATCH',
+            confidence_score=0.9, fuzzy_score=95
+        )
+        legacy = LabelingData.objects.create(
+            data_id='old_1_2', combined_string_1='a', combined_string_2='b', source_table='t', reference_table='t',
+            label='UNMATCH'
+        )
+
+        migration.backfill_batch_summaries(apps, None)
+
+        summary = BatchSummary.objects.get(batch_id='old')
+        self.assertEqual(LabelingData.objects.get(pk=legacy.pk).batch_id, 'old')
+        self.assertEqual((summary.match_count, summary.ambiguous_count, summary.unmatch_labels), (1, 1, 1))
+        self.assertEqual(summary.fuzzy_histogram[-1]['count'], 1)
+        self.assertEqual(summary.fuzzy_histogram, refresh_batch_summary('old').fuzzy_histogram)
+
+
+class LegacyResultBackfillTests(TestCase):
+    def test_typed_columns_and_fuzzy_histogram_are_filled_from_matched_data(self):
+        migration = importlib.import_module('api.migrations.0019_backfill_matchingresult_columns')
+        legacy = MatchingResult.objects.create(
+            batch_id='old', source_table='t', reference_table='t', matching_algorithm='COMBINED', status='MATCH',
+            confidence_score=0.9,
+            matched_data={'id_1': 3, 'id_2': 8, 'faiss_score': 0.42, 'fuzzy_score': 91, 'predicted': 1}
+        )
+        BatchSummary.objects.create(batch_id='old', match_count=1, fuzzy_histogram=[])
+
+        migration.backfill_typed_columns(apps, None)
+
+        legacy.refresh_from_db()
+        self.assertEqual((legacy.id_1, legacy.id_2, legacy.faiss_score, legacy.fuzzy_score, legacy.predicted),
+                         (3, 8, 0.42, 91, True))
+        histogram = BatchSummary.objects.get(batch_id='old').fuzzy_histogram
+        self.assertEqual([b['count'] for b in histogram], [0] * 9 + [1])
+
+
+class TableProfileTests(TestCase):
+    def test_append_without_stored_profile_samples_whole_table(self):
+        df = pd.DataFrame({'nama': ['a', 'b']})
+        with mock.patch('api.services.column_profile.sample_table_profile') as sample:
+            update_table_profile('legacy', df=df, appended=True)
+        sample.assert_called_once_with('legacy')
+        self.assertFalse(TableProfile.objects.filter(table_name='legacy').exists())
+
+    def test_append_merges_into_stored_profile(self):
+        update_table_profile('t', df=pd.DataFrame({'nama': ['a', 'b']}))
+        profile = update_table_profile('t', df=pd.DataFrame({'nama': ['c']}), appended=True)
+        self.assertEqual((profile.row_count, profile.is_sample), (3, False))
+        self.assertEqual(profile.columns['nama']['non_null'], 3)
+
+
+class FuzzyScoringParityTests(SimpleTestCase):
+    EDGE_CASES = [
+        ('!!!', '???'),           # kosong setelah diproses tetapi berbeda mentah: fuzzywuzzy 100
+        ('', ''),
+        ('', 'toko'),
+        ('café jaya', 'cafe jaya'),  # codepoint 128-255 dibuang
+        ('日本 toko', 'toko'),       # di luar 128-255 dipertahankan
+        ('Āpotek', 'apotek'),
+        ('toko_jaya', 'toko jaya'),  # underscore bukan \W
+        ('Toko  Jaya, Tbk.', 'tbk jaya toko'),
+        ('123', '0123'),
+    ]
+
+    def assert_parity(self, strings_1, strings_2):
+        expected = [fuzz.token_sort_ratio(a, b) for a, b in zip(strings_1, strings_2)]
+        self.assertEqual(batch_token_sort_ratio(strings_1, strings_2, workers=1).tolist(), expected)
+
+    def test_edge_cases_match_fuzzywuzzy(self):
+        self.assert_parity([a for a, _ in self.EDGE_CASES], [b for _, b in self.EDGE_CASES])
+
+    def test_random_strings_match_fuzzywuzzy(self):
+        rng = random.Random(7)
+        alphabet = 'abc de_f!? éüß日-.,01ÀÿĀ'
+        strings = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(4000)]
+        self.assert_parity(strings[:2000], strings[2000:])
+
+
+def _unit_rows(n, d, seed=0):
+    """Baris acak ter-normalisasi L2 seperti keluaran TF-IDF"""
+    X = np.random.default_rng(seed).random((n, d)).astype(np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+class SparseTopkTests(SimpleTestCase):
+    def test_matches_brute_force_without_self(self):
+        X = _unit_rows(300, 16)
+        D, I = sparse_topk(sp.csr_matrix(X), k=5, query_chunk_size=64, target_chunk_size=100)
+
+        sim = X @ X.T
+        np.fill_diagonal(sim, -np.inf)
+        expected = np.argsort(-sim, axis=1)[:, :5]
+        np.testing.assert_array_equal(I, expected)
+        np.testing.assert_allclose(D, 2 - 2 * np.take_along_axis(sim, expected, axis=1), atol=1e-5)
+
+    def test_linkage_searches_query_rows_against_target(self):
+        X_target, X_query = _unit_rows(120, 8, seed=1), _unit_rows(30, 8, seed=2)
+        _, I = sparse_topk(sp.csr_matrix(X_target), k=3, X_query=sp.csr_matrix(X_query), target_chunk_size=50)
+        np.testing.assert_array_equal(I, np.argsort(-(X_query @ X_target.T), axis=1)[:, :3])
+
+
+class CanonicalPairsTests(SimpleTestCase):
+    def test_neighbors_to_pairs_drops_empty_slots_and_self(self):
+        I = np.array([[0, 1, -1], [0, 2, 1]])
+        D = np.array([[0.0, 0.3, np.inf], [0.2, 0.4, 0.0]], dtype=np.float32)
+        id_1, id_2, dist = neighbors_to_pairs(D, I)
+        self.assertEqual(list(zip(id_1.tolist(), id_2.tolist())), [(1, 0), (0, 1), (2, 1)])
+        np.testing.assert_allclose(dist, [0.3, 0.2, 0.4])
+
+    def test_self_matching_pairs_are_unordered_and_keep_best_distance(self):
+        id_1 = np.array([1, 0, 2, 5, 3])
+        id_2 = np.array([0, 1, 0, 3, 5])
+        dist = np.array([0.4, 0.1, 0.7, 0.9, 0.5], dtype=np.float32)
+        c1, c2, cd = canonicalize_pairs(id_1, id_2, dist)
+        self.assertEqual(list(zip(c1.tolist(), c2.tolist())), [(0, 1), (0, 2), (3, 5)])
+        np.testing.assert_allclose(cd, [0.1, 0.7, 0.5])
+
+    def test_linkage_pairs_keep_direction(self):
+        id_1, id_2 = np.array([1, 0, 1]), np.array([0, 1, 0])
+        c1, c2, cd = canonicalize_pairs(id_1, id_2, np.array([0.3, 0.2, 0.1]), unordered=False)
+        self.assertEqual(list(zip(c1.tolist(), c2.tolist())), [(0, 1), (1, 0)])
+        np.testing.assert_allclose(cd, [0.2, 0.1])
+
+    def test_search_output_has_no_duplicate_pairs(self):
+        D, I = sparse_topk(sp.csr_matrix(_unit_rows(200, 8, seed=3)), k=5)
+        id_1, id_2, _ = canonicalize_pairs(*neighbors_to_pairs(D, I))
+        pairs = list(zip(id_1.tolist(), id_2.tolist()))
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertTrue(all(a < b for a, b in pairs))
+
+
+class IndexRecallTests(SimpleTestCase):
+    def setUp(self):
+        self.X = _unit_rows(2000, 32, seed=4)
+
+    def test_exact_neighbors_have_full_recall(self):
+        _, I, _ = faiss_global_topk(self.X, k=5)
+        self.assertEqual(measure_recall(self.X, I, 5, sample_size=200), 1.0)
+
+    def test_ivf_probing_every_list_has_full_recall(self):
+        _, I, stats = faiss_global_topk(
+            self.X, k=5, index_options={'index_type': 'ivf_flat', 'nlist': 16, 'nprobe': 16, 'recall_sample_size': 200}
+        )
+        self.assertEqual(stats['index_type'], 'ivf_flat')
+        self.assertEqual(stats['recall_at_k'], 1.0)
+
+    def test_recall_drops_when_probing_one_list(self):
+        _, _, stats = faiss_global_topk(
+            self.X, k=5, index_options={'index_type': 'ivf_flat', 'nlist': 16, 'nprobe': 1, 'recall_sample_size': 200}
+        )
+        self.assertLess(stats['recall_at_k'], 1.0)
+
+    def test_block_too_small_to_train_falls_back_to_flat(self):
+        X_reference = self.X[:1]
+        D, I, stats = faiss_global_topk(X_reference, k=5, X_query=self.X[1:4], index_options={'index_type': 'ivf_pq'})
+        self.assertEqual(stats['index_type'], 'flat')
+        np.testing.assert_array_equal(I[:, 0], [0, 0, 0])
+
+    def test_recall_for_linkage_queries(self):
+        X_query = _unit_rows(100, 32, seed=5)
+        _, I, stats = faiss_global_topk(
+            self.X, k=5, X_query=X_query,
+            index_options={'index_type': 'hnsw', 'ef_search': 256, 'recall_sample_size': 100}
+        )
+        self.assertEqual(I.shape, (100, 5))
+        self.assertGreaterEqual(stats['recall_at_k'], 0.95)
+
+
+class BlockingMetricsTests(SimpleTestCase):
+    def test_soundex(self):
+        self.assertEqual([soundex(w) for w in ('robert', 'rupert', 'ashcraft', 'tymczak', '123')],
+                         ['R163', 'R163', 'A261', 'T522', ''])
+
+    def test_reduction_ratio_self_and_linkage(self):
+        df = pd.DataFrame({'kota': ['bogor', 'bogor', 'bogor', 'depok', 'depok', None]})
+        blocks = iter_blocks(build_block_keys(df, [{'column': 'kota'}]))
+        # 3 + 1 dari 15 pasangan tanpa blocking
+        self.assertEqual(reduction_ratio(blocks, len(df)), round(1 - 4 / 15, 6))
+
+        query = pd.DataFrame({'kota': ['bogor', 'jakarta']})
+        linkage = iter_blocks(build_block_keys(df, [{'column': 'kota'}]), build_block_keys(query, [{'column': 'kota'}]))
+        self.assertEqual(reduction_ratio(linkage, len(df), len(query)), round(1 - 3 / 12, 6))
+
+    def test_pair_completeness(self):
+        exact_1, exact_2 = np.array([0, 2, 4, 1]), np.array([1, 3, 5, 7])
+        blocked_1, blocked_2 = np.array([1, 3, 9]), np.array([0, 2, 8])
+        self.assertEqual(pair_completeness(exact_1, exact_2, blocked_1, blocked_2), 0.5)
+        self.assertEqual(pair_completeness(exact_1, exact_2, blocked_1, blocked_2, unordered=False), 0.0)
+        self.assertIsNone(pair_completeness(np.array([]), np.array([]), blocked_1, blocked_2))
+
+    def test_exact_sample_keeps_every_pair(self):
+        # k = n - 1: setiap baris lain adalah tetangga, jadi target dengan id = posisi lokal sampel pasti muncul
+        X = sp.csr_matrix(_unit_rows(10, 4, seed=7))
+        target_rows, query_rows = sample_exact_pairs(X, k=9, sample_size=5)
+        self.assertEqual(len(target_rows), 45)
+        self.assertEqual(len(set(query_rows.tolist())), 5)
+        self.assertFalse((target_rows == query_rows).any())
+
+    def test_blocked_pairs_stay_inside_blocks(self):
+        df = pd.DataFrame({'nama': ['toko a', 'toko b', 'warung c', 'warung d', 'toko e']})
+        keys = build_block_keys(df, [{'column': 'nama', 'method': 'first_token'}])
+        X = sp.csr_matrix(_unit_rows(len(df), 4, seed=6))
+        id_1, id_2, _ = blocked_pairs(X, iter_blocks(keys), lambda Xt, Xq: sparse_topk(Xt, k=5, X_query=Xq))
+        self.assertTrue(len(id_1))
+        self.assertTrue((keys[id_1].to_numpy() == keys[id_2].to_numpy()).all())
+
+
+class TypeInferenceTests(SimpleTestCase):
+    def infer(self, *chunks):
+        inference = SchemaInference()
+        for chunk in chunks:
+            inference.update(pd.DataFrame(chunk, dtype=object))
+        return inference
+
+    def test_sample_detection(self):
+        schema = self.infer({
+            'id': ['1', '-20'], 'harga': ['1.50', '2e3'], 'tgl': ['2024-01-05', '2024-02-29 00:00:00'],
+            'waktu': ['2024-01-05 10:00:00', '2024-01-05T10:00:00.250'], 'aktif': ['True', 'false'],
+            'nama': ['toko', 'warung'], 'kosong': [None, None],
+        }).schema()
+        self.assertEqual(schema, {
+            'id': 'integer', 'harga': 'numeric', 'tgl': 'date', 'waktu': 'timestamp', 'aktif': 'boolean',
+            'nama': 'text', 'kosong': 'text',
+        })
+
+    def test_leading_zeros_stay_text(self):
+        schema = self.infer({'kode_pos': ['01234', '16111'], 'telepon': ['0812345', '0813'], 'nol': ['0', '10']}).schema()
+        self.assertEqual(schema, {'kode_pos': 'text', 'telepon': 'text', 'nol': 'integer'})
+
+    def test_invalid_dates_stay_text(self):
+        schema = self.infer({'tgl': ['2024-02-30', '2024-01-01'], 'bulan': ['2024-13-01', '2024-01-01']}).schema()
+        self.assertEqual(schema, {'tgl': 'text', 'bulan': 'text'})
+
+    def test_int32_overflow_widens_to_bigint_then_numeric(self):
+        inference = self.infer(
+            {'id': ['1', '2']},
+            {'id': [str(2 ** 31), '-5']},
+            {'id': ['1' * 19]},
+        )
+        self.assertEqual(inference.schema(), {'id': 'numeric'})
+        self.assertEqual(inference.widened['id'], ['integer', 'bigint'])
+        self.assertEqual(self.infer({'id': [str(2 ** 31 - 1), str(-(2 ** 31 - 1))]}).schema(), {'id': 'integer'})
+
+    def test_later_chunks_widen_to_text(self):
+        inference = self.infer(
+            {'flag': ['true'], 'tgl': ['2024-01-05'], 'n': ['5'], 'late': [None]},
+            {'flag': ['1'], 'tgl': ['2024-01-05 08:30:00'], 'n': ['abc'], 'late': ['42']},
+        )
+        self.assertEqual(inference.schema(), {'flag': 'text', 'tgl': 'timestamp', 'n': 'text', 'late': 'integer'})
+
+    def test_every_type_accepts_its_own_values(self):
+        for sql_type, values in (('integer', ['7']), ('numeric', ['0.5']), ('date', ['2024-01-01']),
+                                 ('timestamp', ['2024-01-01']), ('boolean', ['FALSE']), ('text', ['x'])):
+            self.assertTrue(matches_type(sql_type, pd.Series(values)), sql_type)
+
+
+class _CopyCursor:
+    """Cursor palsu yang menyimpan perintah dan isi COPY FROM STDIN"""
+
+    def __init__(self):
+        self.copies = []
+
+    def copy_expert(self, sql, buffer):
+        self.copies.append((sql, buffer.read()))
+
+
+def _decode_copy_text(field):
+    """Kebalikan escaping format text COPY Postgres (\\N = NULL)"""
+    if field == '\\N':
+        return None
+    escapes = {'\\\\': '\\', '\\t': '\t', '\\n': '\n', '\\r': '\r'}
+    return re.sub(r'\\[\\tnr]', lambda m: escapes[m.group(0)], field)
+
+
+class IngestCopyTests(SimpleTestCase):
+    def test_copy_escapes_special_characters_and_nulls(self):
+        df = pd.DataFrame({
+            'nama "toko"': ['a\tb', 'baris\nbaru', 'c:\\path\\n', None, 'cr\r'],
+            'angka': [1, None, 3.5, 4, 0],
+        }, dtype=object)
+        cursor = _CopyCursor()
+        copy_chunk(cursor, 'stag"ing', df)
+
+        sql, payload = cursor.copies[0]
+        self.assertEqual(sql, 'COPY "stag""ing" ("nama ""toko""", "angka") FROM STDIN')
+        lines = payload.split('\n')
+        self.assertEqual(lines[-1], '')
+        rows = [[_decode_copy_text(field) for field in line.split('\t')] for line in lines[:-1]]
+        self.assertEqual(rows, [
+            ['a\tb', '1'], ['baris\nbaru', None], ['c:\\path\\n', '3.5'], [None, '4'], ['cr\r', '0'],
+        ])
+
+    def test_csv_chunks_sniff_delimiter_and_keep_text(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write('kode;nama\n007;toko a\n;toko b\n010;\n')
+        self.addCleanup(os.remove, f.name)
+
+        chunks = list(iter_file_chunks(f.name, 'data.csv', chunk_rows=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        df = pd.concat(chunks, ignore_index=True)
+        self.assertEqual(list(df.columns), ['kode', 'nama'])
+        self.assertEqual(df['kode'].tolist()[0], '007')
+        self.assertTrue(pd.isna(df['kode'][1]) and pd.isna(df['nama'][2]))
+
+    def test_ingest_streams_every_chunk(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as f:
+            f.write('a,b\n' + ''.join(f'{i},x{i}\n' for i in range(5)))
+        self.addCleanup(os.remove, f.name)
+
+        created, seen = [], []
+        cursor = _CopyCursor()
+        stats = ingest_file(cursor, f.name, 'data.csv', 'tabel', create_table=lambda t, c: created.append((t, c)),
+                            on_chunk=seen.append, chunk_rows=2)
+        self.assertEqual(created, [('tabel', ['a', 'b'])])
+        self.assertEqual((stats['rows'], stats['chunks'], len(cursor.copies), len(seen)), (5, 3, 3, 3))
+
+    def _xlsx(self, rows):
+        from openpyxl import Workbook
+        workbook = Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as f:
+            workbook.save(f.name)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def test_xlsx_row_wider_than_header_is_rejected(self):
+        path = self._xlsx([['kode', 'nama'], ['1', 'toko a'], ['2', 'toko b', 'kolom tanpa header']])
+        with self.assertRaisesRegex(ValueError, 'Baris 3'):
+            list(iter_file_chunks(path, 'data.xlsx'))
+
+    def test_xlsx_empty_cells_beyond_header_are_ignored(self):
+        path = self._xlsx([['kode', 'nama', None], ['1', 'toko a', None], ['2', None, None, None]])
+        df = pd.concat(iter_file_chunks(path, 'data.xlsx'), ignore_index=True)
+        self.assertEqual(list(df.columns), ['kode', 'nama'])
+        self.assertEqual(df['nama'].tolist()[0], 'toko a')
+        self.assertEqual(len(df), 2)
+
+    def test_unknown_extension_is_rejected(self):
+        with self.assertRaises(ValueError):
+            list(iter_file_chunks('/tmp/none.txt', 'data.txt'))
+
+
+class _FakeQuery:
+    """Query builder PostgREST palsu di atas list dict; max_rows meniru batas baris per request server"""
+
+    def __init__(self, rows, calls, max_rows):
+        self.rows, self.calls, self.max_rows = rows, calls, max_rows
+        self.columns, self.filters, self.orders = None, [], []
+        self.offsets = self.limit_rows = None
+        self.negate = False
+
+    def select(self, *columns, count=None, head=False):
+        self.columns, self.count_mode, self.head = columns, count, head
+        return self
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row[column] <= value)
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.offsets = (start, end)
+        return self
+
+    def limit(self, n):
+        self.limit_rows = n
+        return self
+
+    def execute(self):
+        self.calls.append('range' if self.offsets else 'keyset')
+        columns = [c for c in self.columns if c != '*']
+        if any(column not in self.rows[0] for column in columns):
+            raise RuntimeError('column does not exist')
+        rows = [row for row in self.rows if all(f(row) for f in self.filters)]
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda row: row[column], reverse=desc)
+        if self.head:
+            return mock.Mock(data=[], count=len(rows))
+        if self.offsets:
+            rows = rows[self.offsets[0]:self.offsets[1] + 1]
+        rows = rows[:min(self.limit_rows or self.max_rows, self.max_rows)]
+        return mock.Mock(data=[{c: row[c] for c in columns} if columns else dict(row) for row in rows], count=None)
+
+
+class SupabaseFetchTests(SimpleTestCase):
+    def service(self, rows):
+        self.calls = []
+        client = mock.Mock()
+        client.table.side_effect = lambda name: _FakeQuery(rows, self.calls, max_rows=3)
+        with mock.patch('api.services.supabase_service.create_client', return_value=client):
+            return SupabaseService()
+
+    def test_upload_table_is_paged_by_row_id_without_offset(self):
+        # Celah di kunci (baris terhapus / sequence yang terlewat) tidak membuat baris hilang
+        keys = (1, 2, 3, 5, 6, 7, 8, 9, 10, 12)
+        rows = [{'_row_id': i, 'nama': f'toko {i}', 'kota': None if i == 5 else 'bogor'} for i in keys]
+        service = self.service(rows)
+        df = service.get_table_data('t', page_size=4, workers=2, columns=['nama'], not_null=['kota'])
+
+        self.assertEqual(df['nama'].tolist(), [f'toko {i}' for i in (1, 2, 3, 6, 7, 8, 9, 10, 12)])
+        self.assertEqual(list(df.columns), ['nama'])
+        self.assertNotIn('range', self.calls)
+        self.assertEqual(service.last_fetch_stats['paging'], 'keyset')
+
+    def test_table_without_row_id_falls_back_to_offset_ranges(self):
+        rows = [{'nama': f'toko {i:02d}', 'kota': 'bogor'} for i in range(10)]
+        service = self.service(rows)
+        df = service.get_table_data('t', page_size=4, workers=2)
+
+        self.assertEqual(df['nama'].tolist(), [row['nama'] for row in rows])
+        self.assertIn('range', self.calls)
+        self.assertEqual(service.last_fetch_stats['paging'], 'offset')
+
+
+def _sqlite_copy(cursor, table_name, df):
+    """Pengganti COPY FROM STDIN untuk database test sqlite"""
+    columns = ', '.join('"' + column + '"' for column in df.columns)
+    placeholders = ', '.join(['%s'] * len(df.columns))
+    rows = [[None if pd.isna(value) else str(value) for value in row] for row in df.itertuples(index=False)]
+    cursor.executemany(f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders})', rows)
+
+
+class UploadJobTests(TestCase):
+    """process_upload_job di atas sqlite: COPY, ALTER bertipe dan introspeksi Postgres diganti"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir, ignore_errors=True)
+        self.user = User.objects.create(username='uploader')
+        patches = [
+            mock.patch('api.utils.ingest.copy_chunk', side_effect=_sqlite_copy),
+            mock.patch('api.utils.Upload_handler.column_types', return_value={}),
+            mock.patch('api.utils.Upload_handler.apply_schema', side_effect=lambda name, schema: (schema, None)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.apply_schema_mock = patches[-1].target.apply_schema
+
+    def make_job(self, content, table_name='table_toko'):
+        path = os.path.join(self.upload_dir, f'{uuid.uuid4().hex}.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return UploadJob.objects.create(
+            job_id=uuid.uuid4().hex, table_name=table_name, original_filename='toko.csv', file_path=path,
+            created_by=self.user
+        )
+
+    def table_rows(self, table_name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT "kode", "nama" FROM "{table_name}" ORDER BY "kode"')
+            return cursor.fetchall()
+
+    def staging_tables(self):
+        return [name for name in connection.introspection.table_names() if name.startswith('staging_')]
+
+    def test_new_table_is_loaded_through_staging_and_renamed(self):
+        job = self.make_job('kode,nama\n1,toko a\n2,toko b\n')
+        process_upload_job(job.job_id)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed, job.rows_total), ('Success', 2, 2))
+        self.assertEqual(job.columns, ['kode', 'nama'])
+        self.assertEqual(job.stats['schema'], {'kode': 'integer', 'nama': 'text'})
+        self.apply_schema_mock.assert_called_once()
+        self.assertEqual(self.table_rows('table_toko'), [('1', 'toko a'), ('2', 'toko b')])
+        self.assertEqual(self.staging_tables(), [])
+        self.assertFalse(os.path.exists(job.file_path))
+        self.assertEqual(DataTable.objects.get(name='table_toko').row_count, 2)
+        self.assertEqual(TableProfile.objects.get(table_name='table_toko').row_count, 2)
+
+    def test_existing_table_is_appended_with_its_own_schema(self):
+        process_upload_job(self.make_job('kode,nama\n1,toko a\n').job_id)
+        self.apply_schema_mock.reset_mock()
+        job = self.make_job('kode,nama\n2,toko b\n3,toko c\n')
+        process_upload_job(job.job_id)
+
+        self.assertEqual(UploadJob.objects.get(pk=job.pk).status, 'Success')
+        self.apply_schema_mock.assert_not_called()
+        self.assertEqual(self.table_rows('table_toko'), [('1', 'toko a'), ('2', 'toko b'), ('3', 'toko c')])
+        self.assertEqual(self.staging_tables(), [])
+        self.assertEqual(DataTable.objects.get(name='table_toko').row_count, 3)
+        self.assertEqual(TableProfile.objects.get(table_name='table_toko').row_count, 3)
+
+    def test_failed_publish_drops_staging_and_leaves_target_untouched(self):
+        job = self.make_job('kode,nama\n1,toko a\n')
+        with mock.patch('api.utils.Upload_handler.publish_staging_table', side_effect=RuntimeError('lock timeout')):
+            process_upload_job(job.job_id)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('Failed', 'lock timeout'))
+        self.assertIsNotNone(job.end_time)
+        self.assertEqual(self.staging_tables(), [])
+        self.assertNotIn('table_toko', connection.introspection.table_names())
+        self.assertFalse(os.path.exists(job.file_path))
+
+    def test_empty_file_fails(self):
+        job = self.make_job('kode,nama\n')
+        process_upload_job(job.job_id)
+        self.assertEqual(UploadJob.objects.get(pk=job.pk).status, 'Failed')
+        self.assertEqual(self.staging_tables(), [])
+
+    def test_upload_returns_202_and_status_view_reports_the_job(self):
+        factory = APIRequestFactory()
+        with override_settings(UPLOAD_DIR=self.upload_dir), \
+                mock.patch('api.views.run_upload_background') as run_background:
+            request = factory.post('/upload/', {
+                'table_name': 'table_toko', 'file': SimpleUploadedFile('toko.csv', b'kode,nama\n1,toko a\n')
+            }, format='multipart')
+            force_authenticate(request, user=self.user)
+            response = upload_file(request)
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job_id']
+        run_background.assert_called_once_with(job_id)
+        job = UploadJob.objects.get(job_id=job_id)
+        self.assertEqual((job.created_by, job.status), (self.user, 'Pending'))
+        self.assertTrue(os.path.exists(job.file_path))
+
+        status_response = UploadJobStatusView.as_view()(factory.get(f'/upload-status/{job_id}/'), job_id=job_id)
+        self.assertEqual(status_response.data['status'], 'Pending')
+        self.assertEqual(status_response.data['original_filename'], 'toko.csv')
+        missing = UploadJobStatusView.as_view()(factory.get('/upload-status/x/'), job_id='x')
+        self.assertEqual(missing.status_code, 404)
+
+    def test_upload_rejects_unsupported_files_before_creating_a_job(self):
+        request = APIRequestFactory().post('/upload/', {
+            'table_name': 'table_toko', 'file': SimpleUploadedFile('toko.txt', b'x')
+        }, format='multipart')
+        self.assertEqual(upload_file(request).status_code, 400)
+        self.assertFalse(UploadJob.objects.exists())
+
+
+class ResultsPaginationTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        # Banyak confidence kembar agar tie-break id pada keyset ikut diuji
+        for i in range(25):
+            MatchingResult.objects.create(
+                batch_id='b1', source_table='t', reference_table='t', matching_algorithm='COMBINED',
+                id_1=i, id_2=i + 100, status='MATCH' if i % 3 else 'UNMATCH',
+                confidence_score=round((i % 4) / 4, 2), fuzzy_score=50, faiss_score=0.1
+            )
+        MatchingResult.objects.create(
+            batch_id='other', source_table='t', reference_table='t', matching_algorithm='COMBINED',
+            id_1=0, id_2=1, status='MATCH', confidence_score=0.5
+        )
+
+    def get(self, **params):
+        request = self.factory.get('/matching-results/', {'batch_id': 'b1', **params})
+        return GetMatchingResultsView.as_view()(request)
+
+    def collect(self, **params):
+        rows, cursor = [], None
+        while True:
+            data = self.get(page_size=7, **params, **({'cursor': cursor} if cursor else {})).data
+            rows.extend(data['results'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                return rows
+
+    def test_keyset_pages_cover_batch_once_in_order(self):
+        results = MatchingResult.objects.filter(batch_id='b1')
+        expected = {
+            'id': list(results.order_by('id').values_list('id', flat=True)),
+            'confidence': list(results.order_by('confidence_score', 'id').values_list('id', flat=True)),
+            '-confidence': list(results.order_by('-confidence_score', '-id').values_list('id', flat=True)),
+        }
+        for sort, ids in expected.items():
+            self.assertEqual([row['id'] for row in self.collect(sort=sort)], ids, sort)
+
+    def test_type_filter_projection_and_total(self):
+        data = self.get(type='unmatch', fields='id,status', page_size=100).data
+        self.assertEqual(data['total_count'], 9)
+        self.assertEqual({row['status'] for row in data['results']}, {'UNMATCH'})
+        self.assertEqual(set(data['results'][0]), {'id', 'status'})
+        self.assertIsNone(data['next_cursor'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get(cursor='not-a-cursor').status_code, 400)
+        self.assertEqual(self.get(sort='fuzzy').status_code, 400)
+        self.assertEqual(self.get(fields='id,password').status_code, 400)
+
+    def test_csv_export_streams_whole_batch(self):
+        response = self.get(export='csv', fields='id_1,status')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id_1,status')
+        self.assertEqual(len(lines), 26)
+
+
+class LabelingLeaseTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.rows = [
+            LabelingData.objects.create(
+                data_id=f'b1_{i}_{i + 1}', batch_id='b1', combined_string_1='a', combined_string_2='b',
+                source_table='t', reference_table='t', priority=priority
+            )
+            for i, priority in enumerate([0.2, 0.9, 0.5, 0.9, 0.1])
+        ]
+
+    def queue(self, user, **params):
+        request = self.factory.get('/labeling-queue/', params)
+        force_authenticate(request, user=user)
+        return LabelingQueueView.as_view()(request).data
+
+    def submit(self, user, row, label):
+        request = self.factory.post('/submit-labeling/', {'labeling_id': row.id, 'label': label}, format='json')
+        force_authenticate(request, user=user)
+        return SubmitLabelingView.as_view()(request)
+
+    def test_highest_priority_first_and_leased_rows_are_skipped(self):
+        first = [item['id'] for item in self.queue(self.alice, page_size=2)['items']]
+        self.assertEqual(first, [self.rows[1].id, self.rows[3].id])
+        second = [item['id'] for item in self.queue(self.bob, page_size=2)['items']]
+        self.assertEqual(second, [self.rows[2].id, self.rows[0].id])
+        self.assertEqual(LabelingData.objects.filter(leased_by=self.alice).count(), 2)
+
+    def test_expired_lease_is_handed_out_again(self):
+        self.queue(self.alice, page_size=5)
+        self.assertEqual(self.queue(self.bob)['items'], [])
+        LabelingData.objects.filter(id=self.rows[2].id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([item['id'] for item in self.queue(self.bob)['items']], [self.rows[2].id])
+
+    def test_submit_clears_lease_and_removes_row_from_queue(self):
+        self.queue(self.alice, page_size=1)
+        self.assertEqual(self.submit(self.alice, self.rows[1], 'MATCH').status_code, 200)
+        row = LabelingData.objects.get(id=self.rows[1].id)
+        self.assertEqual((row.label, row.leased_by, row.lease_expires_at, row.confirmed_by), ('MATCH', None, None, self.alice))
+        remaining = [item['id'] for item in self.queue(self.bob, page_size=10)['items']]
+        self.assertNotIn(self.rows[1].id, remaining)
+        self.assertEqual(len(remaining), 4)
+
+    def test_batch_filter(self):
+        LabelingData.objects.create(
+            data_id='b2_1_2', batch_id='b2', combined_string_1='a', combined_string_2='b',
+            source_table='t', reference_table='t', priority=1.0
+        )
+        items = self.queue(self.alice, batch_id='b2')['items']
+        self.assertEqual([item['data_id'] for item in items], ['b2_1_2'])
@@ -1,12 +1,16 @@
 from django.urls import path
 from .views import (
     JobStatusView,
+    UploadJobStatusView,
     upload_file,
+    progress_faiss,
+    job_progress_stream,
     GetAvailableTablesView,
     GetRecommendedColumnsView,
     StartMatchingView,
     GetMatchingResultsView,
     GetLabelingDataView,
+    LabelingQueueView,
     SubmitLabelingView,
     RetrainModelView,
     GetMatchingStatsView
@@ -14,16 +18,20 @@ from .views import (
 
 urlpatterns = [
     path('upload/', upload_file, name='upload_file'),
+    path('upload-status/<str:job_id>/', UploadJobStatusView.as_view(), name='upload_status'),
    # path('upload/', UploadDataView.as_view(), name='upload_data'),
     path('tables/', GetAvailableTablesView.as_view(), name='get_tables'),
     path('recommend-columns/', GetRecommendedColumnsView.as_view(), name='recommend_columns'),
     path('start-matching/', StartMatchingView.as_view(), name='start_matching'),
     path('matching-results/', GetMatchingResultsView.as_view(), name='get_matching_results'),
     path('labeling-data/', GetLabelingDataView.as_view(), name='get_labeling_data'),
+    path('labeling-queue/', LabelingQueueView.as_view(), name='labeling_queue'),
     path('submit-labeling/', SubmitLabelingView.as_view(), name='submit_labeling'),
     path('retrain-model/', RetrainModelView.as_view(), name='retrain_model'),
     path('matching-stats/', GetMatchingStatsView.as_view(), name='matching_stats'),
-     path('job-status/<str:job_id>/', JobStatusView.as_view(), name='job_status')
+     path('job-status/<str:job_id>/', JobStatusView.as_view(), name='job_status'),
+    path('job-progress/<str:job_id>/stream/', job_progress_stream, name='job_progress_stream'),
+    path('progress_faiss/', progress_faiss, name='progress_faiss')
 ]
 
 # from django.urls import path
@@ -3,13 +3,25 @@ from rest_framework.response import Response
 from io import BytesIO
 import pandas as pd
 from django.http import HttpResponse
-import numpy as np
-from django.db import connection
+import uuid
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from api.models import UploadJob, DataTable
+from api.services.data_cache import invalidate_table
+from api.services.column_profile import update_table_profile, delete_table_profile, profile_frame, merge_sketches
+from api.utils.ingest import ingest_file, estimate_rows, SUPPORTED_EXTENSIONS, ROW_ID_COLUMN
+from api.utils.type_inference import SchemaInference
+
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
 
 
 def create_table_if_not_exists(table_name, columns):
     with connection.cursor() as cursor:
-        col_defs = []
+        # Kunci baris agar fetch bisa paging keyset (tanpa ORDER BY semua kolom + OFFSET)
+        col_defs = [f'{quote_identifier(ROW_ID_COLUMN)} BIGSERIAL PRIMARY KEY']
         for col in columns:
             # Buat semua kolom jadi tipe TEXT dulu
             safe_col = col.replace('"', '""')
@@ -18,69 +30,200 @@ def create_table_if_not_exists(table_name, columns):
         sql = f'CREATE TABLE IF NOT EXISTS "{table_name}" ({col_sql});'
         cursor.execute(sql)
 
-def insert_records_raw(table_name, records, batch_size=10000):
-    if not records:
-        return
-
-    columns = records[0].keys()
-    col_str = ', '.join(f'"{col}"' for col in columns)
-
-    with connection.cursor() as cursor:
-        for i in range(0, len(records), batch_size):
-            batch = records[i:i+batch_size]
-            values_str = ', '.join(
-                cursor.mogrify(
-                    f"({', '.join(['%s'] * len(columns))})",
-                    tuple(str(row[col]) if row[col] is not None else None for col in columns)
-                ).decode()
-                for row in batch
-            )
-            sql = f'INSERT INTO "{table_name}" ({col_str}) VALUES {values_str};'
-            try:
-                cursor.execute(sql)
-                print(f"✅ Batch {i//batch_size + 1} berhasil dimasukkan.")
-            except Exception as e:
-                print(f"❌ Error insert batch ke-{i//batch_size + 1}: {e}")
-                raise e
-
-def handle_uploaded_file(request, temp_file_path, table_name):
+def create_upload_job(request, table_name):
+    """Simpan file upload ke UPLOAD_DIR dan buat UploadJob 'Pending', kembalikan (job, error)"""
     if 'file' not in request.FILES:
-        return Response({'error': 'No file uploaded'}, status=400)
+        return None, 'No file uploaded'
 
     file = request.FILES['file']
-    print(f"✅ File diterima: {file.name} untuk tabel: {table_name}")
+    extension = os.path.splitext(file.name)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        return None, f"Format file tidak didukung: {extension or file.name}. Gunakan {', '.join(SUPPORTED_EXTENSIONS)}"
 
-    # Simpan ke file sementara
-    with open(temp_file_path, 'wb+') as dest:
+    job_id = str(uuid.uuid4())
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(settings.UPLOAD_DIR, f"{job_id}{extension}")
+    with open(file_path, 'wb+') as dest:
         for chunk in file.chunks():
             dest.write(chunk)
+    print(f"✅ File diterima: {file.name} untuk tabel: {table_name} (job {job_id})")
 
-    try:
-        df = pd.read_excel(temp_file_path)
-        df = df.dropna(how='all').reset_index(drop=True)
-        df.columns = df.columns.str.strip()
-        df = df.replace({np.nan: None})
+    job = UploadJob.objects.create(
+        job_id=job_id,
+        table_name=table_name,
+        original_filename=file.name,
+        file_path=file_path,
+        created_by=request.user if request.user.is_authenticated else None
+    )
+    return job, None
+
+
+def drop_table(table_name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {quote_identifier(table_name)}')
 
-        records = df.to_dict(orient='records')
 
-        # Buat tabel kalau belum ada
-        create_table_if_not_exists(table_name, df.columns)
+def table_exists(table_name):
+    with connection.cursor() as cursor:
+        return table_name in connection.introspection.table_names(cursor)
+
+
+def relation_size(cursor, table_name):
+    """Ukuran tabel beserta TOAST dan index dalam byte"""
+    cursor.execute('SELECT pg_total_relation_size(to_regclass(%s))', [quote_identifier(table_name)])
+    return cursor.fetchone()[0]
 
-        # Insert data secara batch
-        insert_records_raw(table_name, records)
 
-        return Response({
-            'message': f'{len(records)} data berhasil dimasukkan ke tabel {table_name}',
-            'columns': list(df.columns)
-        })
+def column_types(table_name):
+    """Kolom -> tipe Postgres tabel yang sudah ada"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+            FROM pg_attribute a
+            WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY a.attnum
+            """,
+            [quote_identifier(table_name)]
+        )
+        return dict(cursor.fetchall())
+
+
+def apply_schema(staging_name, schema):
+    """Ubah kolom TEXT staging ke tipe hasil inferensi dalam satu ALTER (satu kali rewrite tabel).
+
+    Kembalikan (skema yang berlaku, statistik storage). Jika cast gagal, staging tetap TEXT.
+    """
+    typed = {column: sql_type for column, sql_type in schema.items() if sql_type != 'text'}
+    if not typed:
+        return schema, None
+
+    with connection.cursor() as cursor:
+        text_bytes = relation_size(cursor, staging_name)
+        alters = ', '.join(
+            f'ALTER COLUMN {quote_identifier(column)} TYPE {sql_type} USING {quote_identifier(column)}::{sql_type}'
+            for column, sql_type in typed.items()
+        )
+        try:
+            with transaction.atomic():
+                cursor.execute(f'ALTER TABLE {quote_identifier(staging_name)} {alters}')
+        except Exception as e:
+            print(f"⚠️ Skema bertipe gagal diterapkan, kolom tetap TEXT: {e}")
+            return dict.fromkeys(schema, 'text'), None
+        typed_bytes = relation_size(cursor, staging_name)
+
+    saved = text_bytes - typed_bytes
+    storage = {
+        'text_bytes': text_bytes,
+        'typed_bytes': typed_bytes,
+        'saved_bytes': saved,
+        'saved_percent': round(100.0 * saved / text_bytes, 1) if text_bytes else None,
+    }
+    print(f"💾 Skema bertipe {staging_name}: {text_bytes} → {typed_bytes} byte (hemat {storage['saved_percent']}%)")
+    return schema, storage
+
+
+def publish_staging_table(staging_name, table_name, columns):
+    """Pindahkan staging ke tabel tujuan dalam satu transaksi.
+
+    Tabel baru: staging di-rename. Tabel yang sudah ada (upload bersifat append): isi staging
+    di-insert sekaligus (di-cast ke tipe kolom tujuan) lalu staging di-drop.
+    Tabel tujuan tidak pernah terisi sebagian.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if table_name in connection.introspection.table_names(cursor):
+            target_types = column_types(table_name)
+            col_str = ', '.join(quote_identifier(col) for col in columns)
+            select_str = ', '.join(
+                f'{quote_identifier(col)}::{target_types[col]}' if col in target_types else quote_identifier(col)
+                for col in columns
+            )
+            cursor.execute(
+                f'INSERT INTO {quote_identifier(table_name)} ({col_str}) '
+                f'SELECT {select_str} FROM {quote_identifier(staging_name)}'
+            )
+            cursor.execute(f'DROP TABLE {quote_identifier(staging_name)}')
+        else:
+            cursor.execute(f'ALTER TABLE {quote_identifier(staging_name)} RENAME TO {quote_identifier(table_name)}')
+
+
+def record_data_table(job, schema, n_rows):
+    """Catat tabel upload dan skema bertipenya di DataTable (hanya jika pengunggah login)"""
+    if job.created_by_id is None:
+        return
+    data_table, _ = DataTable.objects.get_or_create(
+        name=job.table_name,
+        created_by_id=job.created_by_id,
+        defaults={'original_filename': job.original_filename}
+    )
+    data_table.original_filename = job.original_filename
+    data_table.row_count += n_rows
+    data_table.column_names = [{'name': column, 'type': sql_type} for column, sql_type in schema.items()]
+    data_table.save()
+
+
+def process_upload_job(job_id):
+    """Load file UploadJob ke staging table per chunk (COPY), lalu publikasikan secara atomic"""
+    job = UploadJob.objects.get(job_id=job_id)
+    jobs = UploadJob.objects.filter(job_id=job_id)
+    jobs.update(status='Running', rows_total=estimate_rows(job.file_path, job.original_filename))
+    staging_name = f"staging_{uuid.uuid4().hex[:16]}"
+    sketches = {}
+    inference = SchemaInference()
+    progress = {'rows': 0}
+
+    def on_chunk(df):
+        merge_sketches(sketches, profile_frame(df))
+        inference.update(df)
+        progress['rows'] += len(df)
+        jobs.update(rows_processed=progress['rows'])
+
+    try:
+        # Setiap COPY chunk langsung commit ke staging table sehingga progress terlihat
+        with connection.cursor() as cursor:
+            stats = ingest_file(
+                cursor, job.file_path, job.original_filename, staging_name,
+                create_table=create_table_if_not_exists,
+                on_chunk=on_chunk
+            )
+        if not stats['rows']:
+            raise ValueError('File tidak berisi data')
+
+        appended = table_exists(job.table_name)
+        if appended:
+            # Append: skema tabel tujuan yang berlaku, nilai di-cast saat publish
+            target_types = column_types(job.table_name)
+            schema = {column: target_types.get(column, 'text') for column in stats['columns']}
+            storage = None
+        else:
+            schema, storage = apply_schema(staging_name, inference.schema())
+        if inference.widened:
+            print(f"🔎 Tipe dilebarkan saat validasi: {inference.widened}")
+
+        publish_staging_table(staging_name, job.table_name, stats['columns'])
+        invalidate_table(job.table_name)
+        update_table_profile(job.table_name, sketches=sketches, n_rows=stats['rows'], appended=appended)
+        record_data_table(job, schema, stats['rows'])
+        print(f"📥 {stats['rows']} baris ke {job.table_name} dalam {stats['seconds']}s ({stats['rows_per_second']} rows/s)")
+        stats.update(schema=schema, storage=storage)
+
+        jobs.update(
+            status='Success',
+            rows_processed=stats['rows'],
+            rows_total=stats['rows'],
+            columns=stats['columns'],
+            stats={key: value for key, value in stats.items() if key != 'columns'},
+            end_time=timezone.now()
+        )
 
     except Exception as e:
-        print(f"❌ ERROR: {e}")
-        return Response({'error': str(e)}, status=500)
+        print(f"❌ ERROR upload {job_id}: {e}")
+        drop_table(staging_name)
+        jobs.update(status='Failed', error=str(e), end_time=timezone.now())
 
     finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
             
 def get_table_data(request):
     table_name = request.GET.get('table_name')
@@ -93,6 +236,10 @@ def get_table_data(request):
             columns = [col[0] for col in cursor.description]
             rows = cursor.fetchall()
             data = [dict(zip(columns, row)) for row in rows]
+        # Kunci baris internal tidak ditampilkan
+        columns = [column for column in columns if column != ROW_ID_COLUMN]
+        for row in data:
+            row.pop(ROW_ID_COLUMN, None)
         return Response({'columns': columns, 'data': data})
     except Exception as e:
         return Response({'error': str(e)}, status=500)   
@@ -107,6 +254,9 @@ def delete_table_by_name(request):
     try:
         with connection.cursor() as cursor:
             cursor.execute(f'DROP TABLE IF EXISTS "{table_name}" CASCADE')
+        invalidate_table(table_name)
+        DataTable.objects.filter(name=table_name).delete()
+        delete_table_profile(table_name)
         return Response({'message': f'Tabel {table_name} berhasil dihapus.'})
     except Exception as e:
         return Response({'error': str(e)}, status=500)
@@ -122,7 +272,7 @@ def export_table_to_excel(request):
             cursor.execute(f'SELECT * FROM "{table_name}"')
             columns = [col[0] for col in cursor.description]
             rows = cursor.fetchall()
-            df = pd.DataFrame(rows, columns=columns)
+            df = pd.DataFrame(rows, columns=columns).drop(columns=[ROW_ID_COLUMN], errors='ignore')
 
         output = BytesIO()
         with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
@@ -0,0 +1,200 @@
+import csv
+import io
+import os
+import time
+import pandas as pd
+import pyarrow.parquet as pq
+from django.conf import settings
+from openpyxl import load_workbook
+
+# Kunci baris bigserial yang ditambahkan ke setiap tabel upload (paging keyset saat fetch)
+ROW_ID_COLUMN = '_row_id'
+
+# Format yang bisa diupload; dicek sebelum job dibuat
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xlsm', '.xls', '.csv', '.parquet')
+
+
+def _unique_headers(raw_headers):
+    """Nama kolom seperti pd.read_excel: strip, 'Unnamed: i' untuk header kosong, duplikat diberi .1, .2
+
+    Kolom file bernama ROW_ID_COLUMN juga diberi akhiran agar tidak bentrok dengan kunci baris.
+    """
+    headers = []
+    seen = {ROW_ID_COLUMN: 0}
+    for i, header in enumerate(raw_headers):
+        name = str(header).strip() if header is not None else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        headers.append(name)
+    return headers
+
+
+def iter_xlsx_chunks(path: str, chunk_rows: int):
+    """Baca sheet pertama xlsx baris per baris (openpyxl read-only), yield DataFrame per chunk
+
+    Baris yang punya nilai di kanan kolom header terakhir ditolak dengan ValueError, agar data
+    tidak terpotong diam-diam; sel kosong di sana (mis. hanya format) diabaikan.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = None
+        row_number = 0
+        for row in rows:
+            row_number += 1
+            if any(value is not None for value in row):
+                # Kolom kosong di ujung kanan header diabaikan
+                raw = list(row)
+                while raw and raw[-1] is None:
+                    raw.pop()
+                headers = _unique_headers(raw)
+                break
+        if headers is None:
+            return
+
+        width = len(headers)
+        buffer = []
+        for row_number, row in enumerate(rows, start=row_number + 1):
+            extra = [value for value in row[width:] if value is not None]
+            if extra:
+                raise ValueError(f"Baris {row_number} punya {len(extra)} nilai di luar {width} kolom header; "
+                                 f"lengkapi header kolom tersebut")
+            values = list(row[:width]) + [None] * (width - len(row))
+            buffer.append(values)
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=headers, dtype=object)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=headers, dtype=object)
+    finally:
+        workbook.close()
+
+
+def iter_csv_chunks(path: str, chunk_rows: int):
+    """CSV per chunk; delimiter dideteksi dari awal file, semua nilai dibaca sebagai teks"""
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        sample = f.read(64 * 1024)
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+    except csv.Error:
+        delimiter = ','
+
+    reader = pd.read_csv(path, sep=delimiter, chunksize=chunk_rows, dtype=str, keep_default_na=False,
+                         na_values=[''], encoding='utf-8-sig')
+    for chunk in reader:
+        chunk.columns = _unique_headers(chunk.columns)
+        yield chunk
+
+
+def iter_parquet_chunks(path: str, chunk_rows: int):
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+        chunk = batch.to_pandas()
+        chunk.columns = _unique_headers(chunk.columns)
+        yield chunk
+
+
+def iter_file_chunks(path: str, filename: str, chunk_rows: int = None):
+    """Yield DataFrame per chunk (memori dibatasi chunk_rows) sesuai ekstensi file asli
+
+    Pengecualian: .xls (format biner lama) tidak bisa dibaca streaming, sehingga seluruh file
+    dimuat ke memori sekaligus sebagai satu chunk; gunakan .xlsx/.csv/.parquet untuk file besar.
+    """
+    chunk_rows = chunk_rows or settings.UPLOAD_CHUNK_ROWS
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Format file tidak didukung: {extension or filename}. "
+                         f"Gunakan {', '.join(SUPPORTED_EXTENSIONS)}")
+    if extension in ('.xlsx', '.xlsm'):
+        chunks = iter_xlsx_chunks(path, chunk_rows)
+    elif extension == '.csv':
+        chunks = iter_csv_chunks(path, chunk_rows)
+    elif extension == '.parquet':
+        chunks = iter_parquet_chunks(path, chunk_rows)
+    else:
+        # .xls: xlrd membaca seluruh workbook ke memori, chunk_rows tidak berlaku
+        df = pd.read_excel(path, engine='xlrd')
+        df.columns = _unique_headers(df.columns)
+        chunks = [df]
+
+    for chunk in chunks:
+        chunk = chunk.dropna(how='all')
+        if not chunk.empty:
+            yield chunk.reset_index(drop=True)
+
+
+def estimate_rows(path: str, filename: str):
+    """Perkiraan jumlah baris data untuk progress (None jika tidak diketahui tanpa membaca file)"""
+    extension = os.path.splitext(filename)[1].lower()
+    try:
+        if extension in ('.xlsx', '.xlsm'):
+            workbook = load_workbook(path, read_only=True)
+            try:
+                max_row = workbook.worksheets[0].max_row
+            finally:
+                workbook.close()
+            return max(max_row - 1, 0) if max_row else None
+        if extension == '.parquet':
+            return pq.ParquetFile(path).metadata.num_rows
+    except Exception as e:
+        print(f"⚠️ Tidak bisa memperkirakan jumlah baris {filename}: {e}")
+    return None
+
+
+def _copy_text(values: pd.Series) -> pd.Series:
+    """Nilai kolom dalam format text COPY: str(value) ter-escape, NULL sebagai \\N"""
+    text = values.map(str, na_action='ignore')
+    text = (text.str.replace('\\', '\\\\', regex=False)
+                .str.replace('\t', '\\t', regex=False)
+                .str.replace('\n', '\\n', regex=False)
+                .str.replace('\r', '\\r', regex=False))
+    return text.where(values.notna(), '\\N')
+
+
+def copy_chunk(cursor, table_name: str, df: pd.DataFrame):
+    """Kirim satu chunk ke tabel dengan COPY FROM STDIN (format text)"""
+    columns = [_copy_text(df[column].astype(object)) for column in df.columns]
+    lines = columns[0]
+    for column in columns[1:]:
+        lines = lines + '\t' + column
+    buffer = io.StringIO('\n'.join(lines) + '\n')
+
+    table_sql = '"' + table_name.replace('"', '""') + '"'
+    column_sql = ', '.join('"' + str(column).replace('"', '""') + '"' for column in df.columns)
+    cursor.copy_expert(f'COPY {table_sql} ({column_sql}) FROM STDIN', buffer)
+
+
+def ingest_file(cursor, path: str, filename: str, table_name: str, create_table, on_chunk=None, chunk_rows: int = None):
+    """Streaming load file ke tabel: baca per chunk, COPY per chunk, log rows/s.
+
+    create_table(table_name, columns) dipanggil sekali dengan header chunk pertama;
+    on_chunk(df) dipanggil setelah setiap chunk dimuat (mis. untuk profil kolom).
+    """
+    start = time.perf_counter()
+    total_rows = 0
+    n_chunks = 0
+    columns = None
+
+    for chunk in iter_file_chunks(path, filename, chunk_rows):
+        if columns is None:
+            columns = list(chunk.columns)
+            create_table(table_name, columns)
+        copy_chunk(cursor, table_name, chunk)
+        if on_chunk:
+            on_chunk(chunk)
+
+        total_rows += len(chunk)
+        n_chunks += 1
+        elapsed = time.perf_counter() - start
+        print(f"✅ Chunk {n_chunks}: {total_rows} baris ({total_rows / elapsed:.0f} rows/s)")
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': total_rows,
+        'columns': columns or [],
+        'chunks': n_chunks,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(total_rows / elapsed, 1) if elapsed > 0 else None,
+    }
@@ -0,0 +1,28 @@
+import resource
+
+
+def reset_peak_rss():
+    """Reset penanda peak RSS proses (Linux) agar bisa diukur per stage.
+
+    VmHWM milik seluruh proses: job lain yang berjalan bersamaan di worker yang sama ikut ter-reset
+    dan ikut terhitung di peak berikutnya.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def get_peak_rss_mb():
+    """Ambil peak RSS proses dalam MB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 2)
+    except OSError:
+        pass
+    # Fallback: ru_maxrss (kB di Linux) tidak bisa di-reset, jadi ini peak sepanjang umur proses
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
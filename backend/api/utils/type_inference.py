@@ -0,0 +1,89 @@
+import pandas as pd
+
+# Tipe dicoba berurutan pada sampel (chunk pertama); yang pertama cocok untuk semua nilai dipakai
+DETECTION_ORDER = ['boolean', 'integer', 'bigint', 'numeric', 'date', 'timestamp']
+
+# Jika nilai di chunk berikutnya tidak valid untuk tipe kolom, tipe dilebarkan sampai cocok
+WIDENING = {
+    'boolean': 'text',
+    'integer': 'bigint',
+    'bigint': 'numeric',
+    'numeric': 'text',
+    'date': 'timestamp',
+    'timestamp': 'text',
+}
+
+# Angka dengan nol di depan (kode pos, NIK, no. telepon) sengaja tidak cocok agar tetap text
+_INTEGER = r'[+-]?(?:0|[1-9]\d*)'
+_NUMERIC = r'[+-]?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?'
+_DATE = r'\d{4}-\d{2}-\d{2}(?: 00:00:00)?'
+_TIMESTAMP = r'\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?)?'
+
+INT32_MAX = 2 ** 31 - 1
+
+
+def _is_integer(text: pd.Series, max_abs: int = None) -> bool:
+    if not text.str.fullmatch(_INTEGER).all():
+        return False
+    # 18 digit selalu muat di bigint dan aman dikonversi ke int64
+    if (text.str.lstrip('+-').str.len() > 18).any():
+        return False
+    return max_abs is None or bool(pd.to_numeric(text).abs().le(max_abs).all())
+
+
+def _is_valid_datetime(text: pd.Series, pattern: str) -> bool:
+    """Cocok pola ISO dan tanggalnya benar-benar ada (bukan 2024-02-30)"""
+    if not text.str.fullmatch(pattern).all():
+        return False
+    return bool(pd.to_datetime(text, format='ISO8601', errors='coerce').notna().all())
+
+
+def matches_type(sql_type: str, text: pd.Series) -> bool:
+    """Apakah semua nilai (teks, tanpa null) bisa di-cast Postgres ke sql_type tanpa kehilangan informasi"""
+    if sql_type == 'text':
+        return True
+    if sql_type == 'boolean':
+        return bool(text.str.lower().isin(['true', 'false']).all())
+    if sql_type == 'integer':
+        return _is_integer(text, INT32_MAX)
+    if sql_type == 'bigint':
+        return _is_integer(text)
+    if sql_type == 'numeric':
+        return bool(text.str.fullmatch(_NUMERIC).all())
+    if sql_type == 'date':
+        return _is_valid_datetime(text, _DATE)
+    if sql_type == 'timestamp':
+        return _is_valid_datetime(text, _TIMESTAMP)
+    raise ValueError(f"Tipe tidak dikenal: {sql_type}")
+
+
+class SchemaInference:
+    """Skema bertipe untuk upload streaming: tipe ditebak dari chunk pertama, lalu setiap chunk
+    berikutnya memvalidasi dan melebarkan tipe kolom yang tidak cocok lagi.
+
+    Nilai diperiksa dalam bentuk teks yang sama dengan yang di-COPY ke staging table,
+    sehingga ALTER ... USING col::tipe di akhir upload tidak gagal.
+    """
+
+    def __init__(self):
+        self.types = {}  # kolom -> tipe, None jika sejauh ini hanya berisi NULL
+        self.widened = {}  # kolom -> [tipe sebelumnya, ...]
+
+    def update(self, df: pd.DataFrame):
+        for column in df.columns:
+            text = df[column].dropna().astype(str)
+            current = self.types.get(column)
+            if text.empty:
+                self.types[column] = current
+                continue
+            if current is None:
+                self.types[column] = next((t for t in DETECTION_ORDER if matches_type(t, text)), 'text')
+                continue
+            while not matches_type(current, text):
+                self.widened.setdefault(column, []).append(current)
+                current = WIDENING[current]
+            self.types[column] = current
+
+    def schema(self) -> dict:
+        """Kolom -> tipe Postgres; kolom yang seluruhnya NULL tetap text"""
+        return {column: sql_type or 'text' for column, sql_type in self.types.items()}
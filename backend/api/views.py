@@ -1,13 +1,23 @@
 from rest_framework.decorators import api_view
 from background_task import background
 from rest_framework.response import Response
-from django.http import FileResponse
+from django.http import FileResponse, StreamingHttpResponse
+from django.db.models import Q
+from django.db import transaction
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
 from django.core.files.storage import default_storage
 import os
+import io
+import csv
+import json
+import base64
+import time
 from django.views.decorators.csrf import csrf_exempt
 #from .services.match_engine import run_faiss_matching
 from django.views.decorators.csrf import csrf_exempt
-from .utils.Upload_handler import delete_table_by_name, export_table_to_excel, get_table_data, handle_uploaded_file #get_recommended_columns, process_combined_columns
+from .utils.Upload_handler import delete_table_by_name, export_table_to_excel, get_table_data, create_upload_job, process_upload_job #get_recommended_columns, process_combined_columns
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -15,16 +25,21 @@ from rest_framework import status
 # from django.core.files.base import ContentFile
 import pandas as pd
 import uuid
-from .models import DataTable, MatchingResult, LabelingData, MatchingJob
+from .models import DataTable, MatchingResult, LabelingData, MatchingJob, BatchSummary, UploadJob
 from .services.match_engine import MatchingEngine
 from .services.supabase_service import SupabaseService
+from .services.candidate_search import INDEX_TYPES, DEFAULT_INDEX_OPTIONS, VECTOR_DIMENSION, min_train_rows
+from .services.blocking import BLOCKING_METHODS
+from .services.result_store import read_batch_strings
+from .services.batch_summary import refresh_batch_summary, record_label_change, summary_to_stats, overall_stats
+from .services.job_progress import job_progress_payload
 
 
 
 COMBINED_PATH = "combined.json"
 EXPORT_CSV_PATH = "matching_result_faiss_validated.csv"
 TEMP_FILE_PATH ="upload.xlxs"
-current_progress = {'current': 0, 'total': 1}
+JOB_TERMINAL_STATUSES = ('Success', 'Failed')
 
 class JobStatusView(APIView):
     def get(self, request, job_id):
@@ -36,6 +51,11 @@ class JobStatusView(APIView):
                 "status": job.status,
                 "start_time": job.start_time,
                 "end_time": job.end_time,
+                "progress": job_progress_payload(job),
+                "stage_metrics": job.stage_metrics,
+                "search_stats": job.search_stats,
+                "release": job.release,
+                "error": job.error,
             })
         except MatchingJob.DoesNotExist:
             return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -60,6 +80,7 @@ class GetRecommendedColumnsView(APIView):
         try:
             table_name = request.data.get('table_name')
             table_b = request.data.get('table_b')  # Optional untuk cross-table matching
+            refresh = str(request.data.get('refresh', '')).lower() in ('1', 'true')  # Hitung ulang profil dari sampel
             
             if not table_name:
                 return Response({'error': 'table_name required'}, status=400)
@@ -67,7 +88,7 @@ class GetRecommendedColumnsView(APIView):
             matching_engine = MatchingEngine()
             
             # Get recommendations untuk table utama
-            recommendations = matching_engine.get_recommended_columns(table_name)
+            recommendations = matching_engine.get_recommended_columns(table_name, refresh=refresh)
             
             result = {
                 'table_a_recommendations': recommendations
@@ -77,7 +98,7 @@ class GetRecommendedColumnsView(APIView):
             if table_b:
                 column_mapping = matching_engine.recommend_column_mapping(table_name, table_b)
                 result['column_mapping_recommendations'] = column_mapping
-                result['table_b_recommendations'] = matching_engine.get_recommended_columns(table_b)
+                result['table_b_recommendations'] = matching_engine.get_recommended_columns(table_b, refresh=refresh)
             
             return Response(result)
             
@@ -85,9 +106,84 @@ class GetRecommendedColumnsView(APIView):
             return Response({'error': str(e)}, status=500)
         
 @background(schedule=1)
-def run_matching_background(job_id, table_a, table_b, columns_a, columns_b):
+def run_matching_background(job_id, table_a, table_b, columns_a, columns_b, search_mode=None, index_options=None,
+                            blocking=None):
     engine = MatchingEngine()
-    engine.run_complete_matching(table_a, table_b, columns_a, columns_b)
+    engine.run_complete_matching(table_a, table_b, columns_a, columns_b,
+                                 search_mode=search_mode, index_options=index_options, blocking=blocking,
+                                 job_id=job_id)
+
+
+def parse_index_options(raw_options):
+    """Validasi index_options dari request, kembalikan (options, error)"""
+    if not raw_options:
+        return None, None
+    if not isinstance(raw_options, dict):
+        return None, 'index_options must be an object'
+    
+    unknown = set(raw_options) - set(DEFAULT_INDEX_OPTIONS)
+    if unknown:
+        return None, f"Unknown index_options: {', '.join(sorted(unknown))}"
+    
+    options = {}
+    for key, value in raw_options.items():
+        if key == 'index_type':
+            if value not in INDEX_TYPES:
+                return None, f"index_type must be one of: {', '.join(INDEX_TYPES)}"
+            options[key] = value
+        elif value is None and key == 'nlist':
+            options[key] = None
+        else:
+            try:
+                options[key] = int(value)
+            except (TypeError, ValueError):
+                return None, f'{key} must be an integer'
+            # Hanya recall_sample_size yang boleh 0 (recall tidak diukur); 0 membuat FAISS gagal saat train/search
+            minimum = 0 if key == 'recall_sample_size' else 1
+            if options[key] < minimum:
+                return None, f'{key} must be >= {minimum}'
+    if 'pq_m' in options and VECTOR_DIMENSION % options['pq_m']:
+        return None, f'pq_m must divide the vector dimension ({VECTOR_DIMENSION})'
+    # FAISS butuh minimal nlist (IVF) / 2 ** nbits (PQ) titik training
+    minimum_train = min_train_rows({**DEFAULT_INDEX_OPTIONS, **options})
+    if 'train_sample_size' in options and options['train_sample_size'] < minimum_train:
+        return None, f"train_sample_size must be >= {minimum_train} for {options['index_type']}"
+    return options, None
+
+
+def parse_blocking(raw_blocking):
+    """Validasi konfigurasi blocking dari request, kembalikan (blocking, error)"""
+    if not raw_blocking:
+        return None, None
+    if not isinstance(raw_blocking, dict) or not isinstance(raw_blocking.get('keys'), list) or not raw_blocking['keys']:
+        return None, 'blocking must be an object with a non-empty keys list'
+    
+    keys = []
+    for key in raw_blocking['keys']:
+        if not isinstance(key, dict) or not key.get('column'):
+            return None, 'each blocking key requires a column'
+        method = key.get('method', 'exact')
+        if method not in BLOCKING_METHODS:
+            return None, f"blocking method must be one of: {', '.join(BLOCKING_METHODS)}"
+        parsed = {'column': key['column'], 'method': method}
+        if key.get('column_b'):
+            parsed['column_b'] = key['column_b']
+        if method == 'prefix':
+            try:
+                parsed['length'] = int(key.get('length', 3))
+            except (TypeError, ValueError):
+                return None, 'prefix length must be an integer'
+        keys.append(parsed)
+    
+    window = raw_blocking.get('window')
+    if window is not None:
+        try:
+            window = int(window)
+        except (TypeError, ValueError):
+            return None, 'blocking window must be an integer'
+        if window < 2:
+            return None, 'blocking window must be >= 2'
+    return {'keys': keys, 'window': window}, None
 
 # API view untuk start matching
 class StartMatchingView(APIView):
@@ -98,9 +194,32 @@ class StartMatchingView(APIView):
             table_b = request.data.get('table_b')
             columns_a = request.data.get('columns_a')
             columns_b = request.data.get('columns_b')
+            search_mode = request.data.get('search_mode')  # Optional: 'dense', 'sparse' atau 'global'
+            # Optional (mode 'global'): index_type, train_sample_size, nlist, nprobe, ef_search, dll.
+            index_options, options_error = parse_index_options(request.data.get('index_options'))
+            # Optional: {'keys': [{'column': 'kabupaten'}, {'column': 'nama', 'method': 'soundex'}], 'window': None}
+            blocking, blocking_error = parse_blocking(request.data.get('blocking'))
             
             if not table_a or not columns_a:
                 return Response({'error': 'table_a and columns_a required'}, status=400)
+            
+            if search_mode and search_mode not in ['dense', 'sparse', 'global']:
+                return Response({'error': 'search_mode must be dense, sparse or global'}, status=400)
+            
+            if options_error:
+                return Response({'error': options_error}, status=400)
+            
+            # Mode dense hanya memakai index_options untuk index per blok; sparse tidak pernah
+            if index_options and (search_mode == 'sparse' or (search_mode == 'dense' and not blocking)):
+                return Response({'error': 'index_options only apply to search_mode global or blocked dense search'},
+                                status=400)
+            
+            if blocking_error:
+                return Response({'error': blocking_error}, status=400)
+            
+            # index_options hanya berlaku untuk satu index global
+            if index_options and not search_mode:
+                search_mode = 'global'
 
             job_id = str(uuid.uuid4())
             
@@ -108,33 +227,155 @@ class StartMatchingView(APIView):
             matching_engine.save_job_status(job_id, table_a)  # Simpan status 'Pending'
 
             # Kirim ke background
-            run_matching_background(job_id, table_a, table_b, columns_a, columns_b)
+            run_matching_background(job_id, table_a, table_b, columns_a, columns_b, search_mode, index_options, blocking)
 
             return Response({'job_id': job_id, 'status': 'Pending'})
 
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
+RESULT_FIELDS = [
+    'id', 'batch_id', 'source_table', 'reference_table', 'matching_algorithm', 'status',
+    'confidence_score', 'id_1', 'id_2', 'faiss_score', 'fuzzy_score', 'predicted', 'created_at'
+]
+RESULT_SORTS = {
+    'id': ('id', False),
+    'confidence': ('confidence_score', False),
+    '-confidence': ('confidence_score', True),
+}
+
+
+def encode_cursor(value, row_id):
+    """Cursor keyset opaque: nilai kolom sort + id baris terakhir"""
+    return base64.urlsafe_b64encode(json.dumps([value, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    return value, int(row_id)
+
+
+def stream_results(rows, fields, output_format):
+    """Generator NDJSON / CSV baris per baris (memori konstan)"""
+    if output_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(fields, row)), default=str) + '\n'
+
+
 class GetMatchingResultsView(APIView):
     def get(self, request):
-        """Get hasil matching berdasarkan batch_id"""
+        """Get hasil matching berdasarkan batch_id (cursor pagination / streaming)
+
+        Query params:
+            type        all | match | unmatch | enriched
+            page_size   jumlah baris per halaman (default 100, max 1000)
+            cursor      next_cursor dari halaman sebelumnya
+            sort        id | confidence | -confidence
+            fields      daftar kolom dipisah koma; matched_data hanya jika diminta
+            include_strings  1 untuk menambahkan combined string dari artifact batch
+            export      ndjson | csv untuk men-stream seluruh batch (tanpa pagination)
+        """
         try:
             batch_id = request.query_params.get('batch_id')
             result_type = request.query_params.get('type', 'all')  # all, match, unmatch, enriched
+            include_strings = request.query_params.get('include_strings') in ('1', 'true')
+            output_format = request.query_params.get('export', 'json')
+            sort = request.query_params.get('sort', 'id')
+            cursor = request.query_params.get('cursor')
             
             if not batch_id:
                 return Response({'error': 'batch_id required'}, status=400)
             
+            if sort not in RESULT_SORTS:
+                return Response({'error': f"sort must be one of: {', '.join(RESULT_SORTS)}"}, status=400)
+            
+            if output_format not in ('json', 'ndjson', 'csv'):
+                return Response({'error': 'export must be ndjson or csv'}, status=400)
+            
+            try:
+                page_size = min(max(int(request.query_params.get('page_size', 100)), 1), 1000)
+            except ValueError:
+                return Response({'error': 'page_size must be an integer'}, status=400)
+            
+            fields = RESULT_FIELDS
+            if request.query_params.get('fields'):
+                fields = [field.strip() for field in request.query_params['fields'].split(',') if field.strip()]
+                unknown = set(fields) - set(RESULT_FIELDS + ['matched_data'])
+                if unknown:
+                    return Response({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}, status=400)
+            
             query = MatchingResult.objects.filter(batch_id=batch_id)
             
             if result_type != 'all':
                 query = query.filter(status=result_type.upper())
             
-            results = query.values()
+            sort_field, descending = RESULT_SORTS[sort]
+            ordering = [f'-{sort_field}', '-id'] if descending else [sort_field, 'id']
+            if sort_field == 'id':
+                ordering = ['-id'] if descending else ['id']
+            query = query.order_by(*ordering)
+            
+            # Streaming seluruh batch tanpa memuat semuanya ke memori
+            if output_format != 'json':
+                rows = query.values_list(*fields).iterator(chunk_size=2000)
+                content_type = 'text/csv' if output_format == 'csv' else 'application/x-ndjson'
+                response = StreamingHttpResponse(stream_results(rows, fields, output_format), content_type=content_type)
+                response['Content-Disposition'] = f'attachment; filename={batch_id}.{output_format}'
+                return response
+            
+            total_count = query.count() if not cursor else None
+            
+            if cursor:
+                try:
+                    last_value, last_id = decode_cursor(cursor)
+                except (ValueError, TypeError):
+                    return Response({'error': 'invalid cursor'}, status=400)
+                if sort_field == 'id':
+                    query = query.filter(id__lt=last_id) if descending else query.filter(id__gt=last_id)
+                elif descending:
+                    query = query.filter(
+                        Q(**{f'{sort_field}__lt': last_value}) | Q(**{sort_field: last_value, 'id__lt': last_id})
+                    )
+                else:
+                    query = query.filter(
+                        Q(**{f'{sort_field}__gt': last_value}) | Q(**{sort_field: last_value, 'id__gt': last_id})
+                    )
+            
+            # Ambil page_size + 1 untuk mengetahui apakah masih ada halaman berikutnya
+            select_fields = list(dict.fromkeys(fields + ['id', sort_field]))
+            results = list(query.values(*select_fields)[:page_size + 1])
+            has_next = len(results) > page_size
+            results = results[:page_size]
+            next_cursor = encode_cursor(results[-1][sort_field], results[-1]['id']) if has_next else None
+            
+            # Combined string dibaca lazy dari artifact Parquet batch, hanya untuk halaman ini
+            if include_strings and results and 'id_1' in select_fields and 'id_2' in select_fields:
+                strings = read_batch_strings(
+                    batch_id, None if result_type == 'all' else result_type.upper(),
+                    id_1_values={result['id_1'] for result in results}
+                )
+                if strings is not None:
+                    lookup = {
+                        (row.id_1, row.id_2): (row.combined_1, row.combined_2)
+                        for row in strings.itertuples(index=False)
+                    }
+                    for result in results:
+                        result['combined_1'], result['combined_2'] = lookup.get((result['id_1'], result['id_2']), (None, None))
             
             return Response({
-                'results': list(results),
-                'total_count': len(results)
+                'results': results,
+                'page_size': page_size,
+                'next_cursor': next_cursor,
+                'total_count': total_count
             })
             
         except Exception as e:
@@ -157,6 +398,55 @@ class GetLabelingDataView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
+class LabelingQueueView(APIView):
+    QUEUE_FIELDS = [
+        'id', 'data_id', 'combined_string_1', 'combined_string_2', 'source_table', 'reference_table',
+        'confidence', 'fuzzy_score', 'faiss_score', 'priority', 'lease_expires_at'
+    ]
+    
+    def get(self, request):
+        """Ambil halaman berikutnya dari antrian labeling (paling tidak pasti dulu) dan lease ke reviewer
+
+        Query params: page_size (default 20, max 100), batch_id (opsional)
+        """
+        try:
+            try:
+                page_size = min(max(int(request.query_params.get('page_size', 20)), 1), 100)
+            except ValueError:
+                return Response({'error': 'page_size must be an integer'}, status=400)
+            batch_id = request.query_params.get('batch_id')
+            
+            now = timezone.now()
+            lease_until = now + timedelta(seconds=settings.LABELING_LEASE_SECONDS)
+            reviewer = request.user if request.user.is_authenticated else None
+            
+            with transaction.atomic():
+                # Baris yang belum dilabel dan lease-nya kosong / kedaluwarsa; skip_locked agar
+                # reviewer lain yang sedang mengambil antrian tidak mendapat baris yang sama
+                query = LabelingData.objects.filter(label__isnull=True).filter(
+                    Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=now)
+                )
+                if batch_id:
+                    query = query.filter(batch_id=batch_id)
+                
+                ids = list(
+                    query.order_by('-priority', 'id')
+                    .select_for_update(skip_locked=True)
+                    .values_list('id', flat=True)[:page_size]
+                )
+                LabelingData.objects.filter(id__in=ids).update(leased_by=reviewer, lease_expires_at=lease_until)
+            
+            items = list(LabelingData.objects.filter(id__in=ids).order_by('-priority', 'id').values(*self.QUEUE_FIELDS))
+            
+            return Response({
+                'items': items,
+                'page_size': page_size,
+                'lease_expires_at': lease_until
+            })
+            
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
+
 class SubmitLabelingView(APIView):
     def post(self, request):
         """Submit hasil labeling manual"""
@@ -172,10 +462,16 @@ class SubmitLabelingView(APIView):
             
             # Update labeling data
             labeling_data = LabelingData.objects.get(id=labeling_id)
+            previous_label = labeling_data.label
             labeling_data.label = label
             labeling_data.confirmed_by = request.user
+            labeling_data.leased_by = None
+            labeling_data.lease_expires_at = None
             labeling_data.save()
             
+            # Ringkasan batch diperbarui inkremental
+            record_label_change(labeling_data, previous_label, label)
+            
             return Response({
                 'message': 'Labeling submitted successfully',
                 'labeling_id': labeling_id,
@@ -204,55 +500,110 @@ class RetrainModelView(APIView):
 
 class GetMatchingStatsView(APIView):
     def get(self, request):
-        """Get statistik matching"""
+        """Get statistik matching dari ringkasan batch yang sudah dihitung (tanpa agregasi live)"""
         try:
             batch_id = request.query_params.get('batch_id')
             
             if batch_id:
-                # Stats untuk batch tertentu
-                stats = MatchingResult.objects.filter(batch_id=batch_id).values('status').annotate(
-                    count=models.Count('id')
-                )
-            else:
-                # Stats keseluruhan
-                stats = MatchingResult.objects.values('status').annotate(
-                    count=models.Count('id')
-                )
-            
-            # Labeling stats
-            labeling_stats = {
-                'total_unlabeled': LabelingData.objects.filter(label__isnull=True).count(),
-                'total_labeled': LabelingData.objects.filter(label__isnull=False).count(),
-                'match_labels': LabelingData.objects.filter(label='MATCH').count(),
-                'unmatch_labels': LabelingData.objects.filter(label='UNMATCH').count()
-            }
+                # Stats untuk batch tertentu: satu baris batch_summary
+                summary = BatchSummary.objects.filter(batch_id=batch_id).first()
+                if summary is None:
+                    # Batch lama tanpa ringkasan: hitung sekali lalu simpan
+                    summary = refresh_batch_summary(batch_id)
+                if summary is None:
+                    return Response({'error': 'Batch not found'}, status=404)
+                return Response(summary_to_stats(summary))
             
-            return Response({
-                'matching_stats': list(stats),
-                'labeling_stats': labeling_stats
-            })
+            # Stats keseluruhan
+            return Response(overall_stats())
             
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
 @api_view(['GET'])
 def progress_faiss(request):
-    return Response(current_progress)
+    """Progress job (job_id opsional, default job terbaru); current/total dipertahankan untuk frontend lama"""
+    job_id = request.query_params.get('job_id')
+    jobs = MatchingJob.objects.all()
+    job = jobs.filter(job_id=job_id).first() if job_id else jobs.order_by('-start_time').first()
+    if job is None:
+        return Response({'current': 0, 'total': 1})
+    
+    payload = job_progress_payload(job)
+    payload['current'] = job.stage_processed
+    payload['total'] = job.stage_total or 1
+    return Response(payload)
+
+
+def job_progress_events(job_id):
+    """Generator Server-Sent Events: kirim progress setiap kali berubah sampai job selesai"""
+    last_payload = None
+    while True:
+        job = MatchingJob.objects.filter(job_id=job_id).first()
+        if job is None:
+            yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+            return
+        
+        payload = job_progress_payload(job)
+        if payload != last_payload:
+            yield f"event: progress\ndata: {json.dumps(payload)}\n\n"
+            last_payload = payload
+        else:
+            # Komentar keep-alive agar proxy tidak menutup koneksi
+            yield ": keep-alive\n\n"
+        
+        if job.status in JOB_TERMINAL_STATUSES:
+            yield f"event: done\ndata: {json.dumps(payload)}\n\n"
+            return
+        time.sleep(settings.JOB_PROGRESS_INTERVAL)
+
+
+def job_progress_stream(request, job_id):
+    """Stream progress satu job sebagai text/event-stream (pengganti polling /progress_faiss/)"""
+    response = StreamingHttpResponse(job_progress_events(job_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@background(schedule=1)
+def run_upload_background(job_id):
+    process_upload_job(job_id)
+
 
 @csrf_exempt
 @api_view(['POST'])
 def upload_file(request):
-    import tempfile
-
+    """Terima file lalu load di background; progress lewat upload-status/<job_id>/"""
     if 'table_name' not in request.POST:
         return Response({'error': 'Parameter table_name wajib disediakan'}, status=400)
 
-    table_name = request.POST['table_name']
+    job, error = create_upload_job(request, request.POST['table_name'])
+    if error:
+        return Response({'error': error}, status=400)
+
+    run_upload_background(job.job_id)
+    return Response({'job_id': job.job_id, 'status': job.status}, status=202)
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        temp_path = tmp.name
 
-    return handle_uploaded_file(request, temp_path, table_name)
+class UploadJobStatusView(APIView):
+    def get(self, request, job_id):
+        try:
+            job = UploadJob.objects.get(job_id=job_id)
+            return Response({
+                'job_id': job.job_id,
+                'table_name': job.table_name,
+                'original_filename': job.original_filename,
+                'status': job.status,
+                'rows_processed': job.rows_processed,
+                'rows_total': job.rows_total,
+                'columns': job.columns,
+                'stats': job.stats,
+                'error': job.error,
+                'start_time': job.start_time,
+                'end_time': job.end_time,
+            })
+        except UploadJob.DoesNotExist:
+            return Response({'error': 'Upload job not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['GET', 'DELETE'])
 def handle_table_operations(request):
@@ -156,6 +156,51 @@ SUPABASE_URL = os.getenv("SUPABASE_URL", "http://localhost:8000")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_DB_SCHEMA = os.getenv("SUPABASE_DB_SCHEMA", "public")
 
+# Fetch tabel: ukuran range per request PostgREST dan jumlah request paralel
+SUPABASE_FETCH_PAGE_SIZE = int(os.getenv("SUPABASE_FETCH_PAGE_SIZE", "10000"))
+SUPABASE_FETCH_WORKERS = int(os.getenv("SUPABASE_FETCH_WORKERS", "4"))
 
+# Candidate search: 'dense' (IndexFlatL2 per pasangan chunk), 'sparse' (top-k langsung di CSR)
+# atau 'global' (satu index FAISS per job)
+MATCHING_SEARCH_MODE = os.getenv("MATCHING_SEARCH_MODE", "dense")
+MATCHING_QUERY_CHUNK = int(os.getenv("MATCHING_QUERY_CHUNK", "5000"))
+MATCHING_SPARSE_QUERY_CHUNK = int(os.getenv("MATCHING_SPARSE_QUERY_CHUNK", "2000"))
+MATCHING_SPARSE_TARGET_CHUNK = int(os.getenv("MATCHING_SPARSE_TARGET_CHUNK", "20000"))
 
+# Jumlah worker RapidFuzz untuk batch fuzzy scoring (-1 = semua core)
+MATCHING_FUZZY_WORKERS = int(os.getenv("MATCHING_FUZZY_WORKERS", "-1"))
 
+# Blocking: jumlah thread search antar blok dan ukuran sampel untuk estimasi pair completeness
+MATCHING_BLOCK_WORKERS = int(os.getenv("MATCHING_BLOCK_WORKERS", "4"))
+MATCHING_BLOCKING_SAMPLE = int(os.getenv("MATCHING_BLOCKING_SAMPLE", "500"))
+
+# Ukuran batch bulk_create untuk db_final dan table_labeling
+MATCHING_SAVE_BATCH_SIZE = int(os.getenv("MATCHING_SAVE_BATCH_SIZE", "5000"))
+
+# Hasil per batch: kolom numerik di db_final, combined string di artifact Parquet.
+# MATCHING_STORE_MATCHED_DATA=1 mengembalikan perilaku lama (dict hasil penuh di JSONField)
+MATCHING_ARTIFACT_DIR = os.getenv("MATCHING_ARTIFACT_DIR", str(BASE_DIR / "artifacts"))
+MATCHING_STORE_MATCHED_DATA = os.getenv("MATCHING_STORE_MATCHED_DATA", "0") == "1"
+
+# Lama lease antrian labeling per reviewer (detik)
+LABELING_LEASE_SECONDS = int(os.getenv("LABELING_LEASE_SECONDS", "600"))
+
+# Interval minimum (detik) penulisan progress job ke database / polling SSE
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "1.0"))
+
+# Identitas release (mis. git sha / tag) yang dicatat bersama metrik job
+APP_RELEASE = os.getenv("APP_RELEASE", "")
+
+# Cache disk prepared data + TF-IDF per (tabel, kolom, versi tabel); LRU dengan batas ukuran.
+# MATCHING_CACHE_MAX_MB=0 mematikan cache
+MATCHING_CACHE_DIR = os.getenv("MATCHING_CACHE_DIR", str(BASE_DIR / "cache"))
+MATCHING_CACHE_MAX_MB = int(os.getenv("MATCHING_CACHE_MAX_MB", "2048"))
+
+# Profil kolom untuk tabel tanpa profil upload dibangun dari sampel acak sebanyak ini
+COLUMN_PROFILE_SAMPLE_ROWS = int(os.getenv("COLUMN_PROFILE_SAMPLE_ROWS", "50000"))
+
+# Upload streaming: jumlah baris per chunk baca + COPY (membatasi memori upload)
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "50000"))
+
+# File upload disimpan di sini sampai job upload di background selesai
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", str(BASE_DIR / "uploads"))
@@ -49,8 +49,17 @@ const handleUpload = async () => {
 
   try {
     const res = await axios.post("http://127.0.0.1:8001/upload/", formData);
+
+    // Upload diproses di background; tunggu job selesai
+    let job = res.data;
+    while (job.status !== "Success" && job.status !== "Failed") {
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      job = (await axios.get(`http://127.0.0.1:8001/upload-status/${res.data.job_id}/`)).data;
+    }
+    if (job.status === "Failed") throw new Error(job.error);
+
     toast.success("File berhasil diupload!");
-    setColumns(res.data.columns); // Simpan semua kolom
+    setColumns(job.columns); // Simpan semua kolom
 
     // Ambil rekomendasi kolom dari backend
     const recRes = await axios.post("http://127.0.0.1:8001/recommend-columns/", {
@@ -62,7 +71,7 @@ const handleUpload = async () => {
       setRecommendedCols(rekomendasi.map((item) => item.column));
     } else {
       // Fallback: jika tidak ada rekomendasi, pakai semua kolom
-      setRecommendedCols(res.data.columns || []);
+      setRecommendedCols(job.columns || []);
     }
   } catch (err) {
     toast.error("Gagal upload atau ambil rekomendasi");
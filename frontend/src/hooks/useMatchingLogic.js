@@ -18,21 +18,23 @@ const useMatchingLogic = () => {
 
   const handleFileChange = (e) => setFile(e.target.files[0]);
 
-  const pollProgress = () => {
-    const interval = setInterval(async () => {
-      try {
-        const res = await axios.get("http://127.0.0.1:8000/progress_faiss/");
-        setProgress(res.data);
-        if (res.data.current >= res.data.total) {
-          clearInterval(interval);
-          setIsMatching(false);
-        }
-      } catch (error) {
-        console.error("Polling error:", error);
-        clearInterval(interval);
-      }
-    }, 1000);
-  };
+  // Progress per job lewat SSE; resolve dengan payload terakhir saat job selesai
+  const watchProgress = (jobId) =>
+    new Promise((resolve, reject) => {
+      const source = new EventSource(`http://127.0.0.1:8000/job-progress/${jobId}/stream/`);
+      source.addEventListener("progress", (e) => {
+        const payload = JSON.parse(e.data);
+        setProgress({ ...payload, current: payload.processed, total: payload.total || 1 });
+      });
+      source.addEventListener("done", (e) => {
+        source.close();
+        resolve(JSON.parse(e.data));
+      });
+      source.addEventListener("error", (e) => {
+        source.close();
+        reject(new Error(e.data ? JSON.parse(e.data).error : "Koneksi progress terputus"));
+      });
+    });
 
   const fetchRecommendations = async () => {
     try {
@@ -87,16 +89,28 @@ const handleUpload = async () => {
     }
   };
 
-  const handleMatch = async () => {
+  const handleMatch = async (tableName) => {
     try {
       setIsMatching(true);
       setProgress({ current: 0, total: 1 });
-      pollProgress();
-      const res = await axios.post("http://127.0.0.1:8000/match_faiss/");
-      setMatches(res.data.results);
+      const res = await axios.post("http://127.0.0.1:8000/start-matching/", {
+        table_a: tableName,
+        columns_a: selectedColumns,
+      });
+      const jobId = res.data.job_id;
+      const job = await watchProgress(jobId);
+      if (job.status === "Failed") {
+        const status = await axios.get(`http://127.0.0.1:8000/job-status/${jobId}/`);
+        throw new Error(status.data.error);
+      }
+      const results = await axios.get("http://127.0.0.1:8000/matching-results/", {
+        params: { batch_id: jobId },
+      });
+      setMatches(results.data.results);
     } catch (err) {
       alert("❌ Matching gagal!");
       console.error("MATCHING FAILED:", err.response?.data || err);
+    } finally {
       setIsMatching(false);
     }
   };